@@ -0,0 +1,160 @@
+"""
+Analytics query latency over 100k+ synced expenses.
+
+Run from the backend directory:
+    python -m benchmarks.bench_analytics [--expenses 100000,400000] [--groups 50]
+
+Synthetic expenses spread over several groups, two currencies, a dozen
+categories and a few hundred vendors over three years are written to a SQLite
+ExpenseStore. "sql" answers each query with a GROUP BY over the store, the
+way a per-request implementation would; "numpy" is ExpenseAnalytics once its
+columns are loaded. "load" is the one-off column build on first use;
+"patch" is the first query after a sync updated 100 expenses, when only those
+rows are re-read. Each query runs for all groups and for a single group.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.services.analytics import ExpenseAnalytics, ReceiptItemStore
+from src.services.expense_sync import ExpenseStore
+
+VENDOR_WORDS = (
+    "corner market cafe bistro pharmacy hardware grocer bakery books garden "
+    "fuel taxi cinema gym florist deli noodle pizza sushi taco"
+).split()
+
+CATEGORIES = (
+    "groceries dining rent utilities transport travel entertainment household "
+    "health gifts shopping general"
+).split()
+
+SQL_QUERIES = {
+    "categories": (
+        "SELECT substr(date, 1, 7), category, currency_code, SUM(cost), COUNT(*) "
+        "FROM expenses e WHERE deleted_at IS NULL AND payment = 0 {where} "
+        "GROUP BY 1, 2, 3"
+    ),
+    "members": (
+        "SELECT s.user_id, e.currency_code, SUM(s.paid_share), SUM(s.owed_share), "
+        "COUNT(*) FROM expenses e JOIN expense_shares s ON s.expense_id = e.id "
+        "WHERE e.deleted_at IS NULL AND e.payment = 0 {where} GROUP BY 1, 2"
+    ),
+    "vendors": (
+        "SELECT lower(description), currency_code, SUM(cost) AS total, COUNT(*) "
+        "FROM expenses e WHERE deleted_at IS NULL AND payment = 0 {where} "
+        "GROUP BY 1, 2 ORDER BY total DESC LIMIT 20"
+    ),
+}
+
+
+def sample_expenses(count, groups, seed=7):
+    rng = random.Random(seed)
+    vendors = [
+        f"{first} {second}" for first in VENDOR_WORDS for second in VENDOR_WORDS
+    ][:300]
+    for expense_id in range(1, count + 1):
+        group_id = rng.randrange(groups)
+        members = [group_id * 10 + offset for offset in range(6)]
+        split = rng.sample(members, rng.randint(2, 6))
+        payer = rng.choice(members)
+        cost = round(rng.uniform(5, 300), 2)
+        owed = round(cost / len(split), 2)
+        shares = {user: [0.0, owed] for user in split}
+        shares.setdefault(payer, [0.0, 0.0])[0] = cost
+        yield {
+            "id": expense_id,
+            "group_id": group_id,
+            "description": rng.choice(vendors),
+            "amount": cost,
+            "currency_code": "USD" if rng.random() < 0.9 else "EUR",
+            "date": f"{2022 + rng.randrange(3)}-{rng.randint(1, 12):02d}-15T00:00:00Z",
+            "created_at": None,
+            "updated_at": None,
+            "deleted_at": None,
+            "created_by": {"id": payer, "name": f"member{payer}"},
+            "category": rng.choice(CATEGORIES),
+            "payment": rng.random() < 0.05,
+            "shares": [
+                {
+                    "user_id": user,
+                    "name": f"member{user}",
+                    "paid_share": paid,
+                    "owed_share": owed_share,
+                }
+                for user, (paid, owed_share) in shares.items()
+            ],
+        }
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--expenses", default="100000,400000")
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'expenses':>9}{'load ms':>10}{'query':>12}{'scope':>7}"
+        f"{'sql ms':>9}{'numpy ms':>10}{'rows':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(value) for value in args.expenses.split(",")):
+            store = ExpenseStore(os.path.join(directory, f"{count}.db"))
+            batch = []
+            for expense in sample_expenses(count, args.groups):
+                batch.append(expense)
+                if len(batch) == 5000:
+                    store.upsert_expenses(batch)
+                    batch = []
+            store.upsert_expenses(batch)
+            analytics = ExpenseAnalytics(store, ReceiptItemStore(":memory:"))
+            analytics.spend_by_category()
+            load = analytics.loads["load_ms"]
+
+            numpy_queries = {
+                "categories": lambda group: analytics.spend_by_category(group),
+                "members": lambda group: analytics.spend_by_member(group),
+                "vendors": lambda group: analytics.spend_by_vendor(group),
+            }
+            for name, sql in SQL_QUERIES.items():
+                for group_id, scope in ((None, "all"), (1, "group")):
+                    where = "" if group_id is None else f"AND e.group_id = {group_id}"
+                    query = sql.format(where=where)
+                    sql_time, _ = best_of(
+                        args.repeat,
+                        lambda: store._conn.execute(query).fetchall(),
+                    )
+                    numpy_time, rows = best_of(
+                        args.repeat, lambda: numpy_queries[name](group_id)
+                    )
+                    print(
+                        f"{count:>9}{load:>10.1f}{name:>12}{scope:>7}"
+                        f"{sql_time * 1000:>9.1f}{numpy_time * 1000:>10.1f}"
+                        f"{len(rows):>7}"
+                    )
+            assert analytics.loads["expenses"] == 1
+
+            changed = list(sample_expenses(100, args.groups, seed=11))
+            store.upsert_expenses(changed)
+            started = time.perf_counter()
+            analytics.spend_by_category()
+            patch = (time.perf_counter() - started) * 1000
+            assert analytics.loads == {**analytics.loads, "expenses": 1, "patches": 1}
+            print(f"{count:>9} first query after a 100-expense sync: {patch:.1f} ms")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare per-task and batched expense analysis: LLM calls, tokens and wall time.
+
+Run from the backend directory:
+    python -m benchmarks.bench_expense_analysis [--expenses 40] [--budget 3000]
+
+By default the LLM is simulated with a fixed per-call prompt overhead (the agent's
+role, backstory and tool descriptions) and a latency model of
+base + per-output-token time, scaled down by --time-scale so the run is fast.
+Pass --live to run both modes against the real SplitwiseAgent (requires Splitwise
+and OpenAI credentials); tokens then come from CrewAI usage metrics.
+"""
+import argparse
+import json
+import re
+import time
+
+from src.services.expense_analysis import BatchExpenseAnalyzer, estimate_tokens
+
+PER_TASK_DESCRIPTION = (
+    "Process this expense with detailed analysis:\n"
+    "1. Categorize the expense\n"
+    "2. Suggest optimal splitting\n"
+    "3. Identify any patterns or special handling needed\n"
+)
+
+VENDORS = ["Uber", "Whole Foods", "Netflix", "Shell", "Airbnb", "Starbucks", "PG&E"]
+
+
+def sample_expenses(count):
+    return [
+        {
+            "id": 1000 + i,
+            "description": f"{VENDORS[i % len(VENDORS)]} #{i}",
+            "amount": round(5 + (i * 7.31) % 120, 2),
+            "date": f"2024-03-{1 + i % 28:02d}T12:00:00Z",
+            "created_by": {"id": 1 + i % 3, "name": ["Ana", "Ben", "Caro"][i % 3]},
+        }
+        for i in range(count)
+    ]
+
+
+class SimulatedLLM:
+    """Counts tokens and sleeps according to a simple latency model"""
+
+    def __init__(self, overhead_tokens, base_latency, per_token_latency, time_scale):
+        self.overhead_tokens = overhead_tokens
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.time_scale = time_scale
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _respond(self, prompt, output):
+        self.calls += 1
+        self.prompt_tokens += self.overhead_tokens + estimate_tokens(prompt)
+        output_tokens = estimate_tokens(output)
+        self.completion_tokens += output_tokens
+        time.sleep(
+            (self.base_latency + self.per_token_latency * output_tokens) * self.time_scale
+        )
+        return output
+
+    def batched(self, prompt, use_cache=True):
+        ids = [int(match) for match in re.findall(r'^\{"id":(\d+)', prompt, re.MULTILINE)]
+        output = json.dumps(
+            [
+                {
+                    "id": expense_id,
+                    "category": "transport",
+                    "tags": ["ride", "work"],
+                    "split_suggestion": "equal",
+                    "notes": "",
+                }
+                for expense_id in ids
+            ]
+        )
+        return self._respond(prompt, output)
+
+    def per_task(self, prompt):
+        output = (
+            '{"category": "transport", "tags": ["ride", "work"], '
+            '"split_suggestion": "equal", "notes": "Recurring commute expense, '
+            'consider splitting equally among the riders."}'
+        )
+        return self._respond(prompt, output)
+
+
+def run_simulated(args):
+    expenses = sample_expenses(args.expenses)
+    rows = []
+
+    llm = SimulatedLLM(args.overhead, args.base_latency, args.token_latency, args.time_scale)
+    started = time.perf_counter()
+    for expense in expenses:
+        llm.per_task(f"{PER_TASK_DESCRIPTION}\n\nContext data:\n{json.dumps({'expense_data': expense}, indent=2)}")
+    rows.append(("per_task", llm, time.perf_counter() - started))
+
+    llm = SimulatedLLM(args.overhead, args.base_latency, args.token_latency, args.time_scale)
+    analyzer = BatchExpenseAnalyzer(llm.batched, token_budget=args.budget)
+    started = time.perf_counter()
+    results = analyzer.analyze(expenses)
+    rows.append(("batched", llm, time.perf_counter() - started))
+    assert all("analysis_error" not in result for result in results)
+
+    print(
+        f"{args.expenses} expenses, simulated LLM "
+        f"(overhead {args.overhead} tokens, latency {args.base_latency}s + "
+        f"{args.token_latency}s/token, time scale {args.time_scale})\n"
+    )
+    print(f"{'mode':<10}{'calls':>7}{'prompt tok':>12}{'output tok':>12}{'wall s':>10}{'projected s':>13}")
+    for mode, llm, elapsed in rows:
+        print(
+            f"{mode:<10}{llm.calls:>7}{llm.prompt_tokens:>12}{llm.completion_tokens:>12}"
+            f"{elapsed:>10.3f}{elapsed / args.time_scale:>13.1f}"
+        )
+
+
+def run_live(args):
+    from src.agents.splitwise_agent import SplitwiseAgent
+
+    agent = SplitwiseAgent()
+    expenses = agent.get_expenses(limit=args.expenses)
+    print(f"{'mode':<10}{'kickoffs':>9}{'prompt tok':>12}{'output tok':>12}{'wall s':>10}")
+    for mode in ("per_task", "batched"):
+        before = agent.usage_snapshot()
+        started = time.perf_counter()
+        agent.process_expense_batch(expenses, mode=mode)
+        elapsed = time.perf_counter() - started
+        after = agent.usage_snapshot()
+        print(
+            f"{mode:<10}{after['kickoffs'] - before['kickoffs']:>9}"
+            f"{after['prompt_tokens'] - before['prompt_tokens']:>12}"
+            f"{after['completion_tokens'] - before['completion_tokens']:>12}"
+            f"{elapsed:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--expenses", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=3000, help="Prompt token budget per chunk")
+    parser.add_argument("--overhead", type=int, default=600, help="Fixed prompt tokens per call")
+    parser.add_argument("--base-latency", type=float, default=1.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        run_live(args)
+    else:
+        run_simulated(args)
+
+
+if __name__ == "__main__":
+    main()
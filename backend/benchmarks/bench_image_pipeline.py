@@ -0,0 +1,140 @@
+"""
+Compare the legacy two-decode image path with the single-decode pipeline.
+
+Run from the backend directory:
+    python -m benchmarks.bench_image_pipeline [--iterations 5] [--size 4000]
+
+Each variant runs in a fresh process so peak RSS is measured in isolation.
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import time
+
+from PIL import Image, ImageDraw
+
+from src.utils.image_pipeline import process_image
+
+
+def legacy_upload_path(image_data: bytes, max_size: int = 1024) -> bytes:
+    """The validate_image + optimize_image sequence S3Helper used previously"""
+    image = Image.open(io.BytesIO(image_data))
+    if image.format not in ["PNG", "JPEG", "JPG"]:
+        raise ValueError(image.format)
+    width, height = image.size
+    if width > 4000 or height > 4000:
+        raise ValueError("too large")
+
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    ):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+
+    width, height = image.size
+    if width > max_size or height > max_size:
+        ratio = min(max_size / width, max_size / height)
+        new_size = (int(width * ratio), int(height * ratio))
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def pipeline_upload_path(image_data: bytes, max_size: int = 1024) -> bytes:
+    processed = process_image(image_data, max_size=max_size)
+    if not processed.is_valid:
+        raise ValueError(processed.error)
+    return processed.data
+
+
+VARIANTS = {"legacy": legacy_upload_path, "pipeline": pipeline_upload_path}
+
+
+def make_input(image_format: str, size: int) -> bytes:
+    """Draw a receipt-like page: rows of dark text blocks on lightly noisy paper"""
+    paper = Image.effect_noise((size, size), 8).point(lambda v: 215 + v // 8)
+    image = Image.merge("RGB", (paper, paper, paper))
+    draw = ImageDraw.Draw(image)
+    line_height = max(8, size // 80)
+    for row, top in enumerate(range(line_height, size - line_height, line_height * 2)):
+        width = size // 3 + (row * 97) % (size // 2)
+        draw.rectangle((size // 10, top, size // 10 + width, top + line_height), fill=(30, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+
+def _peak_rss_kb() -> int:
+    # VmHWM belongs to the current address space; ru_maxrss can carry over
+    # the parent's peak across fork/exec
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_variant(name, image_data, iterations, queue):
+    baseline_kb = _peak_rss_kb()
+    func = VARIANTS[name]
+    start_cpu = time.process_time()
+    start_wall = time.perf_counter()
+    try:
+        for _ in range(iterations):
+            output = func(image_data)
+    except Exception as e:
+        queue.put({"error": str(e)})
+        return
+    queue.put(
+        {
+            "cpu_ms": (time.process_time() - start_cpu) * 1000 / iterations,
+            "wall_ms": (time.perf_counter() - start_wall) * 1000 / iterations,
+            "peak_rss_delta_mb": (_peak_rss_kb() - baseline_kb) / 1024,
+            "output_bytes": len(output),
+        }
+    )
+
+
+def measure(name: str, image_data: bytes, iterations: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_variant, args=(name, image_data, iterations, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--size", type=int, default=4000)
+    args = parser.parse_args()
+
+    print(f"{'input':<12}{'variant':<10}{'cpu ms':>10}{'wall ms':>10}{'peak MB':>10}{'out KB':>10}")
+    for image_format in ("JPEG", "PNG"):
+        image_data = make_input(image_format, args.size)
+        label = f"{image_format} {len(image_data) // 1024}KB"
+        for name in VARIANTS:
+            r = measure(name, image_data, args.iterations)
+            if "error" in r:
+                print(f"{label:<12}{name:<10}  failed: {r['error']}")
+                continue
+            print(
+                f"{label:<12}{name:<10}{r['cpu_ms']:>10.1f}{r['wall_ms']:>10.1f}"
+                f"{r['peak_rss_delta_mb']:>10.1f}{r['output_bytes'] / 1024:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Memory and serialization cost of expense listings as dicts vs slotted models.
+
+Run from the backend directory:
+    python -m benchmarks.bench_models [--expenses 1000,10000,100000]
+
+"dict" builds each expense as nested dicts and serializes it the way the API
+and prompts used to: jsonable_encoder + json.dumps for responses and
+json.dumps(indent=2) for prompts. "model" builds Expense/Member dataclasses
+and serializes them with orjson, as CompactJSONResponse and to_json do.
+Memory is the traced allocation of the built list.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+
+from src.models.splitwise import Expense, Member
+from src.utils.serialization import to_json, to_json_bytes
+
+
+def dict_expenses(count):
+    return [
+        {
+            "id": expense_id,
+            "description": f"Expense {expense_id}",
+            "amount": float(expense_id % 300),
+            "date": "2024-05-01T19:00:00Z",
+            "created_by": {"id": expense_id % 10, "name": f"member{expense_id % 10}"},
+        }
+        for expense_id in range(count)
+    ]
+
+
+def model_expenses(count):
+    return [
+        Expense(
+            expense_id,
+            f"Expense {expense_id}",
+            float(expense_id % 300),
+            "2024-05-01T19:00:00Z",
+            Member(expense_id % 10, f"member{expense_id % 10}"),
+        )
+        for expense_id in range(count)
+    ]
+
+
+def traced(build, count):
+    tracemalloc.start()
+    records = build(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, records
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--expenses", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'expenses':>9}{'kind':>7}{'memory MB':>11}{'response ms':>13}"
+        f"{'prompt ms':>11}{'prompt KB':>11}"
+    )
+    for count in (int(value) for value in args.expenses.split(",")):
+        memory, records = traced(dict_expenses, count)
+        response, _ = best_of(
+            args.repeat,
+            lambda: json.dumps({"data": jsonable_encoder(records)}).encode(),
+        )
+        prompt_time, prompt = best_of(
+            args.repeat, lambda: json.dumps(records, indent=2)
+        )
+        print(
+            f"{count:>9}{'dict':>7}{memory / 2**20:>11.1f}{response * 1000:>13.1f}"
+            f"{prompt_time * 1000:>11.1f}{len(prompt) / 1024:>11.0f}"
+        )
+
+        memory, records = traced(model_expenses, count)
+        response, _ = best_of(args.repeat, lambda: to_json_bytes({"data": records}))
+        prompt_time, prompt = best_of(args.repeat, lambda: to_json(records))
+        print(
+            f"{count:>9}{'model':>7}{memory / 2**20:>11.1f}{response * 1000:>13.1f}"
+            f"{prompt_time * 1000:>11.1f}{len(prompt) / 1024:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
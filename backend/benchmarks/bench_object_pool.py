@@ -0,0 +1,90 @@
+"""
+Per-request construction overhead of CrewAI objects: rebuilt vs pooled.
+
+Run from the backend directory:
+    python -m benchmarks.bench_object_pool [--requests 200]
+
+"rebuilt" mirrors the previous per-task path: a new Crew for every task and a
+new vision tool plus OpenAI client for every image task. "pooled" checks out a
+warmed crew and a leased vision tool, binds the image and returns both. No LLM
+calls are made; the numbers are the setup cost paid before each kickoff.
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Crew, Process  # noqa: E402
+from openai import OpenAI  # noqa: E402
+
+from src.agents.base_agent import BaseAgent  # noqa: E402
+from src.agents.tools import ReceiptVisionTool  # noqa: E402
+from src.utils.object_pool import ObjectPool  # noqa: E402
+
+
+class BenchAgent(BaseAgent):
+    def create_agent(self):
+        return self.create_base_agent(backstory="Benchmark agent")
+
+
+def rebuilt(agent, index):
+    task = agent.create_task(f"Read receipt {index}", "text")
+    tool = ReceiptVisionTool()
+    tool.bind_image(f"https://example.com/{index}.jpg")
+    OpenAI()  # the previous vision tool created a client per call
+    task.tools = [tool]
+    Crew(agents=[agent.agent], tasks=[task], process=Process.sequential)
+
+
+def pooled(agent, tools, index):
+    task = agent.create_task(f"Read receipt {index}", "text")
+    tool = tools.lease(task)
+    tool.bind_image(f"https://example.com/{index}.jpg")
+    task.tools = [tool]
+    with agent.crews.checkout() as crew:
+        task.agent = crew.agents[0]
+        crew.tasks = [task]
+    agent.release_task_resources([task])
+
+
+def measure(func, requests):
+    timings = []
+    for index in range(requests):
+        started = time.perf_counter()
+        func(index)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    agent = BenchAgent(name="Bench", role="Benchmark")
+    tools = ObjectPool(ReceiptVisionTool, reset=lambda tool: tool.bind_image(None))
+    agent.tool_pools.append(tools)
+    agent.agent  # both paths share the cached template agent
+
+    results = {
+        "rebuilt": measure(lambda i: rebuilt(agent, i), args.requests),
+        "pooled": measure(lambda i: pooled(agent, tools, i), args.requests),
+    }
+
+    print(f"{args.requests} requests, per-request setup before kickoff\n")
+    print(f"{'path':<10}{'median us':>12}{'p95 us':>10}{'first ms':>10}")
+    for name, timings in results.items():
+        ordered = sorted(timings)
+        print(
+            f"{name:<10}{statistics.median(ordered) * 1e6:>12.0f}"
+            f"{ordered[int(len(ordered) * 0.95)] * 1e6:>10.0f}{timings[0] * 1e3:>10.1f}"
+        )
+    print(f"\npool stats: {agent.pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Group balance and settle-up cost for groups with thousands of expenses.
+
+Run from the backend directory:
+    python -m benchmarks.bench_settlement [--members 10,30,60] [--expenses 1000,5000,20000]
+
+Each group gets synthetic expenses paid by one member and split between a
+random subset of members. "python" computes pairwise debts with a per-share
+dict loop; "numpy" is SettlementEngine on the same rows. "load" is the time to
+read the group's shares from a SQLite ExpenseStore. "cached" is a repeat
+request while the store is unchanged. Transfers is the size of the settle-up
+plan; debts is the number of non-zero pairwise debts it replaces.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from src.services.expense_sync import ExpenseStore
+from src.services.settlement import SettlementEngine
+
+
+def sample_expenses(members, count, seed=7):
+    rng = random.Random(seed)
+    expenses = []
+    for expense_id in range(1, count + 1):
+        payer = rng.randrange(members)
+        split = rng.sample(range(members), rng.randint(2, min(members, 8)))
+        cost = round(rng.uniform(5, 300), 2)
+        owed = round(cost / len(split), 2)
+        shares = {user: [0.0, owed] for user in split}
+        shares.setdefault(payer, [0.0, 0.0])[0] = cost
+        expenses.append(
+            {
+                "id": expense_id,
+                "group_id": 1,
+                "description": f"expense {expense_id}",
+                "amount": cost,
+                "currency_code": "USD",
+                "date": f"2024-01-01T00:00:{expense_id % 60:02d}Z",
+                "created_at": None,
+                "updated_at": None,
+                "deleted_at": None,
+                "created_by": {"id": payer, "name": f"member{payer}"},
+                "category": None,
+                "payment": False,
+                "shares": [
+                    {
+                        "user_id": user,
+                        "name": f"member{user}",
+                        "paid_share": paid,
+                        "owed_share": owed_share,
+                    }
+                    for user, (paid, owed_share) in shares.items()
+                ],
+            }
+        )
+    return expenses
+
+
+class RowStore:
+    """Serves preloaded shares so the compute timing excludes SQLite"""
+
+    def __init__(self, shares, names):
+        self.shares = shares
+        self.names = names
+
+    def group_shares(self, group_id):
+        return self.shares
+
+    def group_member_names(self, group_id):
+        return self.names
+
+    def data_version(self):
+        # A new version on every call, so each run recomputes
+        return object()
+
+
+def python_balances(rows):
+    by_expense = defaultdict(list)
+    for expense_id, user_id, paid, owed in rows:
+        by_expense[expense_id].append((user_id, paid - owed))
+    owes = defaultdict(float)
+    for shares in by_expense.values():
+        credit = sum(net for _, net in shares if net > 0)
+        if not credit:
+            continue
+        for debtor, debt in shares:
+            if debt >= 0:
+                continue
+            for creditor, net in shares:
+                if net > 0:
+                    owes[debtor, creditor] += -debt * net / credit
+    net_debts = {}
+    for (debtor, creditor), amount in owes.items():
+        net = amount - owes.get((creditor, debtor), 0.0)
+        if net > 0.005:
+            net_debts[debtor, creditor] = net
+    return net_debts
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", default="10,30,60")
+    parser.add_argument("--expenses", default="1000,5000,20000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'members':>8}{'expenses':>10}{'shares':>9}{'load ms':>10}"
+        f"{'python ms':>11}{'numpy ms':>10}{'cached ms':>11}{'debts':>7}"
+        f"{'transfers':>11}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for members in (int(value) for value in args.members.split(",")):
+            for count in (int(value) for value in args.expenses.split(",")):
+                store = ExpenseStore(os.path.join(directory, f"{members}-{count}.db"))
+                store.upsert_expenses(sample_expenses(members, count))
+                load, shares = best_of(args.repeat, lambda: store.group_shares(1))
+                names = store.group_member_names(1)
+                cached_engine = SettlementEngine(store)
+                cached_engine.balances(1)
+                cached, _ = best_of(args.repeat, lambda: cached_engine.balances(1))
+                store.close()
+                rows = shares["USD"]
+
+                python, debts = best_of(args.repeat, lambda: python_balances(rows))
+                engine = SettlementEngine(RowStore(shares, names))
+                vectorized, balances = best_of(args.repeat, lambda: engine.balances(1))
+                usd = balances["currencies"]["USD"]
+                assert len(usd["debts"]) == len(debts)
+                print(
+                    f"{members:>8}{count:>10}{len(rows):>9}{load * 1000:>10.1f}"
+                    f"{python * 1000:>11.1f}{vectorized * 1000:>10.1f}"
+                    f"{cached * 1000:>11.2f}{len(usd['debts']):>7}"
+                    f"{len(usd['transfers']):>11}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Measure cold start: import time of the app and time to the first healthy response.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [--runs 3] [--path /api/health] [--app-dir .]
+
+Each run starts a fresh uvicorn process and polls the probe path until it answers
+200, then polls /api/ready for up to --ready-timeout seconds. Missing credentials
+are filled with placeholders; with APP_WARMUP=true and placeholder AWS keys the
+readiness probe reports the failed bucket check instead of becoming ready.
+Point --app-dir at another checkout (e.g. a git worktree) to compare versions,
+using --path /openapi.json for trees without a health endpoint.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+PLACEHOLDER_ENV = {
+    "SPLITWISE_CONSUMER_KEY": "benchmark",
+    "SPLITWISE_CONSUMER_SECRET": "benchmark",
+    "SPLITWISE_API_KEY": "benchmark",
+    "OPENAI_API_KEY": "benchmark",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "AWS_S3_BUCKET": "benchmark",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def probe(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def child_env(args, workdir):
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env["APP_WARMUP"] = args.warmup
+    # Keep the SQLite stores out of the source tree
+    for name in (
+        "RECEIPT_JOB_DB_PATH",
+        "RECEIPT_CACHE_DB_PATH",
+        "SPLITWISE_CACHE_DB_PATH",
+        "EXPENSE_STORE_DB_PATH",
+    ):
+        env[name] = os.path.join(workdir, name.lower() + ".db")
+    return env
+
+
+def import_time(args, workdir):
+    code = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.abspath(args.app_dir),
+        env=child_env(args, workdir),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def cold_start(args, workdir):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--app-dir", os.path.abspath(args.app_dir),
+            "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=workdir,
+        env=child_env(args, workdir),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        healthy = ready = None
+        deadline = started + args.timeout
+        while time.perf_counter() < deadline:
+            if probe(base + args.path) == 200:
+                healthy = time.perf_counter() - started
+                break
+            if server.poll() is not None:
+                raise RuntimeError("Server exited before answering")
+            time.sleep(0.01)
+
+        deadline = time.perf_counter() + args.ready_timeout
+        while healthy is not None and time.perf_counter() < deadline:
+            if probe(base + "/api/ready") == 200:
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.05)
+        return healthy, ready
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def fmt(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return "n/a"
+    return f"{statistics.median(values) * 1000:.0f} ms (min {min(values) * 1000:.0f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--path", default="/api/health", help="Probe path for the first healthy response")
+    parser.add_argument("--app-dir", default=".", help="Backend directory to start")
+    parser.add_argument("--warmup", default="true", choices=["true", "false"])
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ready-timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    imports, healthy, ready = [], [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            imports.append(import_time(args, workdir))
+            first_healthy, first_ready = cold_start(args, workdir)
+            healthy.append(first_healthy)
+            ready.append(first_ready)
+
+    print(f"{args.runs} runs of {os.path.abspath(args.app_dir)} (APP_WARMUP={args.warmup})")
+    print(f"import src.main:         {fmt(imports)}")
+    print(f"first {args.path}: {fmt(healthy)}")
+    print(f"first ready /api/ready:  {fmt(ready)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Peak Python memory per receipt upload: read into bytes vs spooled file handle.
+
+Run from the backend directory:
+    python -m benchmarks.bench_upload_memory [--sizes 1,4,9]
+
+"buffered" mirrors the previous path: await file.read() followed by validation
+and optimization of the bytes. "spooled" copies the upload in chunks into a
+SpooledUpload (on disk past UPLOAD_SPOOL_MAX_MEMORY) and hands PIL the file
+handle. Uploads are noisy PNGs of roughly the given size in MB; peaks are
+measured with tracemalloc, so PIL's native decode buffers are not included.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from src.utils.image_pipeline import process_image
+from src.utils.upload_stream import spool_upload
+
+
+def noisy_png(megabytes):
+    # Random pixels barely compress, so the PNG is about 3 bytes per pixel
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def starlette_upload(data):
+    # Starlette spools multipart file parts the same way before the endpoint runs
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(spooled, size=len(data))
+
+
+async def buffered(upload):
+    contents = await upload.read()
+    return process_image(contents)
+
+
+async def spooled(upload):
+    with await spool_upload(upload) as handle:
+        return process_image(handle)
+
+
+def peak_bytes(func, data):
+    upload = starlette_upload(data)
+    tracemalloc.start()
+    try:
+        result = asyncio.run(func(upload))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        upload.file.close()
+    assert result.is_valid, result.error
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,4,9", help="Upload sizes in MB")
+    args = parser.parse_args()
+
+    print(f"{'upload MB':>10}{'buffered MB':>14}{'spooled MB':>13}")
+    for size in (float(value) for value in args.sizes.split(",")):
+        data = noisy_png(size)
+        print(
+            f"{len(data) / 2**20:>10.1f}"
+            f"{peak_bytes(buffered, data) / 2**20:>14.2f}"
+            f"{peak_bytes(spooled, data) / 2**20:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
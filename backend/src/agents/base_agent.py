@@ -1,10 +1,15 @@
 from crewai import Agent, Task, Crew, Process
+from crewai.tasks.task_output import TaskOutput
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
+from ..utils.llm_cache import LLMResponseCache
+from ..utils.object_pool import ObjectPool
 import os
 import json
 import logging
+import threading
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +19,18 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def is_json(*types: type) -> Callable[[str], bool]:
+    """Return an output validator accepting JSON values of the given types"""
+
+    def validate(text: str) -> bool:
+        try:
+            return isinstance(json.loads(text), types)
+        except (TypeError, ValueError):
+            return False
+
+    return validate
+
+
 class BaseAgent(ABC):
     """Base class for all agents in the system"""
 
@@ -23,7 +40,26 @@ class BaseAgent(ABC):
         self.goal = goal or f"Assist with {role} tasks effectively and accurately"
         self._agent = None
         self._crew = None
+        self._usage_lock = threading.Lock()
+        self._thread_usage = threading.local()
+        self.usage = {
+            "kickoffs": 0,
+            "tasks": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
         self._load_config()
+        # Warmed agent+crew pairs, one per concurrently executing task
+        self.crews = ObjectPool(
+            self._build_pooled_crew,
+            reset=self._reset_pooled_crew,
+            max_idle=self.config["max_parallel_tasks"],
+            name=f"{name} crews",
+        )
+        # Pools of per-task tools, returned once the task has executed
+        self.tool_pools: List[ObjectPool] = []
+        self.llm_cache = LLMResponseCache.from_env()
 
     def _load_config(self) -> None:
         """Load agent configuration from environment variables"""
@@ -33,6 +69,7 @@ class BaseAgent(ABC):
                 "temperature": float(os.getenv("AGENT_TEMPERATURE", "0.5")),
                 "max_iterations": int(os.getenv("AGENT_MAX_ITERATIONS", "3")),
                 "verbose": os.getenv("DEBUG", "False").lower() == "true",
+                "max_parallel_tasks": int(os.getenv("AGENT_MAX_PARALLEL_TASKS", "4")),
             }
         except ValueError as e:
             logger.error(f"Invalid configuration value: {str(e)}")
@@ -99,19 +136,107 @@ class BaseAgent(ABC):
             logger.error(f"Failed to create task: {str(e)}")
             raise Exception(f"Failed to create task: {str(e)}")
 
-    def execute_tasks(self, tasks: List[Task]) -> List[str]:
-        """Execute a sequence of tasks and return their results"""
+    def execute_tasks(
+        self,
+        tasks: List[Task],
+        parallel: bool = False,
+        max_in_flight: Optional[int] = None,
+        dependencies: Optional[Dict[int, List[int]]] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> List[str]:
+        """Execute tasks and return their results in task order
+
+        Args:
+            tasks: Tasks to execute
+            parallel: Run independent tasks concurrently, one crew per task
+            max_in_flight: Maximum concurrent tasks in parallel mode; defaults to
+                AGENT_MAX_PARALLEL_TASKS
+            dependencies: Map of task index to the indices it depends on. A task
+                starts only after its dependencies finish and receives their
+                outputs as context. Implies parallel mode.
+            validate: Check each output must pass before it is cached (parallel
+                mode, see execute_single_task)
+
+        Returns:
+            List[str]: One result per task, in the order given
+        """
         if not tasks:
             return []
 
+        if parallel or dependencies:
+            return self._execute_parallel(
+                tasks,
+                max_in_flight or self.config.get("max_parallel_tasks", 4),
+                dependencies or {},
+                validate,
+            )
+
         try:
-            crew = self.get_crew(tasks)
-            results = crew.kickoff()
+            results = self._kickoff_pooled(tasks)
             return self._handle_results(results)
         except Exception as e:
             logger.error(f"Tasks failed: {str(e)}")
             return [f"Tasks failed: {str(e)}"]
 
+    def _execute_parallel(
+        self,
+        tasks: List[Task],
+        max_in_flight: int,
+        dependencies: Dict[int, List[int]],
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> List[str]:
+        """Schedule tasks as their dependencies complete, bounded by max_in_flight"""
+        for index, deps in dependencies.items():
+            if not 0 <= index < len(tasks) or any(not 0 <= d < len(tasks) for d in deps):
+                raise ValueError(f"Invalid task dependency: {index} -> {deps}")
+
+        options = {"validate": validate} if validate is not None else {}
+        results: Dict[int, str] = {}
+        failed = set()
+        remaining = set(range(len(tasks)))
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            while remaining or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for index in sorted(remaining):
+                        deps = dependencies.get(index, [])
+                        if any(d in failed for d in deps):
+                            # Upstream failure: skip rather than run on missing context
+                            remaining.discard(index)
+                            failed.add(index)
+                            results[index] = f"Task skipped: dependency failed ({deps})"
+                            progressed = True
+                        elif len(running) < max_in_flight and all(
+                            d in results for d in deps
+                        ):
+                            remaining.discard(index)
+                            if deps:
+                                tasks[index].context = [tasks[d] for d in deps]
+                            future = executor.submit(
+                                self.execute_single_task, tasks[index], **options
+                            )
+                            running[future] = index
+
+                if not running:
+                    if remaining:
+                        raise ValueError(f"Task dependencies contain a cycle: {sorted(remaining)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        logger.error(f"Task {index} failed: {str(e)}")
+                        failed.add(index)
+                        results[index] = f"Task failed: {str(e)}"
+
+        return [results[index] for index in range(len(tasks))]
+
     @property
     def agent(self) -> Agent:
         """Get or create the CrewAI agent"""
@@ -136,22 +261,177 @@ class BaseAgent(ABC):
         )
         return crew
 
-    def execute_single_task(self, task: Task) -> str:
+    def _build_pooled_crew(self) -> Crew:
+        return Crew(
+            agents=[self.create_agent()],
+            tasks=[],
+            verbose=self.config.get("verbose", False),
+            process=Process.sequential,
+        )
+
+    def _reset_pooled_crew(self, crew: Crew) -> None:
+        crew.tasks = []
+        if hasattr(crew, "usage_metrics"):
+            crew.usage_metrics = None
+
+    def _kickoff_pooled(self, tasks: List[Task]) -> Any:
+        """Run tasks on a pooled crew, returning the crew's tools to their pools"""
+        try:
+            with self.crews.checkout() as crew:
+                # The pooled agent runs the tasks; it is never shared between threads
+                for task in tasks:
+                    task.agent = crew.agents[0]
+                crew.tasks = list(tasks)
+                # The pooled agent's LLM counts tokens for its whole lifetime
+                before = self._llm_usage(crew)
+                result = crew.kickoff()
+                self._record_usage(crew, result, len(tasks), before)
+                return result
+        finally:
+            self.release_task_resources(tasks)
+
+    def release_task_resources(self, tasks: List[Task]) -> None:
+        """Return pooled tools leased to the given tasks"""
+        for task in tasks:
+            for pool in self.tool_pools:
+                pool.release_owner(task)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return reuse counters for pooled crews and tools"""
+        return {
+            "crews": self.crews.stats(),
+            "tools": {pool.name: pool.stats() for pool in self.tool_pools},
+        }
+
+    def execute_single_task(
+        self,
+        task: Task,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> str:
         """Execute a single task and return its result
 
+        Outputs of tool-free tasks are cached by prompt, model and temperature,
+        so repeated categorization and split prompts skip the LLM call.
+
         Args:
             task: Task to be executed
+            use_cache: Set to False to always call the LLM
+            validate: Check the output must pass before it is cached, so an
+                unparseable answer is not replayed on the next identical prompt
 
         Returns:
             str: Result of the task execution
         """
+        cache_key = self._cache_key(task) if use_cache else None
+        if not use_cache:
+            self.llm_cache.record_bypass()
+        elif cache_key is not None:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                # Dependent tasks read this output as their context
+                task.output = TaskOutput(
+                    description=task.description, raw=cached, agent=self.role
+                )
+                self.release_task_resources([task])
+                self._thread_usage.metrics = {
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                }
+                return cached
+
         try:
-            crew = self.get_crew([task])
-            result = crew.kickoff()
-            return self._handle_single_result(result)
+            result = self._handle_single_result(self._kickoff_pooled([task]))
         except Exception as e:
             logger.error(f"Task execution failed: {str(e)}")
             raise Exception(f"Task execution failed: {str(e)}")
+        if cache_key is not None and (validate is None or validate(result)):
+            self.llm_cache.set(cache_key, result, self.last_usage())
+        return result
+
+    def _cache_key(self, task: Task) -> Optional[str]:
+        """Return the LLM cache key of a task, or None if it must not be cached"""
+        if getattr(task, "tools", None):
+            # Tools may have side effects or read data the prompt does not show
+            return None
+        context = getattr(task, "context", None)
+        upstream = [
+            str(getattr(getattr(t, "output", None), "raw", ""))
+            for t in (context if isinstance(context, list) else [])
+        ]
+        expected_output = getattr(task, "expected_output", "")
+        return self.llm_cache.key(
+            task.description,
+            self.config["model"],
+            self.config["temperature"],
+            extra=(self.name, self.role, expected_output, upstream),
+        )
+
+    def usage_snapshot(self) -> Dict[str, int]:
+        """Return cumulative LLM usage recorded for this agent"""
+        with self._usage_lock:
+            return dict(self.usage)
+
+    def last_usage(self) -> Dict[str, int]:
+        """Return token usage of the calling thread's most recent kickoff"""
+        return dict(getattr(self._thread_usage, "metrics", {}))
+
+    @staticmethod
+    def _usage_counts(metrics: Any) -> Dict[str, int]:
+        if metrics is not None and not isinstance(metrics, dict):
+            metrics = metrics.model_dump() if hasattr(metrics, "model_dump") else vars(metrics)
+        metrics = metrics or {}
+        return {
+            key: int(metrics.get(key) or 0)
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+
+    def _llm_usage(self, crew: Crew) -> Optional[Dict[str, int]]:
+        """Lifetime token counters of a pooled crew's LLM, if it exposes them"""
+        llm = getattr(crew.agents[0], "llm", None)
+        summary = getattr(llm, "get_token_usage_summary", None)
+        return self._usage_counts(summary()) if callable(summary) else None
+
+    def _record_usage(
+        self,
+        crew: Crew,
+        result: Any,
+        task_count: int,
+        before: Optional[Dict[str, int]] = None,
+    ) -> None:
+        after = self._llm_usage(crew) if before is not None else None
+        if after is not None:
+            # Only this kickoff's share of a reused LLM's running totals
+            metrics = {key: max(0, after[key] - before[key]) for key in after}
+        else:
+            # Newer CrewAI versions report usage on the output, older ones on the crew
+            metrics = self._usage_counts(
+                getattr(result, "token_usage", None)
+                or getattr(crew, "usage_metrics", None)
+            )
+        self.record_usage(metrics, task_count)
+
+    def record_usage(self, metrics: Dict[str, int], task_count: int = 1) -> None:
+        """
+        Count the tokens of one LLM run, including calls made outside a crew
+
+        Args:
+            metrics: prompt_tokens and completion_tokens, optionally total_tokens
+            task_count: Number of tasks the run completed
+        """
+        metrics = self._usage_counts(metrics)
+        if not metrics["total_tokens"]:
+            metrics["total_tokens"] = (
+                metrics["prompt_tokens"] + metrics["completion_tokens"]
+            )
+        self._thread_usage.metrics = metrics
+
+        with self._usage_lock:
+            self.usage["kickoffs"] += 1
+            self.usage["tasks"] += task_count
+            for key, value in metrics.items():
+                self.usage[key] += value
 
     def _remove_conflicting_params(self, kwargs):
         for param in [
@@ -1,22 +1,133 @@
 from crewai import Agent, Task
-from crewai_tools import VisionTool
-from .base_agent import BaseAgent
+from pydantic import ValidationError
+from .base_agent import BaseAgent, is_json
+from .tools import ReceiptVisionTool, stream_vision_completion, vision_completion
+from ..models.receipt import LineItem, ReceiptExtraction
+from ..services.analytics import ReceiptItemStore
+from ..services.expense_categorizer import ExpenseCategorizer
 from ..utils.s3_helper import S3Helper
-from PIL import Image
-import io
+from ..utils.cache import TieredCache, content_key
+from ..utils.json_repair import repair_json
+from ..utils.json_stream import IncrementalJSONParser
+from ..utils.image_pipeline import ImageSource, to_data_url
+from ..utils.object_pool import ObjectPool
+from ..utils.serialization import to_json
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import copy
 import json
-from typing import List, Dict, Optional, Any, Union
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Dict, Optional, Any, Tuple, Union
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Compact shape of ReceiptExtraction, kept short since it is sent with every receipt
+RECEIPT_SCHEMA_PROMPT = (
+    '{"vendor": {"name": str, "address": str|null, "phone": str|null, "category": str|null},\n'
+    ' "transaction": {"date": "YYYY-MM-DD"|null, "time": str|null, "receipt_number": str|null},\n'
+    ' "items": [{"name": str, "quantity": number, "unit_price": number|null, '
+    '"total_price": number, "category": str|null}],\n'
+    ' "summary": {"subtotal": number|null, "tax_details": [{"type": str, "amount": number}], '
+    '"discounts": [{"description": str, "amount": number}], "total": number},\n'
+    ' "payment": {"method": str|null, "card_last_4": str|null, "status": str|null}}'
+)
+
+# The image itself is bound to the vision tool, never pasted into the prompt
+RECEIPT_IMAGE_HINT = "The receipt image is available through the Receipt Vision Tool."
+
+SINGLE_PASS_INSTRUCTIONS = (
+    "Read the receipt image and return ONLY a JSON object matching this "
+    "schema, with no prose or code fences:\n"
+    f"{RECEIPT_SCHEMA_PROMPT}\n"
+    "Use numbers (not strings) for all amounts and quantities, an ISO date, "
+    "and null for anything not printed on the receipt."
+)
+
+# Constrains single-pass answers to the ReceiptExtraction shape
+RECEIPT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "receipt_extraction",
+        "schema": ReceiptExtraction.model_json_schema(),
+    },
+}
+
+# Receives (event, data) as receipt processing progresses, see stream_receipt()
+EventCallback = Callable[[str, Dict], None]
+
+EXTRACTION_COUNTERS = (
+    "receipts",
+    "llm_calls",
+    "latency_ms",
+    "prompt_tokens",
+    "completion_tokens",
+    "reprompts",
+    "repaired",
+    "failed",
+)
+
+
+@dataclass
+class PreparedReceipt:
+    """Cache keys and optimized JPEG of a receipt ready for extraction"""
+
+    raw_key: str
+    normalized_key: str = ""
+    optimized: Optional[bytes] = None
+    # Set instead of optimized when the result was already cached
+    cached: Optional[Dict] = None
+
+
+def _item_text(item: Dict) -> str:
+    return str(item.get("name") or item.get("description") or "")
+
 
 class ReceiptAgent(BaseAgent):
     """Agent responsible for processing receipt images and extracting information"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        receipt_items: Optional[ReceiptItemStore] = None,
+        categorizer: Optional[ExpenseCategorizer] = None,
+    ):
         super().__init__(
             name="Receipt Analyzer", role="Expert Receipt Analyst and Data Extractor"
         )
         self.s3_helper = S3Helper()
+        self.vision_tools = ObjectPool(
+            ReceiptVisionTool,
+            reset=lambda tool: tool.bind_image(None),
+            max_idle=self.config["max_parallel_tasks"],
+            name="vision_tools",
+        )
+        self.tool_pools.append(self.vision_tools)
+        self.extraction_mode = os.getenv("RECEIPT_EXTRACTION_MODE", "single_pass").lower()
+        if self.extraction_mode not in ("single_pass", "multi_pass"):
+            raise ValueError(f"Unsupported receipt extraction mode: {self.extraction_mode}")
+        self.extraction_stats: Dict[str, Dict] = {}
+        self._extraction_lock = threading.Lock()
+        self.image_delivery = os.getenv("RECEIPT_IMAGE_DELIVERY", "inline").lower()
+        if self.image_delivery not in ("inline", "url"):
+            raise ValueError(f"Unsupported receipt image delivery: {self.image_delivery}")
+        self.archive_enabled = os.getenv("RECEIPT_ARCHIVE_ENABLED", "true").lower() == "true"
+        self.archive_workers = int(os.getenv("RECEIPT_ARCHIVE_WORKERS", "4"))
+        self._archive_executor: Optional[ThreadPoolExecutor] = None
+        # Streamed requests decode single-pass JSON token by token when enabled
+        self.stream_tokens = os.getenv("RECEIPT_STREAM_TOKENS", "true").lower() == "true"
+        self.cache_enabled = os.getenv("RECEIPT_CACHE_ENABLED", "true").lower() == "true"
+        self.result_cache = TieredCache.from_env(
+            "RECEIPT_CACHE",
+            default_ttl=7 * 24 * 3600,
+            default_db_path="receipt_cache.db",
+        )
+        # Local fast path; only items it is unsure about go to the LLM
+        self.categorizer = categorizer or ExpenseCategorizer.from_env()
+        # Line items of extracted receipts, read by the analytics endpoints
+        self.receipt_items = receipt_items or ReceiptItemStore.from_env()
 
     def create_agent(self) -> Agent:
         # Define tools
@@ -51,122 +162,597 @@ class ReceiptAgent(BaseAgent):
             tools=tools,
         )
 
-    def process_receipt(self, image_data: bytes) -> Dict:
+    def process_receipt(self, image_data: ImageSource, use_cache: bool = True) -> Dict:
         """
         Process a receipt image and extract detailed information using GPT-4
 
+        Results are cached by a hash of the image bytes, so a retried upload of the
+        same receipt returns the earlier result and S3 URL without network calls.
+
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes, or a seekable binary file such as a
+                spooled upload, which is decoded in place without copying
+            use_cache: Whether to consult and populate the receipt result cache
 
         Returns:
-            Dict: Extracted receipt information including items, prices, and total
+            Dict: Extracted receipt information including items, prices, total and
+                the S3 image URL
         """
+        use_cache = use_cache and self.cache_enabled
         try:
-            # Upload image to S3
-            image_url = self.s3_helper.upload_image(image_data)
+            prepared = self.prepare_receipt(image_data, use_cache)
+            if prepared.cached is not None:
+                return prepared.cached
+
+            archive_error = None
+            if self.image_delivery == "inline":
+                # The model gets the bytes directly; archiving to S3 overlaps with
+                # extraction instead of preceding it
+                archive = self._archive_async(prepared.optimized)
+                result = self._extract_receipt(to_data_url(prepared.optimized))
+                image_url, archive_error = self._await_archive(archive)
+            else:
+                # Upload image to S3
+                image_url = self.s3_helper.store_image(prepared.optimized)
+                result = self._extract_receipt(image_url)
+
+            return self.complete_receipt(
+                prepared, result, image_url, archive_error, use_cache
+            )
 
-            print(f"Processing receipt with image URL: {image_url}")
-            # Create the task with the vision tool
-            text_task = self.create_receipt_task(
-                description=(
-                    "Extract all visible text from the receipt image, maintaining the original "
-                    "layout and structure as much as possible. Pay special attention to:\n"
-                    "1. Header information (vendor, date, location)\n"
-                    "2. Item listings and their format\n"
-                    "3. Footer information (totals, taxes, payment details)\n\n"
-                    f"Image URL: {image_url}"
-                ),
-                expected_output="A string containing all visible text from the receipt image",
-                vision_url=image_url,
+        except Exception as e:
+            print(e)
+            raise Exception(f"Failed to process receipt: {str(e)}")
+
+    def stream_receipt(
+        self, image_data: ImageSource, emit: EventCallback, use_cache: bool = True
+    ) -> Dict:
+        """
+        Process a receipt like process_receipt, reporting each stage as it finishes
+
+        emit(event, data) is called, possibly from other threads, with:
+        - "prepared": image validated and optimized ({"cached": bool})
+        - "uploaded": image archived to S3 ({"image_url": str})
+        - "raw_text": OCR text ready, multi-pass extraction only ({"text": str})
+        - "header": vendor or transaction parsed ({"vendor": {...}} or similar)
+        - "item": one line item parsed ({"index": int, "item": {...}})
+        - "totals": validated summary ({"summary": {...}})
+        - "result": the complete result, as process_receipt returns it
+
+        With token streaming, header and item events are sent while the model is
+        still writing; otherwise they follow the completed extraction. The
+        "result" event is authoritative if the model had to correct itself.
+
+        Args:
+            image_data: Raw image bytes or a seekable binary file
+            emit: Callback receiving (event, data)
+            use_cache: Whether to consult and populate the receipt result cache
+
+        Returns:
+            Dict: The same result sent with the "result" event
+        """
+        sent = set()
+
+        def emit_once(event: str, data: Dict) -> None:
+            sent.add(event)
+            emit(event, data)
+
+        use_cache = use_cache and self.cache_enabled
+        try:
+            prepared = self.prepare_receipt(image_data, use_cache)
+            emit("prepared", {"cached": prepared.cached is not None})
+            if prepared.cached is not None:
+                self._emit_parts(prepared.cached, emit, sent)
+                emit("result", prepared.cached)
+                return prepared.cached
+
+            archive_error = None
+            if self.image_delivery == "inline":
+                archive = self._archive_async(
+                    prepared.optimized,
+                    on_stored=lambda url: emit("uploaded", {"image_url": url}),
+                )
+                result = self._extract_receipt(
+                    to_data_url(prepared.optimized), emit_once
+                )
+                image_url, archive_error = self._await_archive(archive)
+            else:
+                image_url = self.s3_helper.store_image(prepared.optimized)
+                emit("uploaded", {"image_url": image_url})
+                result = self._extract_receipt(image_url, emit_once)
+
+            self._emit_parts(result, emit, sent)
+            data = self.complete_receipt(
+                prepared, result, image_url, archive_error, use_cache
+            )
+            emit("result", data)
+            return data
+
+        except Exception as e:
+            logger.error(f"Streamed receipt processing failed: {str(e)}")
+            raise Exception(f"Failed to process receipt: {str(e)}")
+
+    @staticmethod
+    def _emit_parts(result: Dict, emit: EventCallback, sent: set) -> None:
+        """Emit the header, items and totals of a result not yet streamed"""
+        if "header" not in sent:
+            for key in ("vendor", "transaction"):
+                if result.get(key):
+                    emit("header", {key: result[key]})
+        if "item" not in sent:
+            for index, item in enumerate(result.get("items") or []):
+                emit("item", {"index": index, "item": item})
+        emit("totals", {"summary": result.get("summary")})
+
+    def prepare_receipt(
+        self, image_data: ImageSource, use_cache: bool = True
+    ) -> PreparedReceipt:
+        """
+        Validate and optimize a receipt image, consulting the result cache
+
+        First stage of process_receipt, exposed so batch ingestion can run the
+        optimize, upload and extraction stages with separate concurrency.
+
+        Args:
+            image_data: Raw image bytes or a seekable binary file
+            use_cache: Whether to consult the receipt result cache
+
+        Returns:
+            PreparedReceipt: Cache keys and optimized JPEG, or the cached result
+
+        Raises:
+            ValueError: If the image is invalid or cannot be optimized
+        """
+        use_cache = use_cache and self.cache_enabled
+        raw_key = content_key(image_data, "raw")
+        if use_cache:
+            cached = self.result_cache.get(raw_key)
+            if cached is not None:
+                return PreparedReceipt(raw_key, cached=self._cached_result(cached))
+
+        # Validate and optimize locally; the optimized JPEG is the normalized form
+        optimized = self.s3_helper.prepare_image(image_data)
+        normalized_key = content_key(optimized, "jpeg")
+        if use_cache:
+            cached = self.result_cache.get(normalized_key)
+            if cached is not None:
+                self.result_cache.set(raw_key, cached)
+                return PreparedReceipt(
+                    raw_key, normalized_key, cached=self._cached_result(cached)
+                )
+        return PreparedReceipt(raw_key, normalized_key, optimized)
+
+    def complete_receipt(
+        self,
+        prepared: PreparedReceipt,
+        result: Dict,
+        image_url: Optional[str],
+        archive_error: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> Dict:
+        """
+        Cache and record a successful extraction and attach the archived image URL
+
+        Args:
+            prepared: Output of prepare_receipt
+            result: Output of the LLM extraction
+            image_url: S3 URL of the archived image, if any
+            archive_error: Error of a failed archive upload, if any
+            use_cache: Whether to populate the receipt result cache
+
+        Returns:
+            Dict: Extracted receipt information with the S3 image URL
+        """
+        use_cache = use_cache and self.cache_enabled
+        if use_cache and "error" not in result and archive_error is None:
+            data = {key: value for key, value in result.items() if key != "extraction"}
+            entry = {"data": data, "image_url": image_url}
+            self.result_cache.set(prepared.normalized_key, entry)
+            self.result_cache.set(prepared.raw_key, entry)
+        if "error" not in result:
+            try:
+                self.receipt_items.add_receipt(
+                    prepared.normalized_key or prepared.raw_key, result
+                )
+            except Exception as e:
+                logger.warning(f"Failed to record receipt items: {str(e)}")
+
+        if archive_error is not None:
+            return {**result, "image_url": None, "archive_error": archive_error}
+        return {**result, "image_url": image_url}
+
+    def _archive_async(
+        self, image_data: bytes, on_stored: Optional[Callable[[str], None]] = None
+    ) -> Optional[Future]:
+        if not self.archive_enabled:
+            return None
+        if self._archive_executor is None:
+            with self._extraction_lock:
+                if self._archive_executor is None:
+                    self._archive_executor = ThreadPoolExecutor(
+                        max_workers=self.archive_workers, thread_name_prefix="receipt-archive"
+                    )
+        if on_stored is None:
+            return self._archive_executor.submit(self.s3_helper.store_image, image_data)
+
+        def store_and_notify() -> str:
+            # Notify from the upload thread, before the future resolves
+            url = self.s3_helper.store_image(image_data)
+            on_stored(url)
+            return url
+
+        return self._archive_executor.submit(store_and_notify)
+
+    def _await_archive(self, archive: Optional[Future]) -> Tuple[Optional[str], Optional[str]]:
+        """Return (image_url, error) once the background upload finishes"""
+        if archive is None:
+            return None, None
+        try:
+            return archive.result(), None
+        except Exception as e:
+            # The extraction already succeeded; report the failed upload instead
+            logger.error(f"Receipt archive upload failed: {str(e)}")
+            return None, str(e)
+
+    def _cached_result(self, entry: Dict) -> Dict:
+        # Copy so callers cannot mutate the cached entry; the stored extraction
+        # metadata describes the original run, not this lookup
+        result = copy.deepcopy(entry["data"])
+        result["extraction"] = {"cached": True, "llm_calls": 0}
+        return {**result, "image_url": entry["image_url"]}
+
+    def extract_receipt(self, image_url: str) -> Dict:
+        """
+        Extract receipt information from an already prepared image
+
+        Args:
+            image_url: Public URL or base64 data URL of the receipt image
+
+        Returns:
+            Dict: Extracted receipt information with extraction metadata
+        """
+        return self._extract_receipt(image_url)
+
+    def _extract_receipt(self, image_url: str, emit: Optional[EventCallback] = None) -> Dict:
+        """
+        Run the configured LLM extraction pipeline against an uploaded receipt image
+
+        Args:
+            image_url: Public URL or base64 data URL of the receipt image
+            emit: Progress callback; enables streamed extraction where supported
+
+        Returns:
+            Dict: Structured receipt data, or a partial result with an error key,
+                plus extraction metadata (mode, LLM calls, latency and tokens)
+        """
+        mode = self.extraction_mode
+        run = {
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "reprompts": 0,
+            "repaired": False,
+            "failed": False,
+            "streamed": False,
+        }
+        started = time.perf_counter()
+        if mode == "single_pass":
+            result = self._extract_single_pass(image_url, run, emit)
+        else:
+            result = self._extract_multi_pass(image_url, run, emit)
+
+        metadata = {
+            "mode": mode,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            **run,
+        }
+        self._record_extraction(metadata)
+        return {**result, "extraction": metadata}
+
+    def _run_extraction_task(self, task: Task, run: Dict) -> str:
+        # The vision tool calls the model itself, outside the crew's token count
+        tool_usage: Dict[str, int] = {}
+        for tool in task.tools or []:
+            if isinstance(tool, ReceiptVisionTool):
+                tool.bind_image(tool.image_url, usage=tool_usage)
+        result = self.execute_single_task(task)
+        usage = self.last_usage()
+        run["llm_calls"] += 1
+        run["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        run["completion_tokens"] += usage.get("completion_tokens", 0)
+        if tool_usage:
+            self._record_vision_usage(tool_usage, run)
+        return result
+
+    def _vision_extraction(self, prompt: str, image_url: str, run: Dict) -> str:
+        """Send a schema-constrained extraction prompt straight to the vision model"""
+        usage: Dict[str, int] = {}
+        response = vision_completion(
+            prompt,
+            image_url,
+            temperature=self.config["temperature"],
+            usage=usage,
+            response_format=RECEIPT_RESPONSE_FORMAT,
+        )
+        self._record_vision_usage(usage, run)
+        return response
+
+    def _record_vision_usage(self, usage: Dict[str, int], run: Dict) -> None:
+        # Direct vision calls bypass the crew, so count them towards the agent's
+        # usage here
+        self.record_usage(usage)
+        run["llm_calls"] += usage.get("calls", 1)
+        run["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        run["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    def _extract_single_pass(
+        self, image_url: str, run: Dict, emit: Optional[EventCallback] = None
+    ) -> Dict:
+        """
+        Extract receipt data with one vision call returning schema-shaped JSON
+
+        The response is repaired locally and validated against ReceiptExtraction;
+        only if that fails is the model asked once more to correct its output.
+
+        Args:
+            image_url: Public URL or base64 data URL of the receipt image
+            run: Per-extraction counters updated with each LLM call
+            emit: Progress callback; with RECEIPT_STREAM_TOKENS the first call is
+                streamed and header fields and items are emitted as decoded
+
+        Returns:
+            Dict: Validated receipt data, or a partial result with an error key
+        """
+        if emit is not None and self.stream_tokens:
+            response = self._stream_extraction(image_url, run, emit)
+        else:
+            response = self._vision_extraction(SINGLE_PASS_INSTRUCTIONS, image_url, run)
+        try:
+            return self._validate_extraction(response, run)
+        except (json.JSONDecodeError, ValidationError) as e:
+            error = e
+
+        # One re-prompt, quoting the validation errors, before giving up
+        run["reprompts"] += 1
+        correction = (
+            "Your previous answer could not be used as receipt data:\n"
+            f"{self._describe_error(error)}\n\n"
+            f"Previous answer:\n{response[:4000]}\n\n"
+            "Read the receipt image again and return ONLY the corrected JSON "
+            "object matching this schema:\n"
+            f"{RECEIPT_SCHEMA_PROMPT}"
+        )
+        try:
+            response = self._vision_extraction(correction, image_url, run)
+            return self._validate_extraction(response, run)
+        except Exception as e:
+            logger.warning(f"Single-pass receipt extraction failed: {str(e)}")
+            run["failed"] = True
+            return {
+                "raw_text": response,
+                "error": "Failed to parse receipt data",
+                "items": [],
+                "summary": {"total": 0.0},
+            }
+
+    def _stream_extraction(self, image_url: str, run: Dict, emit: EventCallback) -> str:
+        """
+        Run the single-pass prompt with token streaming, emitting parsed parts
+
+        Vendor and transaction are emitted as "header" events and each line item
+        as an "item" event the moment its JSON closes, long before the response
+        is complete.
+
+        Returns:
+            str: The full response text, validated by the caller as usual
+        """
+        parser = IncrementalJSONParser(stream_arrays=("items",))
+        usage: Dict[str, int] = {}
+        chunks = []
+        items = 0
+        for text in stream_vision_completion(
+            SINGLE_PASS_INSTRUCTIONS,
+            image_url,
+            temperature=self.config["temperature"],
+            usage=usage,
+            response_format=RECEIPT_RESPONSE_FORMAT,
+        ):
+            chunks.append(text)
+            for event in parser.feed(text):
+                if event.element and isinstance(event.value, dict):
+                    item = self._normalize_item(event.value)
+                    emit("item", {"index": items, "item": item})
+                    items += 1
+                elif event.key in ("vendor", "transaction"):
+                    emit("header", {event.key: event.value})
+
+        self._record_vision_usage(usage, run)
+        run["streamed"] = True
+        return "".join(chunks)
+
+    @staticmethod
+    def _normalize_item(item: Dict) -> Dict:
+        try:
+            return LineItem.model_validate(item).model_dump()
+        except ValidationError:
+            return item
+
+    def _validate_extraction(self, response: str, run: Dict) -> Dict:
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            data = repair_json(response)
+            run["repaired"] = True
+        return ReceiptExtraction.model_validate(data).model_dump()
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        if isinstance(error, ValidationError):
+            return "\n".join(
+                f"- {'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+                for item in error.errors()[:20]
+            )
+        return f"- invalid JSON: {str(error)}"
+
+    def _record_extraction(self, metadata: Dict) -> None:
+        with self._extraction_lock:
+            stats = self.extraction_stats.setdefault(
+                metadata["mode"], dict.fromkeys(EXTRACTION_COUNTERS, 0)
             )
+            stats["receipts"] += 1
+            for key in ("llm_calls", "latency_ms", "prompt_tokens", "completion_tokens", "reprompts"):
+                stats[key] += metadata[key]
+            stats["repaired"] += int(metadata["repaired"])
+            stats["failed"] += int(metadata["failed"])
+
+    def extraction_summary(self) -> Dict:
+        """
+        Summarize extraction cost per mode and the savings of single-pass mode
 
-            # Extract raw text using a crew
-            raw_text = self.execute_single_task(text_task)
-            print(raw_text)
+        Returns:
+            Dict: Per-mode totals and per-receipt averages, and, once both modes
+                have run, single-pass savings relative to multi-pass
+        """
+        with self._extraction_lock:
+            modes = {mode: dict(stats) for mode, stats in self.extraction_stats.items()}
+
+        for stats in modes.values():
+            count = stats["receipts"] or 1
+            stats["avg_llm_calls"] = round(stats["llm_calls"] / count, 2)
+            stats["avg_latency_ms"] = round(stats["latency_ms"] / count, 1)
+            stats["avg_tokens"] = round(
+                (stats["prompt_tokens"] + stats["completion_tokens"]) / count, 1
+            )
+            stats["latency_ms"] = round(stats["latency_ms"], 1)
+
+        summary = {"mode": self.extraction_mode, "modes": modes}
+        single, multi = modes.get("single_pass"), modes.get("multi_pass")
+        if single and multi:
+            summary["single_pass_savings"] = {
+                key: round(multi[key] - single[key], 2)
+                for key in ("avg_llm_calls", "avg_latency_ms", "avg_tokens")
+            }
+        return summary
 
-            # Format the raw text nicely
-            raw_text_formatted = raw_text.strip()
+    def _extract_multi_pass(
+        self, image_url: str, run: Dict, emit: Optional[EventCallback] = None
+    ) -> Dict:
+        """
+        Extract receipt data with separate OCR and analysis calls
 
-            # Detailed analysis task
-            analysis_task = self.create_receipt_task(
+        Args:
+            image_url: Public URL or base64 data URL of the receipt image
+            run: Per-extraction counters updated with each LLM call
+            emit: Progress callback, sent a "raw_text" event after the OCR call
+
+        Returns:
+            Dict: Structured receipt data, or a partial result with an error key
+        """
+        print(f"Processing receipt with image: {image_url[:80]}")
+        # Create the task with the vision tool
+        text_task = self.create_receipt_task(
+            description=(
+                "Extract all visible text from the receipt image, maintaining the original "
+                "layout and structure as much as possible. Pay special attention to:\n"
+                "1. Header information (vendor, date, location)\n"
+                "2. Item listings and their format\n"
+                "3. Footer information (totals, taxes, payment details)\n\n"
+                f"{RECEIPT_IMAGE_HINT}"
+            ),
+            expected_output="A string containing all visible text from the receipt image",
+            vision_url=image_url,
+        )
+
+        # Extract raw text using a crew
+        raw_text = self._run_extraction_task(text_task, run)
+        print(raw_text)
+
+        # Format the raw text nicely
+        raw_text_formatted = raw_text.strip()
+        if emit is not None:
+            emit("raw_text", {"text": raw_text_formatted})
+
+        # Detailed analysis task
+        analysis_task = self.create_receipt_task(
+            description=(
+                "Analyze the following receipt text and extract information in JSON format:\n\n"
+                "Receipt Text:\n"
+                "```\n"
+                f"{raw_text_formatted}\n"
+                "```\n\n"
+                "Extract and structure the following information:\n"
+                "1. vendor: {name, address, phone (if available), category}\n"
+                "2. transaction: {date (ISO format), time, receipt_number}\n"
+                "3. items: [{name, quantity, unit_price, total_price, category}]\n"
+                "4. summary: {subtotal, tax_details: [{type, amount}], discounts: [{description, amount}], total}\n"
+                "5. payment: {method, card_last_4 (if available), status}\n"
+                "\nEnsure all numerical values are formatted as numbers, not strings."
+            ),
+            expected_output=(
+                "A JSON object containing structured receipt data with vendor, transaction, "
+                "items, summary, and payment information"
+            ),
+            vision_url=image_url,
+        )
+
+        try:
+            # Execute analysis and parse result using a crew
+            result = self._run_extraction_task(analysis_task, run)
+            parsed_result = json.loads(result)
+            print(parsed_result)
+
+            # Validate and standardize dates
+            if "transaction" in parsed_result and parsed_result["transaction"].get(
+                "date"
+            ):
+                try:
+                    # Ensure date is in ISO format
+                    date = datetime.fromisoformat(
+                        parsed_result["transaction"]["date"]
+                    )
+                    parsed_result["transaction"]["date"] = date.isoformat()
+                except ValueError:
+                    pass  # Keep original format if parsing fails
+
+            return parsed_result
+
+        except json.JSONDecodeError:
+            # Fallback task for unstructured response
+            fallback_task = self.create_receipt_task(
                 description=(
-                    "Analyze the following receipt text and extract information in JSON format:\n\n"
-                    "Receipt Text:\n"
-                    "```\n"
-                    f"{raw_text_formatted}\n"
-                    "```\n\n"
-                    "Extract and structure the following information:\n"
-                    "1. vendor: {name, address, phone (if available), category}\n"
-                    "2. transaction: {date (ISO format), time, receipt_number}\n"
-                    "3. items: [{name, quantity, unit_price, total_price, category}]\n"
-                    "4. summary: {subtotal, tax_details: [{type, amount}], discounts: [{description, amount}], total}\n"
-                    "5. payment: {method, card_last_4 (if available), status}\n"
-                    "\nEnsure all numerical values are formatted as numbers, not strings."
+                    "The previous analysis returned unstructured data. Please analyze this text "
+                    "and return ONLY a valid JSON object with the following structure:\n"
+                    '{ "vendor": { "name": string },\n'
+                    '  "items": [{ "name": string, "total_price": number }],\n'
+                    '  "summary": { "total": number },\n'
+                    '  "error": "Partial extraction only" }'
                 ),
                 expected_output=(
-                    "A JSON object containing structured receipt data with vendor, transaction, "
-                    "items, summary, and payment information"
+                    "A simplified JSON object containing basic receipt information with vendor "
+                    "name, items, and total"
                 ),
                 vision_url=image_url,
             )
 
             try:
-                # Execute analysis and parse result using a crew
-                result = self.execute_single_task(analysis_task)
-                parsed_result = json.loads(result)
-                print(parsed_result)
-
-                # Validate and standardize dates
-                if "transaction" in parsed_result and parsed_result["transaction"].get(
-                    "date"
-                ):
-                    try:
-                        # Ensure date is in ISO format
-                        date = datetime.fromisoformat(
-                            parsed_result["transaction"]["date"]
-                        )
-                        parsed_result["transaction"]["date"] = date.isoformat()
-                    except ValueError:
-                        pass  # Keep original format if parsing fails
-
-                return parsed_result
-
-            except json.JSONDecodeError:
-                # Fallback task for unstructured response
-                fallback_task = self.create_receipt_task(
-                    description=(
-                        "The previous analysis returned unstructured data. Please analyze this text "
-                        "and return ONLY a valid JSON object with the following structure:\n"
-                        '{ "vendor": { "name": string },\n'
-                        '  "items": [{ "name": string, "total_price": number }],\n'
-                        '  "summary": { "total": number },\n'
-                        '  "error": "Partial extraction only" }'
-                    ),
-                    expected_output=(
-                        "A simplified JSON object containing basic receipt information with vendor "
-                        "name, items, and total"
-                    ),
-                    vision_url=image_url,
-                )
-
-                try:
-                    fallback_result = self.execute_single_task(fallback_task)
-                    return json.loads(fallback_result)
-                except:
-                    return {
-                        "raw_text": raw_text,
-                        "error": "Failed to parse receipt data",
-                        "items": [],
-                        "summary": {"total": 0.0},
-                    }
-
-        except Exception as e:
-            print(e)
-            raise Exception(f"Failed to process receipt: {str(e)}")
+                run["reprompts"] += 1
+                fallback_result = self._run_extraction_task(fallback_task, run)
+                return json.loads(fallback_result)
+            except:
+                run["failed"] = True
+                return {
+                    "raw_text": raw_text,
+                    "error": "Failed to parse receipt data",
+                    "items": [],
+                    "summary": {"total": 0.0},
+                }
 
     def categorize_items(self, items: List[Dict]) -> List[Dict]:
         """
-        Categorize receipt items and add expense categories using GPT-4
+        Categorize receipt items and add expense categories
+
+        Items the local categorizer is confident about are categorized without
+        an LLM call; the rest are sent to GPT-4 in one task.
 
         Args:
             items: List of items from receipt
@@ -177,23 +763,84 @@ class ReceiptAgent(BaseAgent):
         if not items:
             return items
 
-        categorization_task = self.create_receipt_task(
+        categorized, pending = self._categorize_locally(items)
+        if not pending:
+            return categorized
+
+        try:
+            result = self.execute_single_task(
+                self._categorization_task(pending), validate=is_json(list)
+            )
+        except Exception as e:
+            result = e
+        return self._merge_categorization(categorized, pending, result)
+
+    def _categorize_locally(
+        self, items: List[Dict]
+    ) -> Tuple[List[Optional[Dict]], List[Dict]]:
+        """Split items into locally categorized ones (None if unsure) and unsure ones"""
+        categorized: List[Optional[Dict]] = []
+        pending = []
+        for item in items:
+            prediction = self.categorizer.categorize(_item_text(item))
+            if prediction is None:
+                categorized.append(None)
+                pending.append(item)
+            else:
+                categorized.append(
+                    {
+                        **item,
+                        "expense_category": prediction.category,
+                        "categorized_by": prediction.source,
+                    }
+                )
+        return categorized, pending
+
+    def _merge_categorization(
+        self,
+        categorized: List[Optional[Dict]],
+        pending: List[Dict],
+        result: Union[str, Exception],
+    ) -> List[Dict]:
+        """Fill the unsure slots with the LLM's answers and learn from them"""
+        answers = self._parse_categorization(pending, result)
+        merged = []
+        next_answer = 0
+        for item in categorized:
+            if item is None:
+                # The model may drop items; keep those uncategorized
+                item = pending[next_answer]
+                if next_answer < len(answers):
+                    item = answers[next_answer]
+                    if not item.get("error"):
+                        self.categorizer.learn(
+                            _item_text(item), item.get("expense_category")
+                        )
+                next_answer += 1
+            merged.append(item)
+        return merged
+
+    def _categorization_task(self, items: List[Dict]) -> Task:
+        return self.create_receipt_task(
             description=(
                 "Analyze these receipt items and enhance them with the following information:\n"
                 "1. Add an 'expense_category' field (e.g., 'food', 'transport', 'entertainment')\n"
                 "2. Add a 'split_suggestion' field (e.g., 'personal', 'shared', 'business')\n"
                 "3. Add 'notes' field for any special considerations\n\n"
-                f"Items: {json.dumps(items, indent=2)}"
+                f"Items: {to_json(items)}"
             ),
             expected_output=(
                 "A JSON array of receipt items enhanced with expense categories, split "
                 "suggestions, and notes"
             ),
-            tools=[VisionTool()],
         )
 
+    def _parse_categorization(
+        self, items: List[Dict], result: Union[str, Exception]
+    ) -> List[Dict]:
         try:
-            result = self.execute_single_task(categorization_task)
+            if isinstance(result, Exception):
+                raise result
             categorized_items = json.loads(result)
 
             # Ensure all original fields are preserved
@@ -213,6 +860,35 @@ class ReceiptAgent(BaseAgent):
                 for item in items
             ]
 
+    def enrich_receipt(self, receipt_data: Dict) -> Dict:
+        """
+        Categorize items and suggest a split for a processed receipt
+
+        The two analyses are independent, so they run as concurrent crews and the
+        call takes about as long as the slower of the two.
+
+        Args:
+            receipt_data: Processed receipt data
+
+        Returns:
+            Dict: Receipt data with categorized items and a split suggestion
+        """
+        items = receipt_data.get("items") or []
+        categorized, pending = self._categorize_locally(items)
+        tasks = [self._split_task(receipt_data)]
+        if pending:
+            tasks.append(self._categorization_task(pending))
+
+        results = self.execute_tasks(tasks, parallel=True, validate=is_json(dict, list))
+        enriched = {**receipt_data, "split_suggestion": self._parse_split(results[0])}
+        if pending:
+            enriched["items"] = self._merge_categorization(
+                categorized, pending, results[1]
+            )
+        elif items:
+            enriched["items"] = categorized
+        return enriched
+
     def create_receipt_task(
         self,
         description: str,
@@ -238,22 +914,20 @@ class ReceiptAgent(BaseAgent):
             Exception: If task creation fails
         """
         try:
-            # Initialize task tools and context
-            task_tools = tools or []
-
-            # Add vision tool if URL is provided
-            if vision_url:
-                vision_tool = VisionTool(image_path_url=vision_url)
-                if vision_tool not in task_tools:
-                    task_tools.append(vision_tool)
-
-            # Call the parent class's create_task method with our modifications
-            return super().create_task(
+            task = super().create_task(
                 description=description,
                 expected_output=expected_output,
                 agent=agent,
-                tools=task_tools,
+                tools=list(tools or []),
             )
+
+            # Lease a warmed vision tool for this task; it returns to the pool
+            # once the task has executed
+            if vision_url:
+                vision_tool = self.vision_tools.lease(task)
+                vision_tool.bind_image(vision_url)
+                task.tools = [*(task.tools or []), vision_tool]
+            return task
         except Exception as e:
             # Log the error for debugging
             print(f"Error creating receipt task: {str(e)}")
@@ -269,23 +943,33 @@ class ReceiptAgent(BaseAgent):
         Returns:
             Dict: Split suggestions and reasoning
         """
-        split_task = self.create_receipt_task(
+        try:
+            result = self.execute_single_task(
+                self._split_task(receipt_data), validate=is_json(dict)
+            )
+        except Exception as e:
+            result = e
+        return self._parse_split(result)
+
+    def _split_task(self, receipt_data: Dict) -> Task:
+        return self.create_receipt_task(
             description=(
                 "Analyze this receipt data and suggest how to split the expense:\n"
                 "1. Determine if this is likely a personal, shared, or business expense\n"
                 "2. If shared, suggest how to split it fairly\n"
                 "3. Provide reasoning for the suggestion\n\n"
-                f"Receipt data: {json.dumps(receipt_data, indent=2)}"
+                f"Receipt data: {to_json(receipt_data)}"
             ),
             expected_output=(
                 "A JSON object containing split type (personal/shared/business), split ratios "
                 "if shared, and detailed reasoning"
             ),
-            tools=[VisionTool()],
         )
 
+    def _parse_split(self, result: Union[str, Exception]) -> Dict:
         try:
-            result = self.execute_single_task(split_task)
+            if isinstance(result, Exception):
+                raise result
             return json.loads(result)
         except Exception as e:
             return {
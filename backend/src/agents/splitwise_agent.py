@@ -1,9 +1,27 @@
 from crewai import Agent, Task
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, is_json
 from ..config.splitwise_config import get_splitwise_client
+from ..models.splitwise import (
+    Expense as ExpenseModel,
+    Friend,
+    Group,
+    as_models,
+    to_dict,
+)
+from ..services.analytics import ExpenseAnalytics, ReceiptItemStore
+from ..services.expense_analysis import BatchExpenseAnalyzer, parse_batch_response
+from ..services.expense_bulk import BulkExpenseScheduler, idempotency_marker
+from ..services.expense_categorizer import ExpenseCategorizer
+from ..services.expense_enrichment import ExpenseEnricher
+from ..services.expense_sync import ExpenseSyncEngine
+from ..services.group_summary import GroupSummaryService
+from ..services.settlement import SettlementEngine
+from ..utils.read_through_cache import ReadThroughCache
+from ..utils.serialization import to_json
 from typing import Dict, List, Optional, Any, Union, Callable
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
+import os
 
 from splitwise import Expense  # Import the Expense class
 
@@ -11,20 +29,45 @@ from splitwise import Expense  # Import the Expense class
 class SplitwiseAgent(BaseAgent):
     """Agent responsible for interacting with the Splitwise API"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        receipt_items: Optional[ReceiptItemStore] = None,
+        categorizer: Optional[ExpenseCategorizer] = None,
+    ):
         super().__init__(
             name="Splitwise Manager",
             role="Financial Transaction Manager",
             goal="Efficiently manage and organize Splitwise expenses with intelligent categorization and fair splitting",
         )
         self.splitwise = get_splitwise_client()
+        self.group_summaries = GroupSummaryService.from_env(self.splitwise)
+        self.read_cache = ReadThroughCache.from_env()
+        self.expense_sync = ExpenseSyncEngine.from_env(self.splitwise)
+        self.settlements = SettlementEngine(self.expense_sync.store)
+        # Shared with the receipt agent, which records the items
+        self.analytics = ExpenseAnalytics(
+            self.expense_sync.store, receipt_items or ReceiptItemStore.from_env()
+        )
+        self.bulk_expenses = BulkExpenseScheduler.from_env(
+            self._create_bulk_item, self._find_expense_by_key
+        )
+        self.enrichment = ExpenseEnricher.from_env(self._analyze_expense_data)
+        # A shared categorizer arrives seeded; otherwise seed one from synced
+        # history and earlier analyses
+        self.categorizer = categorizer
+        if self.categorizer is None:
+            self.categorizer = ExpenseCategorizer.from_env()
+            self.categorizer.learn_many(
+                self.expense_sync.store.categorized_descriptions()
+            )
+            self.categorizer.learn_many(self.enrichment.store.categorized())
 
     def create_agent(self) -> Agent:
         def expense(data):
             return self.create_expense(**data)
 
         def expenses(data):
-            return self.get_expenses(**data)
+            return to_json(self.get_expenses(**data))
 
         def analyze(data):
             return self._analyze_expense_data(data)
@@ -53,96 +96,170 @@ class SplitwiseAgent(BaseAgent):
         analyze: bool = False,
         receipt_data: Optional[Dict] = None,
     ) -> dict:
-        """Create a new expense in Splitwise"""
+        """
+        Create a new expense in Splitwise
+
+        With analyze or receipt_data set, the expense is queued for analysis
+        and returned as soon as Splitwise confirms it; the categories and tags
+        are available later from get_expense_enrichment.
+        """
         try:
-            expense = Expense()
-            expense.setGroupId(group_id)
-            expense.setSplitEqually(split_equally)
-            expense.setCost(amount)
-            expense.setCurrencyCode(currency_code)
-            expense.setDate(datetime.now().isoformat())
-            # expense.setReceipt(receipt_data or {})
-            expense.setDescription(description)
-            expense.setUsers(users or [])
-
-            expense, errors = self.splitwise.createExpense(expense)
-
-            if errors:
-                raise Exception(f"Failed to create expense: {errors}")
-
-            expense_data = {
-                "id": expense.getId(),
-                "description": expense.getDescription(),
-                "amount": expense.getCost(),
-                "date": expense.getDate(),
-            }
+            expense_data = self._post_expense(
+                description,
+                amount,
+                group_id=group_id,
+                split_equally=split_equally,
+                users=users,
+                currency_code=currency_code,
+            )
 
-            if analyze:
-                # Analyze the expense for better categorization and splitting
-                analysis = self._analyze_expense_data(expense_data)
-                expense_data.update(analysis)
+            self.group_summaries.invalidate(group_id)
+            self.read_cache.invalidate("expenses", "groups")
 
-            if receipt_data:
-                # Analyze the expense for better categorization and splitting
-                analysis = self._analyze_expense_data(expense_data)
-                expense_data.update(analysis)
+            if analyze or receipt_data:
+                record = self.enrichment.submit(dict(expense_data))
+                expense_data["enrichment"] = {"status": record["status"]}
 
             return expense_data
         except Exception as e:
             print(e)
             raise Exception(f"Failed to create expense: {str(e)}")
 
-    def get_groups(self) -> List[dict]:
+    def _post_expense(
+        self,
+        description: str,
+        amount: float,
+        group_id: Optional[int] = None,
+        split_equally: bool = True,
+        users: Optional[List[Dict]] = None,
+        currency_code: str = "USD",
+        date: Optional[str] = None,
+        details: Optional[str] = None,
+    ) -> dict:
+        """Send one createExpense call, letting SDK exceptions propagate"""
+        expense = Expense()
+        expense.setGroupId(group_id)
+        expense.setSplitEqually(split_equally)
+        expense.setCost(amount)
+        expense.setCurrencyCode(currency_code)
+        expense.setDate(date or datetime.now().isoformat())
+        # expense.setReceipt(receipt_data or {})
+        expense.setDescription(description)
+        expense.setUsers(users or [])
+        if details:
+            expense.setDetails(details)
+
+        expense, errors = self.splitwise.createExpense(expense)
+
+        if errors:
+            raise Exception(f"Failed to create expense: {errors}")
+
+        return self._expense_summary(expense)
+
+    @staticmethod
+    def _expense_summary(expense: Expense) -> dict:
+        return {
+            "id": expense.getId(),
+            "description": expense.getDescription(),
+            "amount": expense.getCost(),
+            "date": expense.getDate(),
+        }
+
+    def create_expenses(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create many expenses concurrently within the Splitwise rate limit
+
+        Each item takes the create_expense fields (description, amount, group_id,
+        split_equally, users, currency_code) plus an optional date and
+        idempotency_key. Items already created under the same key are reported
+        as duplicates, so a retried import never creates an expense twice.
+
+        Args:
+            items: Expenses to create
+
+        Returns:
+            Dict: Per-item results in request order and counts per status
+        """
+        try:
+            results = self.bulk_expenses.create_all(items)
+        except Exception as e:
+            raise Exception(f"Failed to create expenses: {str(e)}")
+
+        for group_id in {item.get("group_id") for item in items}:
+            self.group_summaries.invalidate(group_id)
+        self.read_cache.invalidate("expenses", "groups")
+
+        counts = {"created": 0, "duplicate": 0, "failed": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        return {"results": results, **counts}
+
+    def get_expense_enrichment(self, expense_id: int) -> Optional[dict]:
+        """Return the deferred analysis of an expense, or None if none was queued"""
+        return self.enrichment.get(expense_id)
+
+    def shutdown(self) -> None:
+        """Let queued enrichments and bulk creates finish"""
+        self.bulk_expenses.shutdown(wait=True)
+        self.enrichment.shutdown(wait=True)
+
+    def _create_bulk_item(self, item: Dict[str, Any], key: str) -> dict:
+        return self._post_expense(
+            item["description"],
+            item["amount"],
+            group_id=item.get("group_id"),
+            split_equally=item.get("split_equally", True),
+            users=item.get("users"),
+            currency_code=item.get("currency_code") or "USD",
+            date=item.get("date"),
+            details=idempotency_marker(key),
+        )
+
+    def _find_expense_by_key(self, item: Dict[str, Any], key: str) -> Optional[dict]:
+        """Look for an expense created by an earlier attempt with the same key"""
+        marker = idempotency_marker(key)
+        since = datetime.now(timezone.utc) - timedelta(days=1)
+        page_size = 100
+        offset = 0
+        while True:
+            expenses = self.splitwise.getExpenses(
+                group_id=item.get("group_id"),
+                updated_after=since.isoformat(),
+                limit=page_size,
+                offset=offset,
+            )
+            for expense in expenses:
+                if marker in (expense.getDetails() or ""):
+                    return self._expense_summary(expense)
+            if len(expenses) < page_size:
+                return None
+            offset += page_size
+
+    def get_groups(self) -> List[Group]:
         """Get all Splitwise groups for the current user"""
         try:
-            groups = self.splitwise.getGroups()
-            return [
-                {
-                    "id": group.getId(),
-                    "name": group.getName(),
-                    "members": [
-                        {
-                            "id": member.getId(),
-                            "name": member.getFirstName(),
-                            # "balance": member.getBalance(),
-                        }
-                        for member in group.getMembers()
-                    ],
-                    "created_at": group.getCreatedAt(),
-                    "total": (
-                        float(
-                            self.splitwise.getExpenses(group_id=group.getId())[
-                                0
-                            ].getCost()
-                        )
-                        if self.splitwise.getExpenses(group_id=group.getId())
-                        else 0
-                    ),
-                }
-                for group in groups
-            ]
+            groups = self.read_cache.get_or_load(
+                "groups", "all", self.group_summaries.get_groups
+            )
+            # The disk tier of the read cache returns plain dicts
+            return as_models(Group, groups)
         except Exception as e:
             raise Exception(f"Failed to get groups: {str(e)}")
 
-    def get_friends(self) -> List[dict]:
+    def get_friends(self) -> List[Friend]:
         """Get all Splitwise friends for the current user"""
         try:
-            friends = self.splitwise.getFriends()
-            return [
-                {
-                    "id": friend.getId(),
-                    "first_name": friend.getFirstName(),
-                    "last_name": friend.getLastName(),
-                    "email": friend.getEmail(),
-                }
-                for friend in friends
-            ]
+            friends = self.read_cache.get_or_load("friends", "all", self._fetch_friends)
+            return as_models(Friend, friends)
         except Exception as e:
             raise Exception(f"Failed to get friends: {str(e)}")
 
+    def _fetch_friends(self) -> List[Friend]:
+        return [Friend.from_splitwise(friend) for friend in self.splitwise.getFriends()]
+
     def get_expenses(
         self, group_id: Optional[int] = None, limit: int = 20, analyze: bool = False
-    ) -> List[dict]:
+    ) -> List[Any]:
         """
         Get recent expenses, optionally filtered by group
 
@@ -152,40 +269,182 @@ class SplitwiseAgent(BaseAgent):
             analyze: Whether to perform intelligent analysis on expenses
 
         Returns:
-            List[dict]: List of expense details with optional analysis
+            List: Expense records, or dicts with analysis fields when analyzing
         """
         try:
-            expenses = self.splitwise.getExpenses(group_id=group_id, limit=limit)
-            expense_list = [
-                {
-                    "id": expense.getId(),
-                    "description": expense.getDescription(),
-                    "amount": float(expense.getCost()),
-                    "date": expense.getDate(),
-                    # "group": (
-                    #     {
-                    #         "id": expense.getGroupId(),
-                    #         "name": expense.getGroup().getName(),
-                    #     }
-                    #     if expense.getGroupId()
-                    #     else None
-                    # ),
-                    "created_by": {
-                        "id": expense.getCreatedBy().getId(),
-                        "name": expense.getCreatedBy().getFirstName(),
-                    },
-                }
-                for expense in expenses
-            ]
+            expense_list = as_models(
+                ExpenseModel,
+                self.read_cache.get_or_load(
+                    "expenses",
+                    f"{group_id}:{limit}",
+                    lambda: self._fetch_expenses(group_id, limit),
+                ),
+            )
 
             if analyze:
                 # Process expenses in batch for efficiency
-                return self.process_expense_batch(expense_list)
+                return self.process_expense_batch(
+                    [to_dict(expense) for expense in expense_list]
+                )
             return expense_list
 
         except Exception as e:
             raise Exception(f"Failed to get expenses: {str(e)}")
 
+    def _fetch_expenses(
+        self, group_id: Optional[int], limit: int
+    ) -> List[ExpenseModel]:
+        expenses = self.splitwise.getExpenses(group_id=group_id, limit=limit)
+        return [ExpenseModel.from_splitwise(expense) for expense in expenses]
+
+    def sync_expenses(self, group_id: Optional[int] = None) -> Dict[str, Any]:
+        """Incrementally sync expenses into the local store"""
+        try:
+            return self.expense_sync.sync(group_id)
+        except Exception as e:
+            raise Exception(f"Failed to sync expenses: {str(e)}")
+
+    def get_expense_history(
+        self,
+        group_id: Optional[int] = None,
+        limit: int = 50,
+        offset: int = 0,
+        include_deleted: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Get a page of the full expense history from the local store
+
+        The store is brought up to date with an incremental sync first, unless it
+        was synced recently.
+
+        Args:
+            group_id: Optional group ID to filter expenses
+            limit: Page size
+            offset: Number of expenses to skip
+            include_deleted: Whether to include expenses deleted in Splitwise
+
+        Returns:
+            Dict: Page of expenses with the total matching count
+        """
+        try:
+            self.expense_sync.ensure_fresh(group_id)
+            return self.expense_sync.query(group_id, limit, offset, include_deleted)
+        except Exception as e:
+            raise Exception(f"Failed to get expense history: {str(e)}")
+
+    def get_group_balances(self, group_id: int) -> Dict[str, Any]:
+        """
+        Get member balances and a minimal settle-up plan for a group
+
+        Args:
+            group_id: Splitwise group ID
+
+        Returns:
+            Dict: Per-currency member totals, pairwise debts and transfers
+        """
+        try:
+            self.expense_sync.ensure_fresh(group_id)
+            return self.settlements.balances(group_id)
+        except Exception as e:
+            raise Exception(f"Failed to get group balances: {str(e)}")
+
+    def get_category_spend(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        monthly: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get total spend per category (and month) from the synced expenses
+
+        Args:
+            group_id: Optional group filter
+            start: First month to include, YYYY-MM
+            end: Last month to include, YYYY-MM
+            monthly: Break totals down by month
+
+        Returns:
+            List[Dict]: Totals and counts per category, currency and month
+        """
+        try:
+            self.expense_sync.ensure_fresh(group_id)
+            return self.analytics.spend_by_category(group_id, start, end, monthly)
+        except Exception as e:
+            raise Exception(f"Failed to get category spend: {str(e)}")
+
+    def get_member_spend(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get how much each member paid and consumed from the synced expenses
+
+        Args:
+            group_id: Optional group filter
+            start: First month to include, YYYY-MM
+            end: Last month to include, YYYY-MM
+
+        Returns:
+            List[Dict]: Paid and owed totals per member and currency
+        """
+        try:
+            self.expense_sync.ensure_fresh(group_id)
+            return self.analytics.spend_by_member(group_id, start, end)
+        except Exception as e:
+            raise Exception(f"Failed to get member spend: {str(e)}")
+
+    def get_vendor_spend(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the top vendors by spend from the synced expenses
+
+        Args:
+            group_id: Optional group filter
+            start: First month to include, YYYY-MM
+            end: Last month to include, YYYY-MM
+            limit: Maximum number of vendors
+
+        Returns:
+            List[Dict]: Totals and counts per vendor and currency
+        """
+        try:
+            self.expense_sync.ensure_fresh(group_id)
+            return self.analytics.spend_by_vendor(group_id, start, end, limit)
+        except Exception as e:
+            raise Exception(f"Failed to get vendor spend: {str(e)}")
+
+    def get_receipt_item_spend(
+        self,
+        by: str = "category",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get receipt line item totals by item category or vendor
+
+        Args:
+            by: "category" or "vendor"
+            start: First month to include, YYYY-MM
+            end: Last month to include, YYYY-MM
+            limit: Maximum number of groups
+
+        Returns:
+            List[Dict]: Totals, quantities and item counts per group
+        """
+        try:
+            return self.analytics.spend_by_receipt_item(by, start, end, limit)
+        except Exception as e:
+            raise Exception(f"Failed to get receipt item spend: {str(e)}")
+
     def create_splitwise_task(
         self,
         description: str,
@@ -234,11 +493,18 @@ class SplitwiseAgent(BaseAgent):
                     if callable(func):
                         task_tools.append(func)
 
+            # CrewAI task context only accepts other tasks, so the financial data
+            # is passed to the model as part of the description
+            if task_context:
+                description = (
+                    f"{description}\n\nContext data:\n"
+                    f"{to_json(task_context)}"
+                )
+
             # Call the parent class's create_task method with our modifications
             return super().create_task(
                 description=description,
                 expected_output=expected_output,
-                context=task_context,
                 agent=agent,
                 tools=task_tools,
             )
@@ -246,7 +512,22 @@ class SplitwiseAgent(BaseAgent):
             raise Exception(f"Failed to create Splitwise task: {str(e)}")
 
     def _analyze_expense_data(self, expense_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze expense data to provide intelligent categorization and insights"""
+        """
+        Analyze expense data to provide intelligent categorization and insights
+
+        Repeat vendors are categorized by the local categorizer without an LLM
+        call; the LLM's answers for the rest are fed back into it.
+        """
+        description = str(expense_data.get("description") or "")
+        prediction = self.categorizer.categorize(description)
+        if prediction is not None:
+            return {
+                "category": prediction.category,
+                "tags": [],
+                "categorized_by": prediction.source,
+                "confidence": prediction.confidence,
+            }
+
         analysis_task = self.create_splitwise_task(
             description=(
                 "Analyze this expense and provide the following insights:\n"
@@ -254,16 +535,19 @@ class SplitwiseAgent(BaseAgent):
                 "2. Suggested tags for better organization\n"
                 "3. Any patterns or recurring expense indicators\n"
                 "4. Budget category suggestion\n\n"
-                f"Expense data: {json.dumps(expense_data, indent=2)}"
+                f"Expense data: {to_json(expense_data)}"
             ),
             expense_data=expense_data,
         )
 
         try:
-            result = self.execute_single_task(analysis_task)
-            return json.loads(result)
+            result = self.execute_single_task(analysis_task, validate=is_json(dict))
+            analysis = json.loads(result)
         except Exception as e:
             return {"analysis_error": str(e), "category": "uncategorized", "tags": []}
+        if isinstance(analysis, dict):
+            self.categorizer.learn(description, analysis.get("category"))
+        return analysis
 
     def _suggest_split_strategy(
         self, expense_data: Dict[str, Any], group_info: Optional[Dict] = None
@@ -282,7 +566,7 @@ class SplitwiseAgent(BaseAgent):
         )
 
         try:
-            result = self.execute_single_task(split_task)
+            result = self.execute_single_task(split_task, validate=is_json(dict))
             return json.loads(result)
         except Exception as e:
             return {
@@ -291,9 +575,51 @@ class SplitwiseAgent(BaseAgent):
             }
 
     def process_expense_batch(
+        self, expenses: List[Dict[str, Any]], mode: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Process a batch of expenses with intelligent analysis
+
+        Args:
+            expenses: Expense dicts to analyze
+            mode: "batched" packs many expenses into each LLM call up to a token
+                budget; "per_task" runs one task per expense. Defaults to the
+                EXPENSE_ANALYSIS_MODE environment variable.
+
+        Returns:
+            List: Expenses with analysis fields merged in ("batched"), or the raw
+                task outputs ("per_task")
+        """
+        mode = mode or os.getenv("EXPENSE_ANALYSIS_MODE", "batched")
+        if mode == "per_task":
+            return self._process_expense_batch_per_task(expenses)
+        if mode != "batched":
+            raise ValueError(f"Unsupported expense analysis mode: {mode}")
+
+        analyzer = BatchExpenseAnalyzer(
+            self._run_batch_prompt,
+            token_budget=int(os.getenv("EXPENSE_ANALYSIS_TOKEN_BUDGET", "3000")),
+            max_retries=int(os.getenv("EXPENSE_ANALYSIS_MAX_RETRIES", "1")),
+        )
+        return analyzer.analyze(expenses)
+
+    def _run_batch_prompt(self, prompt: str, use_cache: bool = True) -> str:
+        task = self.create_splitwise_task(
+            description=prompt,
+            expected_output=(
+                "A JSON array with one analysis object per expense, each containing "
+                "id, category, tags, split_suggestion and notes"
+            ),
+        )
+        return self.execute_single_task(
+            task,
+            use_cache=use_cache,
+            validate=lambda text: bool(parse_batch_response(text)),
+        )
+
+    def _process_expense_batch_per_task(
         self, expenses: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """Process a batch of expenses with intelligent analysis"""
+    ) -> List[str]:
         tasks = [
             self.create_splitwise_task(
                 description=(
@@ -307,4 +633,5 @@ class SplitwiseAgent(BaseAgent):
             for expense in expenses
         ]
 
-        return self.execute_tasks(tasks)
+        # The per-expense tasks are independent, so run them concurrently
+        return self.execute_tasks(tasks, parallel=True)
@@ -0,0 +1,192 @@
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional, Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+
+from ..config.http_config import HTTPConfig, build_httpx_client
+
+_client_lock = threading.Lock()
+_openai_client = None
+
+
+def get_openai_client():
+    """Return the process-wide OpenAI client, reusing its connection pool"""
+    global _openai_client
+    if _openai_client is None:
+        with _client_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                config = HTTPConfig.from_env("openai")
+                _openai_client = OpenAI(
+                    http_client=build_httpx_client("openai", config),
+                    max_retries=config.max_retries,
+                )
+    return _openai_client
+
+
+def _vision_request(
+    prompt: str,
+    image_url: str,
+    model: Optional[str],
+    temperature: Optional[float],
+    max_tokens: int,
+    response_format: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    request: Dict[str, Any] = {
+        "model": model or os.getenv("VISION_MODEL", "gpt-4o-mini"),
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                ],
+            }
+        ],
+    }
+    if temperature is not None:
+        request["temperature"] = temperature
+    if response_format is not None:
+        request["response_format"] = response_format
+    return request
+
+
+def _add_usage(usage: Optional[Dict[str, int]], counts: Any) -> None:
+    if usage is None or counts is None:
+        return
+    usage["calls"] = usage.get("calls", 0) + 1
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + counts.prompt_tokens
+    usage["completion_tokens"] = (
+        usage.get("completion_tokens", 0) + counts.completion_tokens
+    )
+
+
+def vision_completion(
+    prompt: str,
+    image_url: str,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: int = 2000,
+    usage: Optional[Dict[str, int]] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Ask a vision model about an image and return its answer
+
+    Args:
+        prompt: Instructions for the model
+        image_url: Public URL or base64 data URL of the image
+        model: Vision model, VISION_MODEL by default
+        temperature: Sampling temperature, the API default if None
+        max_tokens: Maximum tokens in the answer
+        usage: Dict whose calls, prompt_tokens and completion_tokens are
+            incremented by this call
+        response_format: Optional response_format, e.g. a json_schema
+
+    Returns:
+        str: The answer text
+    """
+    response = get_openai_client().chat.completions.create(
+        **_vision_request(
+            prompt, image_url, model, temperature, max_tokens, response_format
+        )
+    )
+    _add_usage(usage, response.usage)
+    return response.choices[0].message.content or ""
+
+
+def stream_vision_completion(
+    prompt: str,
+    image_url: str,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: int = 2000,
+    usage: Optional[Dict[str, int]] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """
+    Ask a vision model about an image and yield the answer as it is decoded
+
+    Args:
+        prompt: Instructions for the model
+        image_url: Public URL or base64 data URL of the image
+        model: Vision model, VISION_MODEL by default
+        temperature: Sampling temperature, the API default if None
+        max_tokens: Maximum tokens in the answer
+        usage: Dict whose calls, prompt_tokens and completion_tokens are
+            incremented once the usage is known
+        response_format: Optional response_format, e.g. a json_schema
+
+    Yields:
+        str: Text deltas of the answer
+    """
+    stream = get_openai_client().chat.completions.create(
+        stream=True,
+        stream_options={"include_usage": True},
+        **_vision_request(
+            prompt, image_url, model, temperature, max_tokens, response_format
+        ),
+    )
+    for chunk in stream:
+        # The final chunk carries token usage and no choices
+        _add_usage(usage, chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+class VisionQuery(BaseModel):
+    query: str = Field(
+        default="Extract all visible text from the receipt image.",
+        description="What to read or describe from the receipt image",
+    )
+
+
+class ReceiptVisionTool(BaseTool):
+    """
+    Vision tool that reads the receipt image bound to the current task.
+
+    Instances are pooled and reused across tasks: bind_image() sets the only
+    per-task state and the OpenAI client is shared by every instance.
+    """
+
+    name: str = "Receipt Vision Tool"
+    description: str = (
+        "Reads the receipt image attached to this task and answers a question "
+        "about it, such as extracting all visible text."
+    )
+    args_schema: Type[BaseModel] = VisionQuery
+    model: str = Field(default_factory=lambda: os.getenv("VISION_MODEL", "gpt-4o-mini"))
+    max_tokens: int = 1500
+    # Results depend on the bound image, which is not part of the tool input
+    cache_function: Any = lambda _args=None, _result=None: False
+    _image_url: Optional[str] = PrivateAttr(default=None)
+    _usage: Optional[Dict[str, int]] = PrivateAttr(default=None)
+
+    def bind_image(
+        self, image_url: Optional[str], usage: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Bind the task's image, and a dict that collects the token usage"""
+        self._image_url = image_url
+        self._usage = usage
+
+    @property
+    def image_url(self) -> Optional[str]:
+        return self._image_url
+
+    def _run(self, query: str = VisionQuery().query, **kwargs: Any) -> str:
+        if not self._image_url:
+            return "No receipt image is attached to this task."
+        try:
+            return vision_completion(
+                query,
+                self._image_url,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                usage=self._usage,
+            )
+        except Exception as e:
+            return f"An error occurred: {str(e)}"
@@ -0,0 +1,253 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LazyProvider(Generic[T]):
+    """
+    Builds a shared component on first use instead of at import time.
+
+    Construction is guarded by a lock so concurrent first requests build the
+    component once. A failed build is remembered for readiness reporting and
+    retried on the next call.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    try:
+                        self._instance = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        logger.error(f"Failed to initialize {self.name}: {str(e)}")
+                        raise
+                    self.init_seconds = round(time.perf_counter() - started, 3)
+                    self.error = None
+                    logger.info(f"Initialized {self.name} in {self.init_seconds}s")
+        return self._instance
+
+    def peek(self) -> Optional[T]:
+        """Return the instance if already built, without building it"""
+        return self._instance
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "initialized": self.initialized,
+            "init_seconds": self.init_seconds,
+            "error": self.error,
+        }
+
+
+# Heavy modules (crewai, boto3, PIL, splitwise) are imported inside the factories
+def _build_receipt_items():
+    from ..services.analytics import ReceiptItemStore
+
+    return ReceiptItemStore.from_env()
+
+
+def _build_categorizer():
+    from ..services.expense_categorizer import ExpenseCategorizer
+    from ..services.expense_enrichment import AnnotationStore
+    from ..services.expense_sync import ExpenseStore
+
+    # Seeded with synced history and earlier analyses, so repeat vendors skip
+    # the LLM from the first request
+    categorizer = ExpenseCategorizer.from_env()
+    expenses = ExpenseStore.from_env()
+    try:
+        categorizer.learn_many(expenses.categorized_descriptions())
+    finally:
+        expenses.close()
+    annotations = AnnotationStore.from_env()
+    try:
+        categorizer.learn_many(annotations.categorized())
+    finally:
+        annotations.close()
+    return categorizer
+
+
+# Both agents share one receipt item store, where the receipt agent writes the
+# items that the Splitwise agent's analytics read, and one categorizer, so what
+# either agent learns speeds up the other
+def _build_receipt_agent():
+    from ..agents.receipt_agent import ReceiptAgent
+
+    return ReceiptAgent(
+        receipt_items=receipt_items_provider.get(),
+        categorizer=categorizer_provider.get(),
+    )
+
+
+def _build_splitwise_agent():
+    from ..agents.splitwise_agent import SplitwiseAgent
+
+    return SplitwiseAgent(
+        receipt_items=receipt_items_provider.get(),
+        categorizer=categorizer_provider.get(),
+    )
+
+
+def _build_agent_pool():
+    from ..utils.execution_pool import ExecutionPool
+
+    return ExecutionPool.from_env()
+
+
+def _build_receipt_jobs():
+    from ..services.receipt_jobs import ReceiptJobRunner
+
+    # The agent is resolved when the first job runs, not when the runner is built
+    return ReceiptJobRunner.from_env(
+        lambda image_data: receipt_agent_provider.get().process_receipt(image_data),
+        agent_pool_provider.get(),
+    )
+
+
+def _build_receipt_batch():
+    from ..services.receipt_batch import ReceiptBatchPipeline
+
+    return ReceiptBatchPipeline.from_env(
+        receipt_agent_provider.get(), agent_pool_provider.get()
+    )
+
+
+receipt_items_provider = LazyProvider("receipt_items", _build_receipt_items)
+categorizer_provider = LazyProvider("categorizer", _build_categorizer)
+receipt_agent_provider = LazyProvider("receipt_agent", _build_receipt_agent)
+splitwise_agent_provider = LazyProvider("splitwise_agent", _build_splitwise_agent)
+agent_pool_provider = LazyProvider("agent_pool", _build_agent_pool)
+receipt_jobs_provider = LazyProvider("receipt_jobs", _build_receipt_jobs)
+receipt_batch_provider = LazyProvider("receipt_batch", _build_receipt_batch)
+
+# "disabled" when components are built on first request only
+warmup_state: Dict[str, Any] = {"status": "disabled", "seconds": None}
+
+PROVIDERS = [
+    agent_pool_provider,
+    receipt_jobs_provider,
+    receipt_items_provider,
+    categorizer_provider,
+    receipt_agent_provider,
+    receipt_batch_provider,
+    splitwise_agent_provider,
+]
+
+
+def get_receipt_agent():
+    """FastAPI dependency returning the shared ReceiptAgent"""
+    return receipt_agent_provider.get()
+
+
+def get_splitwise_agent():
+    """FastAPI dependency returning the shared SplitwiseAgent"""
+    return splitwise_agent_provider.get()
+
+
+def get_agent_pool():
+    """FastAPI dependency returning the shared ExecutionPool"""
+    return agent_pool_provider.get()
+
+
+def get_receipt_jobs():
+    """FastAPI dependency returning the shared ReceiptJobRunner"""
+    return receipt_jobs_provider.get()
+
+
+def get_receipt_batch():
+    """FastAPI dependency returning the shared ReceiptBatchPipeline"""
+    return receipt_batch_provider.get()
+
+
+def built_agents() -> Dict[str, Any]:
+    """Return agents that have been built, without building the others"""
+    return {
+        provider.name: provider.peek()
+        for provider in (receipt_agent_provider, splitwise_agent_provider)
+        if provider.initialized
+    }
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Build every component and check external dependencies
+
+    Meant to run in the background after the server starts accepting
+    connections, so the first real request does not pay the build cost.
+
+    Returns:
+        Dict: Per-component status
+    """
+    warmup_state["status"] = "running"
+    started = time.perf_counter()
+    for provider in PROVIDERS:
+        try:
+            provider.get()
+        except Exception:
+            pass  # Recorded on the provider and reported by readiness
+
+    receipt_agent = receipt_agent_provider.peek()
+    if receipt_agent is not None:
+        try:
+            receipt_agent.s3_helper.check_bucket()
+        except Exception as e:
+            receipt_agent_provider.error = str(e)
+            logger.error(f"S3 bucket check failed: {str(e)}")
+    warmup_state["seconds"] = round(time.perf_counter() - started, 3)
+    warmup_state["status"] = "done"
+    return readiness()
+
+
+def readiness() -> Dict[str, Any]:
+    """Report whether warmup has finished and no component failed to build"""
+    components = {provider.name: provider.status() for provider in PROVIDERS}
+    healthy = all(status["error"] is None for status in components.values())
+    return {
+        "ready": healthy and warmup_state["status"] != "running",
+        "warmup": dict(warmup_state),
+        "components": components,
+    }
+
+
+async def drain() -> None:
+    """Wait for background receipt jobs to finish; call before shutdown()"""
+    jobs = receipt_jobs_provider.peek()
+    if jobs is not None:
+        await jobs.drain()
+
+
+def shutdown() -> None:
+    """Shut down components that were built, letting in-flight work finish"""
+    pool = agent_pool_provider.peek()
+    if pool is not None:
+        pool.shutdown(wait=True)
+    jobs = receipt_jobs_provider.peek()
+    if jobs is not None:
+        jobs.shutdown(wait=True)
+    batch = receipt_batch_provider.peek()
+    if batch is not None:
+        batch.shutdown(wait=True)
+    splitwise_agent = splitwise_agent_provider.peek()
+    if splitwise_agent is not None:
+        splitwise_agent.shutdown()
+    receipt_items = receipt_items_provider.peek()
+    if receipt_items is not None:
+        receipt_items.close()
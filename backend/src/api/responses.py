@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from src.utils.serialization import to_json_bytes
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSON response rendered by orjson; dataclass models serialize natively"""
+
+    def render(self, content: Any) -> bytes:
+        return to_json_bytes(content)
@@ -1,28 +1,285 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List, Optional
-from src.agents.receipt_agent import ReceiptAgent
-from src.agents.splitwise_agent import SplitwiseAgent
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Callable, List, Optional
+from src.api.dependencies import (
+    built_agents,
+    get_agent_pool,
+    get_receipt_agent,
+    get_receipt_batch,
+    get_receipt_jobs,
+    get_splitwise_agent,
+    readiness,
+)
+from src.api.responses import CompactJSONResponse
+from src.config.http_config import http_pool_stats
+from src.utils.serialization import to_json, to_json_bytes
+from src.utils.execution_pool import PoolSaturatedError
+from src.services.receipt_batch import BatchItem
+from src.utils.upload_stream import (
+    SpooledUpload,
+    UploadTooLarge,
+    expand_zip,
+    is_zip,
+    spool_upload,
+)
+import asyncio
+import sys
 from typing import Dict, Optional
 from pydantic import BaseModel
 
 router = APIRouter()
-receipt_agent = ReceiptAgent()
-splitwise_agent = SplitwiseAgent()
+
+
+async def run_agent_call(route: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking agent call on the execution pool, mapping saturation to 429/503"""
+    try:
+        return await get_agent_pool().run(route, func, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def listing_response(data: Any) -> CompactJSONResponse:
+    """Success envelope for large listings, serialized by orjson in one pass"""
+    # Returning the response skips FastAPI's jsonable_encoder copy of every record
+    return CompactJSONResponse({"status": "success", "data": data})
+
+
+async def read_upload(file: UploadFile) -> SpooledUpload:
+    """Spool an upload to memory or disk, mapping an oversized file to 413"""
+    try:
+        return await spool_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
 
 @router.post("/receipts/process")
-async def process_receipt(file: UploadFile = File(...)):
+async def process_receipt(
+    file: UploadFile = File(...),
+    receipt_agent=Depends(get_receipt_agent),
+):
     """
     Process a receipt image and extract information
     """
     try:
-        contents = await file.read()
-        result = receipt_agent.process_receipt(contents)
+        with await read_upload(file) as upload:
+            result = await run_agent_call(
+                "receipts", receipt_agent.process_receipt, upload
+            )
+        return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {to_json(data)}\n\n"
+
+
+@router.post("/receipts/process/stream")
+async def stream_receipt(
+    file: UploadFile = File(...),
+    receipt_agent=Depends(get_receipt_agent),
+    agent_pool=Depends(get_agent_pool),
+):
+    """
+    Process a receipt image, streaming progress as Server-Sent Events
+
+    Events: prepared, uploaded, raw_text, header, item, totals, then result, or
+    error if processing fails.
+    """
+    upload = await read_upload(file)
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Dict) -> None:
+        # Called from worker threads
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def work():
+        try:
+            # Callbacks cannot cross processes; stream from a thread of this one
+            await agent_pool.run_local(
+                "receipts", receipt_agent.stream_receipt, upload, emit
+            )
+        except PoolSaturatedError as e:
+            events.put_nowait(
+                ("error", {"detail": str(e), "retry_after": e.retry_after})
+            )
+        except Exception as e:
+            events.put_nowait(("error", {"detail": str(e)}))
+        finally:
+            upload.close()
+            events.put_nowait(None)
+
+    worker = asyncio.ensure_future(work())
+
+    async def stream():
+        while True:
+            message = await events.get()
+            if message is None:
+                break
+            yield format_sse(*message)
+        await worker
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def read_batch(files: List[UploadFile], max_files: int) -> List[BatchItem]:
+    """
+    Spool batch uploads, expanding zip archives into their files
+
+    A file that cannot be read becomes an item carrying its error, so one bad
+    receipt does not fail the batch.
+
+    Raises:
+        HTTPException: 400 if the batch holds more than max_files receipts
+    """
+    items: List[BatchItem] = []
+    try:
+        for file in files:
+            if len(items) >= max_files:
+                raise ValueError(f"Batch holds more than {max_files} receipts")
+            filename = file.filename or f"receipt-{len(items)}"
+            try:
+                # Archives may exceed the per-image limit; images are checked
+                # against it when prepared
+                upload = await spool_upload(file, max_bytes=sys.maxsize)
+            except Exception as e:
+                items.append(BatchItem(len(items), filename, error=str(e)))
+                continue
+
+            if not is_zip(upload):
+                items.append(BatchItem(len(items), filename, upload))
+                continue
+            with upload:
+                entries = await asyncio.to_thread(
+                    expand_zip, upload, max_files - len(items)
+                )
+            for name, member, error in entries:
+                items.append(BatchItem(len(items), f"{filename}/{name}", member, error))
+        return items
+    except Exception as e:
+        for item in items:
+            if item.upload is not None:
+                item.upload.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/receipts/batch")
+async def process_receipt_batch(
+    files: List[UploadFile] = File(...),
+    receipt_batch=Depends(get_receipt_batch),
+):
+    """
+    Process many receipt images or zip archives of them, streaming the results
+
+    Receipts are optimized, archived and extracted in overlapping stages. The
+    response is NDJSON: one line per receipt as soon as it finishes, then a
+    summary line.
+    """
+    items = await read_batch(files, receipt_batch.max_files)
+
+    async def lines():
+        async for line in receipt_batch.run(items):
+            yield to_json_bytes(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/receipts/enrich")
+async def enrich_receipt(receipt_data: Dict, receipt_agent=Depends(get_receipt_agent)):
+    """
+    Categorize items and suggest a split for processed receipt data
+    """
+    try:
+        result = await run_agent_call(
+            "receipts", receipt_agent.enrich_receipt, receipt_data
+        )
         return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/receipts/jobs", status_code=202)
+async def create_receipt_job(
+    file: UploadFile = File(...),
+    receipt_jobs=Depends(get_receipt_jobs),
+):
+    """
+    Queue a receipt image for background processing and return its job ID
+    """
+    upload = await read_upload(file)
+    try:
+        # The job runner owns the spooled upload and closes it when done
+        job = receipt_jobs.submit(upload)
+        return {
+            "status": "success",
+            "data": {
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/receipts/jobs/{job['id']}",
+            },
+        }
+    except PoolSaturatedError as e:
+        upload.close()
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
+        upload.close()
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/receipts/jobs/{job_id}")
+async def get_receipt_job(job_id: str, receipt_jobs=Depends(get_receipt_jobs)):
+    """
+    Get the status and result of a receipt processing job
+    """
+    job = receipt_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Receipt job not found: {job_id}")
+    return {"status": "success", "data": job}
+
+
+@router.get("/receipts/cache/stats")
+async def get_receipt_cache_stats(receipt_agent=Depends(get_receipt_agent)):
+    """
+    Get receipt result cache hit/miss counters
+    """
+    return {"status": "success", "data": receipt_agent.result_cache.stats()}
+
+
+@router.get("/receipts/batch/stats")
+async def get_receipt_batch_stats(receipt_batch=Depends(get_receipt_batch)):
+    """
+    Get per-stage concurrency and utilization of the batch pipeline
+    """
+    return {"status": "success", "data": receipt_batch.stats()}
+
+
+@router.get("/receipts/extraction/stats")
+async def get_receipt_extraction_stats(receipt_agent=Depends(get_receipt_agent)):
+    """
+    Get LLM calls, latency and tokens per receipt for each extraction mode
+    """
+    return {"status": "success", "data": receipt_agent.extraction_summary()}
+
+
 class ExpenseCreateRequest(BaseModel):
     description: str
     amount: float
@@ -32,12 +289,17 @@ class ExpenseCreateRequest(BaseModel):
 
 
 @router.post("/expenses")
-async def create_expense(request: ExpenseCreateRequest):
+async def create_expense(
+    request: ExpenseCreateRequest,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
     """
     Create a new Splitwise expense
     """
     try:
-        result = splitwise_agent.create_expense(
+        result = await run_agent_call(
+            "expenses",
+            splitwise_agent.create_expense,
             description=request.description,
             amount=request.amount,
             group_id=request.group_id,
@@ -45,41 +307,341 @@ async def create_expense(request: ExpenseCreateRequest):
             receipt_data=request.receipt_data,
         )
         return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/expenses/{expense_id}/enrichment")
+async def get_expense_enrichment(
+    expense_id: int, splitwise_agent=Depends(get_splitwise_agent)
+):
+    """
+    Get the deferred analysis (category, tags) of a created expense
+    """
+    enrichment = splitwise_agent.get_expense_enrichment(expense_id)
+    if enrichment is None:
+        raise HTTPException(
+            status_code=404, detail=f"No enrichment for expense: {expense_id}"
+        )
+    return {"status": "success", "data": enrichment}
+
+
+class BulkExpenseItem(BaseModel):
+    description: str
+    amount: float
+    group_id: Optional[int] = None
+    split_equally: bool = True
+    users: Optional[List[Dict]] = None
+    currency_code: str = "USD"
+    date: Optional[str] = None
+    idempotency_key: Optional[str] = None
+
+
+class BulkExpenseRequest(BaseModel):
+    expenses: List[BulkExpenseItem]
+
+
+@router.post("/expenses/bulk")
+async def create_expenses_bulk(
+    request: BulkExpenseRequest,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Create many Splitwise expenses, rate limited and safe to retry
+
+    Items without an idempotency_key get one derived from their content and
+    date (today if unset), so resubmitting the same request reports duplicates
+    instead of creating them.
+    """
+    try:
+        result = await run_agent_call(
+            "expenses",
+            splitwise_agent.create_expenses,
+            [item.model_dump() for item in request.expenses],
+        )
+        return {"status": "success", "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/groups")
-async def get_groups():
+async def get_groups(splitwise_agent=Depends(get_splitwise_agent)):
     """
     Get all Splitwise groups
     """
     try:
-        groups = splitwise_agent.get_groups()
-        return {"status": "success", "data": groups}
+        groups = await run_agent_call("groups", splitwise_agent.get_groups)
+        return listing_response(groups)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/groups/{group_id}/balances")
+async def get_group_balances(
+    group_id: int, splitwise_agent=Depends(get_splitwise_agent)
+):
+    """
+    Get member balances, pairwise debts and a minimal settle-up plan for a group
+    """
+    try:
+        balances = await run_agent_call(
+            "groups", splitwise_agent.get_group_balances, group_id
+        )
+        return {"status": "success", "data": balances}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/analytics/categories")
+async def get_category_analytics(
+    group_id: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    monthly: bool = True,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Get spend per category (and month) from the local expense store
+    """
+    try:
+        rows = await run_agent_call(
+            "analytics",
+            splitwise_agent.get_category_spend,
+            group_id=group_id,
+            start=start,
+            end=end,
+            monthly=monthly,
+        )
+        return {"status": "success", "data": rows}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/analytics/members")
+async def get_member_analytics(
+    group_id: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Get how much each member paid and consumed from the local expense store
+    """
+    try:
+        rows = await run_agent_call(
+            "analytics",
+            splitwise_agent.get_member_spend,
+            group_id=group_id,
+            start=start,
+            end=end,
+        )
+        return {"status": "success", "data": rows}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/analytics/vendors")
+async def get_vendor_analytics(
+    group_id: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 20,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Get the top vendors by spend from the local expense store
+    """
+    try:
+        rows = await run_agent_call(
+            "analytics",
+            splitwise_agent.get_vendor_spend,
+            group_id=group_id,
+            start=start,
+            end=end,
+            limit=limit,
+        )
+        return {"status": "success", "data": rows}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/analytics/receipt-items")
+async def get_receipt_item_analytics(
+    by: str = "category",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 50,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Get extracted receipt line item totals by item category or vendor
+    """
+    try:
+        rows = await run_agent_call(
+            "analytics",
+            splitwise_agent.get_receipt_item_spend,
+            by=by,
+            start=start,
+            end=end,
+            limit=limit,
+        )
+        return {"status": "success", "data": rows}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/friends")
-async def get_friends():
+async def get_friends(splitwise_agent=Depends(get_splitwise_agent)):
     """
     Get all Splitwise friends
     """
     try:
-        friends = splitwise_agent.get_friends()
-        return {"status": "success", "data": friends}
+        friends = await run_agent_call("friends", splitwise_agent.get_friends)
+        return listing_response(friends)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/expenses")
-async def get_expenses(group_id: Optional[int] = None, limit: int = 20):
+async def get_expenses(
+    group_id: Optional[int] = None,
+    limit: int = 20,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
     """
     Get recent Splitwise expenses
     """
     try:
-        expenses = splitwise_agent.get_expenses(group_id=group_id, limit=limit)
-        return {"status": "success", "data": expenses}
+        expenses = await run_agent_call(
+            "expenses", splitwise_agent.get_expenses, group_id=group_id, limit=limit
+        )
+        return listing_response(expenses)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/expenses/sync")
+async def sync_expenses(
+    group_id: Optional[int] = None,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Incrementally sync Splitwise expenses into the local store
+    """
+    try:
+        result = await run_agent_call(
+            "expenses", splitwise_agent.sync_expenses, group_id=group_id
+        )
+        return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/expenses/history")
+async def get_expense_history(
+    group_id: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+    include_deleted: bool = False,
+    splitwise_agent=Depends(get_splitwise_agent),
+):
+    """
+    Get paged expense history from the local store
+    """
+    try:
+        history = await run_agent_call(
+            "expenses",
+            splitwise_agent.get_expense_history,
+            group_id=group_id,
+            limit=limit,
+            offset=offset,
+            include_deleted=include_deleted,
+        )
+        return listing_response(history)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/status/pool")
+async def get_pool_status(agent_pool=Depends(get_agent_pool)):
+    """
+    Get execution pool utilization
+    """
+    return {"status": "success", "data": agent_pool.stats()}
+
+
+@router.get("/status/agents")
+async def get_agent_status():
+    """
+    Get LLM usage, response cache savings, pooled crew/tool reuse and local
+    categorizer hit rates for agents built so far
+    """
+    return {
+        "status": "success",
+        "data": {
+            name: {
+                "usage": agent.usage_snapshot(),
+                "pools": agent.pool_stats(),
+                "llm_cache": agent.llm_cache.stats(),
+                "categorizer": agent.categorizer.summary(),
+            }
+            for name, agent in built_agents().items()
+        },
+    }
+
+
+@router.get("/status/http")
+async def get_http_status():
+    """
+    Get connection pool utilization for the S3, Splitwise and OpenAI clients
+    """
+    return {"status": "success", "data": http_pool_stats()}
+
+
+@router.get("/status/cache")
+async def get_cache_status(splitwise_agent=Depends(get_splitwise_agent)):
+    """
+    Get Splitwise read cache hit/miss counters
+    """
+    return {"status": "success", "data": splitwise_agent.read_cache.stats()}
+
+
+@router.get("/health")
+async def health():
+    """
+    Liveness probe; answers as soon as the server accepts connections
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness probe; 503 until warmup finishes or if a component failed to build
+    """
+    state = readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
@@ -0,0 +1,256 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Statuses retried for idempotent requests; 429 honours Retry-After
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+@dataclass
+class HTTPConfig:
+    """Connection pool, keep-alive, timeout and retry settings for one integration"""
+
+    pool_size: int = 20
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    keepalive_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls, service: str) -> "HTTPConfig":
+        """
+        Build settings for a service from environment variables
+
+        {SERVICE}_HTTP_* variables override the shared HTTP_* defaults, e.g.
+        S3_HTTP_POOL_SIZE takes precedence over HTTP_POOL_SIZE.
+
+        Args:
+            service: Integration name, e.g. s3, splitwise or openai
+
+        Returns:
+            HTTPConfig: Settings for the service
+        """
+        defaults = cls()
+
+        def setting(name: str, default: Any) -> str:
+            return os.getenv(
+                f"{service.upper()}_HTTP_{name}", os.getenv(f"HTTP_{name}", str(default))
+            )
+
+        try:
+            return cls(
+                pool_size=int(setting("POOL_SIZE", defaults.pool_size)),
+                connect_timeout=float(setting("CONNECT_TIMEOUT", defaults.connect_timeout)),
+                read_timeout=float(setting("READ_TIMEOUT", defaults.read_timeout)),
+                max_retries=int(setting("MAX_RETRIES", defaults.max_retries)),
+                backoff_factor=float(setting("BACKOFF_FACTOR", defaults.backoff_factor)),
+                keepalive_seconds=float(setting("KEEPALIVE_SECONDS", defaults.keepalive_seconds)),
+            )
+        except ValueError as e:
+            logger.error(f"Invalid {service} HTTP configuration: {str(e)}")
+            raise ValueError(f"Invalid {service} HTTP configuration: {str(e)}")
+
+
+class PoolMetrics:
+    """In-flight and connection counters for one HTTP connection pool"""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.connection_stats: Optional[Callable[[], Dict[str, int]]] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finish(self, error: bool = False) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "max_size": self.max_size,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "utilization": round(self.in_flight / self.max_size, 4) if self.max_size else 0.0,
+                "requests": self.requests,
+                "errors": self.errors,
+            }
+        if self.connection_stats is not None:
+            try:
+                stats.update(self.connection_stats())
+            except Exception as e:
+                # Connection counters read library internals; never fail the report
+                logger.debug(f"Connection stats unavailable for {self.name}: {str(e)}")
+        return stats
+
+
+_pools: Dict[str, PoolMetrics] = {}
+_pools_lock = threading.Lock()
+
+
+def pool_metrics(name: str, max_size: int) -> PoolMetrics:
+    """Return the metrics object for a named pool, creating it on first use"""
+    with _pools_lock:
+        metrics = _pools.get(name)
+        if metrics is None:
+            metrics = _pools[name] = PoolMetrics(name, max_size)
+        return metrics
+
+
+def http_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Return utilization for every HTTP pool created so far"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: metrics.snapshot() for name, metrics in pools.items()}
+
+
+def _urllib3_connection_stats(pool_manager: Any) -> Dict[str, int]:
+    pools = list(pool_manager.pools._container.values())
+    opened = sum(pool.num_connections for pool in pools)
+    sent = sum(pool.num_requests for pool in pools)
+    return {
+        "connections_opened": opened,
+        "connections_idle": sum(pool.pool.qsize() for pool in pools if pool.pool),
+        # Share of requests served on an already open connection
+        "connection_reuse": round(1 - opened / sent, 4) if sent else 0.0,
+    }
+
+
+def build_requests_session(service: str, config: Optional[HTTPConfig] = None):
+    """
+    Build a requests Session with a sized, retrying and instrumented pool
+
+    Args:
+        service: Integration name used for configuration and metrics
+        config: Settings to use instead of reading the environment
+
+    Returns:
+        requests.Session: Session to share across threads for this service
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    config = config or HTTPConfig.from_env(service)
+    metrics = pool_metrics(service, config.pool_size)
+
+    class InstrumentedAdapter(HTTPAdapter):
+        def send(self, request, timeout=None, **kwargs):
+            metrics.start()
+            error = True
+            try:
+                response = super().send(
+                    request,
+                    timeout=timeout or (config.connect_timeout, config.read_timeout),
+                    **kwargs,
+                )
+                error = response.status_code >= 500
+                return response
+            finally:
+                metrics.finish(error=error)
+
+    adapter = InstrumentedAdapter(
+        pool_connections=4,
+        pool_maxsize=config.pool_size,
+        # Only idempotent requests are retried; POSTs fail fast to avoid duplicates
+        max_retries=Retry(
+            total=config.max_retries,
+            backoff_factor=config.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    metrics.connection_stats = lambda: _urllib3_connection_stats(adapter.poolmanager)
+    return session
+
+
+def boto_client_config(service: str = "s3", config: Optional[HTTPConfig] = None):
+    """Return a botocore Config with pool size, keep-alive, timeouts and retries"""
+    from botocore.config import Config
+
+    config = config or HTTPConfig.from_env(service)
+    return Config(
+        max_pool_connections=config.pool_size,
+        connect_timeout=config.connect_timeout,
+        read_timeout=config.read_timeout,
+        tcp_keepalive=True,
+        retries={"total_max_attempts": config.max_retries + 1, "mode": "standard"},
+    )
+
+
+def instrument_boto_client(client: Any, service: str = "s3") -> Any:
+    """Record in-flight calls and connection reuse of a boto3 client"""
+    metrics = pool_metrics(service, client.meta.config.max_pool_connections)
+    client.meta.events.register("before-call", lambda **kwargs: metrics.start())
+    client.meta.events.register("after-call", lambda **kwargs: metrics.finish())
+    client.meta.events.register(
+        "after-call-error", lambda **kwargs: metrics.finish(error=True)
+    )
+    metrics.connection_stats = lambda: _urllib3_connection_stats(
+        client._endpoint.http_session._manager
+    )
+    return client
+
+
+def build_httpx_client(service: str = "openai", config: Optional[HTTPConfig] = None):
+    """
+    Build an httpx Client with sized keep-alive pools and instrumentation
+
+    Retries are left to the caller (the OpenAI SDK retries 429 and 5xx itself).
+    """
+    import httpx
+
+    config = config or HTTPConfig.from_env(service)
+    metrics = pool_metrics(service, config.pool_size)
+
+    class InstrumentedTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            metrics.start()
+            try:
+                response = super().handle_request(request)
+            except Exception:
+                metrics.finish(error=True)
+                raise
+            metrics.finish(error=response.status_code >= 500)
+            return response
+
+    transport = InstrumentedTransport(
+        limits=httpx.Limits(
+            max_connections=config.pool_size,
+            max_keepalive_connections=config.pool_size,
+            keepalive_expiry=config.keepalive_seconds,
+        ),
+    )
+    metrics.connection_stats = lambda: {
+        "connections_open": len(transport._pool.connections),
+    }
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+    )
@@ -1,15 +1,78 @@
 from splitwise import Splitwise
+from splitwise.exception import (
+    SplitwiseBadRequestException,
+    SplitwiseException,
+    SplitwiseNotAllowedException,
+    SplitwiseNotFoundException,
+    SplitwiseUnauthorizedException,
+)
+from requests import Request
 from dotenv import load_dotenv
 import os
 
+from .http_config import build_requests_session
+
 # Load environment variables
 load_dotenv()
 
+
+class PooledSplitwise(Splitwise):
+    """
+    Splitwise client sending every request through one shared Session.
+
+    The SDK opens a new Session (and TLS connection) per call; this keeps
+    connections alive in a sized pool with timeouts and retries from
+    SPLITWISE_HTTP_* / HTTP_* settings. Response handling matches the SDK.
+    """
+
+    def __init__(self, *args, session=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = session or build_requests_session("splitwise")
+
+    # Overrides the SDK's name-mangled private request method
+    def _Splitwise__makeRequest(self, url, method="GET", data=None, auth=None, files=None):
+        headers = {}
+
+        if auth is None:
+            if self.auth:
+                auth = self.auth
+            elif self.api_key:
+                headers = {"Authorization": "Bearer {}".format(self.api_key)}
+
+        request = Request(
+            method=method, url=url, headers=headers, data=data, auth=auth, files=files
+        )
+        response = self.session.send(request.prepare())
+
+        if response.status_code == 200:
+            if response.content and hasattr(response.content, "decode"):
+                return response.content.decode("utf-8")
+            return response.content
+
+        if response.status_code == 401:
+            raise SplitwiseUnauthorizedException(
+                "Please check your token or consumer id and secret", response=response
+            )
+
+        if response.status_code == 403:
+            raise SplitwiseNotAllowedException(
+                "You are not allowed to perform this operation", response=response
+            )
+
+        if response.status_code == 400:
+            raise SplitwiseBadRequestException("Please check your request", response=response)
+
+        if response.status_code == 404:
+            raise SplitwiseNotFoundException("Required resource is not found", response)
+
+        raise SplitwiseException("Unknown error happened", response)
+
+
 def get_splitwise_client():
     """
     Create and return a configured Splitwise client instance
     """
-    return Splitwise(
+    return PooledSplitwise(
         consumer_key=os.getenv("SPLITWISE_CONSUMER_KEY"),
         consumer_secret=os.getenv("SPLITWISE_CONSUMER_SECRET"),
         api_key=os.getenv("SPLITWISE_API_KEY")
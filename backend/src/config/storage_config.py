@@ -0,0 +1,33 @@
+import os
+
+
+def data_dir() -> str:
+    """
+    Return the directory holding the app's SQLite stores, creating it if needed
+
+    APP_DATA_DIR selects it; by default it is splitwise-agent under the user's
+    data directory, so running from the source tree leaves no files behind.
+    """
+    path = os.getenv("APP_DATA_DIR")
+    if not path:
+        base = os.getenv("XDG_DATA_HOME") or os.path.join("~", ".local", "share")
+        path = os.path.join(base, "splitwise-agent")
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(path: str) -> str:
+    """
+    Resolve a configured SQLite path against the data directory
+
+    Args:
+        path: File name or path; absolute paths, ":memory:" and empty values
+            (which callers treat as "no file") are returned unchanged
+
+    Returns:
+        str: Path of the database file
+    """
+    if not path or path == ":memory:" or os.path.isabs(path):
+        return path
+    return os.path.join(data_dir(), path)
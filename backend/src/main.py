@@ -1,18 +1,43 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from dotenv import load_dotenv
 import os
 
+from src.api import dependencies
+from src.api.middleware import UploadLimitMiddleware
+from src.api.responses import CompactJSONResponse
 from src.api.routes import router as api_router
+from src.utils.image_pipeline import MAX_IMAGE_BYTES
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents and clients are built on first use; optionally warm them up in the
+    # background so the server accepts connections (and health checks) right away
+    warmup = None
+    if os.getenv("APP_WARMUP", "true").lower() == "true":
+        dependencies.warmup_state["status"] = "running"
+        warmup = asyncio.create_task(asyncio.to_thread(dependencies.warm_up))
+    yield
+    if warmup is not None and not warmup.done():
+        await warmup
+    # Let in-flight agent calls and background jobs finish before the worker exits
+    await dependencies.drain()
+    dependencies.shutdown()
+
+
 app = FastAPI(
     title="Splitwise Agent API",
     description="A multi-agent service for processing receipts and interacting with Splitwise",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=CompactJSONResponse,
 )
 
 # CORS configuration
@@ -24,6 +49,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized receipt uploads while they are received, not after parsing;
+# the allowance covers multipart boundaries and headers around the image
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/receipts": int(
+            os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(MAX_IMAGE_BYTES + 64 * 1024))
+        ),
+        "/api/receipts/batch": int(
+            os.getenv("RECEIPT_BATCH_MAX_REQUEST_BYTES", str(100 * 1024 * 1024))
+        ),
+    },
+)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -0,0 +1,27 @@
+from .receipt import (
+    Discount,
+    LineItem,
+    Payment,
+    ReceiptExtraction,
+    ReceiptSummary,
+    TaxDetail,
+    Transaction,
+    Vendor,
+)
+from .splitwise import Expense, Friend, Group, Member, StoredExpense
+
+__all__ = [
+    "Discount",
+    "Expense",
+    "Friend",
+    "Group",
+    "LineItem",
+    "Member",
+    "Payment",
+    "ReceiptExtraction",
+    "ReceiptSummary",
+    "StoredExpense",
+    "TaxDetail",
+    "Transaction",
+    "Vendor",
+]
@@ -0,0 +1,129 @@
+import re
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+def _to_number(value: Any) -> Any:
+    """
+    Accept "$1,234.50" and "€ 3,99" style strings from the model as numbers
+
+    A lone comma followed by one or two digits is a decimal separator, other
+    commas must group thousands. Anything else is returned unchanged so that
+    validation rejects it rather than misreading the amount.
+    """
+    if isinstance(value, str):
+        cleaned = re.sub(r"[^\d.,\-]", "", value)
+        if not cleaned:
+            return None
+        if re.fullmatch(r"-?\d+,\d{1,2}", cleaned):
+            cleaned = cleaned.replace(",", ".")
+        elif "," in cleaned:
+            if not re.fullmatch(r"-?\d{1,3}(,\d{3})+(\.\d+)?", cleaned):
+                return value
+            cleaned = cleaned.replace(",", "")
+        try:
+            return float(cleaned)
+        except ValueError:
+            return value
+    return value
+
+
+class _ReceiptModel(BaseModel):
+    # Extra keys from the model are kept rather than rejected
+    model_config = ConfigDict(extra="allow")
+
+
+class Vendor(_ReceiptModel):
+    name: Optional[str] = None
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    category: Optional[str] = None
+
+
+class Transaction(_ReceiptModel):
+    date: Optional[str] = None
+    time: Optional[str] = None
+    receipt_number: Optional[str] = None
+
+    @field_validator("date")
+    @classmethod
+    def _iso_date(cls, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return value
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return value  # Keep original format if parsing fails
+
+    @field_validator("receipt_number", mode="before")
+    @classmethod
+    def _receipt_number_str(cls, value: Any) -> Any:
+        return str(value) if isinstance(value, (int, float)) else value
+
+
+class LineItem(_ReceiptModel):
+    name: str
+    quantity: Optional[float] = 1
+    unit_price: Optional[float] = None
+    total_price: float
+    category: Optional[str] = None
+
+    @field_validator("quantity", "unit_price", "total_price", mode="before")
+    @classmethod
+    def _numbers(cls, value: Any) -> Any:
+        return _to_number(value)
+
+
+class TaxDetail(_ReceiptModel):
+    type: Optional[str] = None
+    amount: float
+
+    @field_validator("amount", mode="before")
+    @classmethod
+    def _numbers(cls, value: Any) -> Any:
+        return _to_number(value)
+
+
+class Discount(_ReceiptModel):
+    description: Optional[str] = None
+    amount: float
+
+    @field_validator("amount", mode="before")
+    @classmethod
+    def _numbers(cls, value: Any) -> Any:
+        return _to_number(value)
+
+
+class ReceiptSummary(_ReceiptModel):
+    subtotal: Optional[float] = None
+    tax_details: List[TaxDetail] = Field(default_factory=list)
+    discounts: List[Discount] = Field(default_factory=list)
+    total: float
+
+    @field_validator("subtotal", "total", mode="before")
+    @classmethod
+    def _numbers(cls, value: Any) -> Any:
+        return _to_number(value)
+
+
+class Payment(_ReceiptModel):
+    method: Optional[str] = None
+    card_last_4: Optional[str] = None
+    status: Optional[str] = None
+
+    @field_validator("card_last_4", mode="before")
+    @classmethod
+    def _card_str(cls, value: Any) -> Any:
+        return str(value) if isinstance(value, int) else value
+
+
+class ReceiptExtraction(_ReceiptModel):
+    """Structured receipt data as returned by the extraction prompt"""
+
+    vendor: Vendor = Field(default_factory=Vendor)
+    transaction: Transaction = Field(default_factory=Transaction)
+    items: List[LineItem] = Field(default_factory=list)
+    summary: ReceiptSummary
+    payment: Payment = Field(default_factory=Payment)
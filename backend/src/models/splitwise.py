@@ -0,0 +1,124 @@
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
+from typing import Any, Dict, Iterable, List, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+# Records returned for Splitwise listings. They are slotted dataclasses rather
+# than dicts: long listings and cached pages take less memory, and orjson
+# serializes them natively for API responses, cache entries and prompts.
+
+
+@dataclass(slots=True)
+class Member:
+    id: int
+    name: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Member":
+        """Build a member from a Splitwise user or group member"""
+        return cls(id=user.getId(), name=user.getFirstName())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Member":
+        return cls(**_field_values(cls, data))
+
+
+@dataclass(slots=True)
+class Friend:
+    id: int
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+
+    @classmethod
+    def from_splitwise(cls, friend: Any) -> "Friend":
+        return cls(
+            id=friend.getId(),
+            first_name=friend.getFirstName(),
+            last_name=friend.getLastName(),
+            email=friend.getEmail(),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Friend":
+        return cls(**_field_values(cls, data))
+
+
+@dataclass(slots=True)
+class Group:
+    id: int
+    name: Optional[str] = None
+    members: List[Member] = field(default_factory=list)
+    created_at: Optional[str] = None
+    total: float = 0.0
+
+    @classmethod
+    def from_splitwise(cls, group: Any, total: float = 0.0) -> "Group":
+        return cls(
+            id=group.getId(),
+            name=group.getName(),
+            members=[Member.from_user(member) for member in group.getMembers()],
+            created_at=group.getCreatedAt(),
+            total=total,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Group":
+        values = _field_values(cls, data)
+        values["members"] = [Member.from_dict(m) for m in values.get("members") or []]
+        return cls(**values)
+
+
+@dataclass(slots=True)
+class Expense:
+    id: int
+    description: Optional[str] = None
+    amount: float = 0.0
+    date: Optional[str] = None
+    created_by: Optional[Member] = None
+
+    @classmethod
+    def from_splitwise(cls, expense: Any) -> "Expense":
+        created_by = expense.getCreatedBy()
+        return cls(
+            id=expense.getId(),
+            description=expense.getDescription(),
+            amount=float(expense.getCost()),
+            date=expense.getDate(),
+            created_by=Member.from_user(created_by) if created_by else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Expense":
+        values = _field_values(cls, data)
+        if values.get("created_by") is not None:
+            values["created_by"] = Member.from_dict(values["created_by"])
+        return cls(**values)
+
+
+@dataclass(slots=True)
+class StoredExpense(Expense):
+    """Expense from the local store, with sync and deletion metadata"""
+
+    group_id: Optional[int] = None
+    currency_code: Optional[str] = None
+    updated_at: Optional[str] = None
+    deleted_at: Optional[str] = None
+    category: Optional[str] = None
+
+
+def _field_values(cls: type, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {f.name: data[f.name] for f in fields(cls) if f.name in data}
+
+
+def to_dict(record: Any) -> Any:
+    """Return a model as a plain dict; dicts (e.g. from a disk cache) pass through"""
+    return asdict(record) if is_dataclass(record) else record
+
+
+def as_models(model: Type[T], records: Iterable[Any]) -> List[T]:
+    """Rebuild models from records that may have come back as dicts from a disk cache"""
+    return [
+        record if isinstance(record, model) else model.from_dict(record)
+        for record in records
+    ]
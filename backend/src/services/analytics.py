@@ -0,0 +1,530 @@
+import copy
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config.storage_config import data_path
+from .expense_categorizer import tokenize
+from .expense_sync import ExpenseStore
+
+logger = logging.getLogger(__name__)
+
+# Month columns hold year * 12 + month - 1; -1 marks an unknown date
+UNKNOWN_MONTH = -1
+
+
+def month_index(date: Optional[str]) -> int:
+    """Month number of an ISO date string, or UNKNOWN_MONTH"""
+    try:
+        return int(date[:4]) * 12 + int(date[5:7]) - 1
+    except (TypeError, ValueError):
+        return UNKNOWN_MONTH
+
+
+def parse_month(value: str) -> int:
+    """Month number of a YYYY-MM filter value"""
+    index = month_index(value) if len(value) == 7 and value[4] == "-" else -1
+    if index == UNKNOWN_MONTH or not 0 < int(value[5:7]) <= 12:
+        raise ValueError(f"Invalid month: {value}; expected YYYY-MM")
+    return index
+
+
+def month_label(index: int) -> Optional[str]:
+    if index == UNKNOWN_MONTH:
+        return None
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def vendor_key(text: Optional[str]) -> str:
+    """Vendor-like key of a description: its words without numbers or prices"""
+    return " ".join(tokenize(text or "")) or "(none)"
+
+
+def as_table(rows: List[Tuple], width: int) -> np.ndarray:
+    """Rows as a 2-D object array, so columns convert without Python loops"""
+    table = np.empty((len(rows), width), dtype=object)
+    if rows:
+        table[:] = rows
+    return table
+
+
+class Dictionary:
+    """Append-only dictionary encoding of a column into int32 codes"""
+
+    def __init__(self, normalize: Optional[Callable[[Any], Any]] = None):
+        self.normalize = normalize
+        self.labels: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        # Raw value -> code, so each distinct raw value is normalized once
+        self._raw: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, code: int) -> Any:
+        return self.labels[code]
+
+    def encode(self, values: Iterable[Any]) -> np.ndarray:
+        raw = self._raw
+        return np.array(
+            [raw[value] if value in raw else self._add(value) for value in values],
+            dtype=np.int32,
+        )
+
+    def _add(self, value: Any) -> int:
+        label = self.normalize(value) if self.normalize else value
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        self._raw[value] = code
+        return code
+
+
+def group_sum(
+    keys: Sequence[np.ndarray],
+    cardinalities: Sequence[int],
+    values: Sequence[np.ndarray],
+    mask: np.ndarray,
+) -> Tuple[List[np.ndarray], List[np.ndarray], np.ndarray]:
+    """
+    Sum value columns grouped by several dictionary-encoded key columns
+
+    Args:
+        keys: Key columns, each with codes in [0, cardinality)
+        cardinalities: Number of distinct codes per key column
+        values: Columns to sum
+        mask: Rows to include
+
+    Returns:
+        Tuple: Key codes of each non-empty group, the sums of each value
+            column per group, and the row count per group
+    """
+    size = int(np.prod(cardinalities)) if cardinalities else 1
+    if not mask.any():
+        empty = np.zeros(0, dtype=np.int64)
+        return [empty for _ in keys], [np.zeros(0) for _ in values], empty
+    combined = np.ravel_multi_index([key[mask] for key in keys], cardinalities)
+    counts = np.bincount(combined, minlength=size)
+    groups = np.nonzero(counts)[0]
+    sums = [
+        np.bincount(combined, value[mask], minlength=size)[groups] for value in values
+    ]
+    return list(np.unravel_index(groups, cardinalities)), sums, counts[groups]
+
+
+class ReceiptItemStore:
+    """SQLite store of extracted receipt line items, keyed by receipt content"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS receipt_items ("
+            "receipt_key TEXT NOT NULL, line INTEGER NOT NULL, vendor TEXT, "
+            "date TEXT, name TEXT, category TEXT, quantity REAL, total_price REAL, "
+            "PRIMARY KEY (receipt_key, line))"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "ReceiptItemStore":
+        """Build a store from RECEIPT_ITEMS_DB_PATH; empty keeps it in memory"""
+        path = os.getenv("RECEIPT_ITEMS_DB_PATH", "receipt_items.db")
+        return cls(data_path(path) or ":memory:")
+
+    def add_receipt(self, receipt_key: str, receipt: Dict[str, Any]) -> int:
+        """Replace the stored line items of a receipt; returns the item count"""
+        vendor = (receipt.get("vendor") or {}).get("name")
+        date = (receipt.get("transaction") or {}).get("date")
+        rows = [
+            (
+                receipt_key,
+                line,
+                vendor,
+                date,
+                item.get("name"),
+                item.get("expense_category") or item.get("category"),
+                float(item.get("quantity") or 1),
+                float(item.get("total_price") or 0),
+            )
+            for line, item in enumerate(receipt.get("items") or [])
+            if isinstance(item, dict)
+        ]
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM receipt_items WHERE receipt_key = ?", (receipt_key,)
+            )
+            self._conn.executemany(
+                "INSERT INTO receipt_items (receipt_key, line, vendor, date, name, "
+                "category, quantity, total_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._writes += 1
+        return len(rows)
+
+    def rows(self) -> List[Tuple]:
+        """Return (vendor, date, name, category, quantity, total_price) rows"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT vendor, date, name, category, quantity, total_price "
+                "FROM receipt_items"
+            ).fetchall()
+
+    def data_version(self) -> Tuple[int, int]:
+        """Changes whenever this or another connection commits a write"""
+        with self._lock:
+            return self._writes, self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ExpenseColumns:
+    """
+    Synced expenses and their shares as NumPy columns
+
+    Shares carry copies of their expense's group, month and currency so
+    per-member queries filter without a join. Instances are not modified once
+    built; patch returns a new one, so queries never see a half-applied change.
+    """
+
+    def __init__(self):
+        self.currencies = Dictionary(lambda value: value or "")
+        self.categories = Dictionary(lambda value: value or "uncategorized")
+        self.vendors = Dictionary(vendor_key)
+        self.months = Dictionary(month_index)
+        self.users = Dictionary()
+        self.user_names: Dict[int, Optional[str]] = {}
+        self.expenses = self._expense_arrays([])
+        self.shares = self._share_arrays([], self.expenses)
+
+    @property
+    def rows(self) -> int:
+        return len(self.expenses["id"])
+
+    def patch(
+        self,
+        expenses: List[Tuple],
+        shares: List[Tuple],
+        removed: Optional[List[int]] = None,
+    ) -> "ExpenseColumns":
+        """
+        Return a copy without the removed expenses and with new rows appended
+
+        Args:
+            expenses: Rows from ExpenseStore.analytics_rows
+            shares: Share rows of those expenses
+            removed: IDs to drop first; re-added if they appear in expenses
+
+        Returns:
+            ExpenseColumns: The patched copy; dictionaries are shared
+        """
+        patched = copy.copy(self)
+        added = self._expense_arrays(expenses)
+        added_shares = self._share_arrays(shares, added)
+        keep = ~np.isin(self.expenses["id"], removed or [])
+        keep_shares = ~np.isin(self.shares["expense_id"], removed or [])
+        patched.expenses = {
+            name: np.concatenate([column[keep], added[name]])
+            for name, column in self.expenses.items()
+        }
+        patched.shares = {
+            name: np.concatenate([column[keep_shares], added_shares[name]])
+            for name, column in self.shares.items()
+        }
+        return patched
+
+    def _expense_arrays(self, rows: List[Tuple]) -> Dict[str, np.ndarray]:
+        table = as_table(rows, 7)
+        group_ids = table[:, 1]
+        group_ids[np.equal(group_ids, None)] = -1
+        month_codes = self.months.encode(table[:, 4].tolist())
+        return {
+            "id": table[:, 0].astype(np.int64),
+            "group_id": group_ids.astype(np.int64),
+            "cost": table[:, 2].astype(float),
+            "currency": self.currencies.encode(table[:, 3].tolist()),
+            "month": np.array(self.months.labels, dtype=np.int32)[month_codes],
+            "category": self.categories.encode(table[:, 5].tolist()),
+            "vendor": self.vendors.encode(table[:, 6].tolist()),
+        }
+
+    def _share_arrays(
+        self, rows: List[Tuple], expenses: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        table = as_table(rows, 5)
+        user_ids, first, user_index = np.unique(
+            table[:, 1].astype(np.int64), return_index=True, return_inverse=True
+        )
+        self.user_names.update(zip(user_ids.tolist(), table[first, 2].tolist()))
+        expense_ids = table[:, 0].astype(np.int64)
+        # Row of each share's expense within the same batch
+        order = np.argsort(expenses["id"])
+        index = order[np.searchsorted(expenses["id"], expense_ids, sorter=order)]
+        return {
+            "expense_id": expense_ids,
+            "group_id": expenses["group_id"][index],
+            "month": expenses["month"][index],
+            "currency": expenses["currency"][index],
+            "user": self.users.encode(user_ids.tolist())[user_index],
+            "paid": table[:, 3].astype(float),
+            "owed": table[:, 4].astype(float),
+        }
+
+
+class ReceiptItemColumns:
+    """Receipt line items as NumPy columns"""
+
+    def __init__(self, rows: List[Tuple]):
+        columns = list(zip(*rows)) if rows else [()] * 6
+        self.vendors = Dictionary(vendor_key)
+        self.vendor = self.vendors.encode(columns[0])
+        months = Dictionary(month_index)
+        month_codes = months.encode(columns[1])
+        self.month = np.array(months.labels, dtype=np.int32)[month_codes]
+        self.categories = Dictionary(lambda value: (value or "uncategorized").lower())
+        self.category = self.categories.encode(columns[3])
+        self.quantity = np.array(columns[4], dtype=float)
+        self.total = np.array(columns[5], dtype=float)
+        self.rows = len(rows)
+
+
+class ExpenseAnalytics:
+    """
+    Group-by/aggregate queries over a columnar copy of the local stores.
+
+    Columns are loaded from SQLite when a store reports a new data version.
+    After upserts by this process only the changed expenses are re-read;
+    writes by other connections reload everything. Queries are boolean masks
+    and bincounts over NumPy arrays.
+    Payments (settle-ups) and deleted expenses are not counted as spend.
+    Amounts are never summed across currencies.
+    """
+
+    def __init__(self, store: ExpenseStore, receipt_items: ReceiptItemStore):
+        self.store = store
+        self.receipt_items = receipt_items
+        self._expenses: Optional[ExpenseColumns] = None
+        self._items: Optional[ReceiptItemColumns] = None
+        self._versions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.loads = {"expenses": 0, "patches": 0, "receipt_items": 0, "load_ms": 0.0}
+
+    def _expense_columns(self) -> ExpenseColumns:
+        writes, version = self.store.data_version()
+        with self._lock:
+            if self._versions.get("expenses") == (writes, version):
+                return self._expenses
+            started = time.perf_counter()
+            changed = None
+            loaded = self._versions.get("expenses")
+            if loaded is not None and loaded[1] == version:
+                # Only this process wrote; patch the rows its upserts touched
+                writes, changed = self.store.changed_since(loaded[0])
+            if changed is None:
+                self._expenses = ExpenseColumns().patch(*self.store.analytics_rows())
+                self.loads["expenses"] += 1
+            else:
+                expenses, shares = self.store.analytics_rows(changed)
+                self._expenses = self._expenses.patch(expenses, shares, changed)
+                self.loads["patches"] += 1
+            self._versions["expenses"] = (writes, version)
+            self.loads["load_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return self._expenses
+
+    def _item_columns(self) -> ReceiptItemColumns:
+        version = self.receipt_items.data_version()
+        with self._lock:
+            if self._items is None or self._versions.get("receipt_items") != version:
+                self._items = ReceiptItemColumns(self.receipt_items.rows())
+                self._versions["receipt_items"] = version
+                self.loads["receipt_items"] += 1
+            return self._items
+
+    def _mask(
+        self,
+        columns: Dict[str, np.ndarray],
+        group_id: Optional[int],
+        start: Optional[str],
+        end: Optional[str],
+    ) -> np.ndarray:
+        mask = self._month_mask(columns["month"], start, end)
+        if group_id is not None:
+            mask &= columns["group_id"] == group_id
+        return mask
+
+    @staticmethod
+    def _month_mask(month: np.ndarray, start: Optional[str], end: Optional[str]):
+        mask = np.ones(len(month), dtype=bool)
+        if start is not None:
+            mask &= month >= parse_month(start)
+        if end is not None:
+            mask &= (month <= parse_month(end)) & (month != UNKNOWN_MONTH)
+        return mask
+
+    def spend_by_category(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        monthly: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Total spend per category, optionally per month
+
+        Args:
+            group_id: Optional group filter
+            start: First month to include, YYYY-MM
+            end: Last month to include, YYYY-MM
+            monthly: Group by month as well as category
+
+        Returns:
+            List[Dict]: month (if monthly), category, currency, total and count
+        """
+        columns = self._expense_columns()
+        expenses = columns.expenses
+        mask = self._mask(expenses, group_id, start, end)
+        keys = [expenses["category"], expenses["currency"]]
+        sizes = [len(columns.categories), len(columns.currencies)]
+        if monthly:
+            month = expenses["month"]
+            known = month[month != UNKNOWN_MONTH]
+            first = int(known.min()) - 1 if len(known) else 0
+            # Code 0 is an unknown month, then consecutive months from the first
+            keys.insert(0, np.where(month == UNKNOWN_MONTH, 0, month - first))
+            sizes.insert(0, int(known.max()) - first + 1 if len(known) else 1)
+        codes, (totals,), counts = group_sum(keys, sizes, [expenses["cost"]], mask)
+
+        rows = []
+        for index in range(len(counts)):
+            row = {
+                "category": columns.categories[codes[-2][index]],
+                "currency": columns.currencies[codes[-1][index]],
+                "total": round(float(totals[index]), 2),
+                "count": int(counts[index]),
+            }
+            if monthly:
+                code = int(codes[0][index])
+                row = {"month": month_label(code + first) if code else None, **row}
+            rows.append(row)
+        return rows
+
+    def spend_by_member(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Amount each member paid and owed (consumed), per currency
+
+        Returns:
+            List[Dict]: user id and name, currency, paid, owed and expense count
+        """
+        columns = self._expense_columns()
+        shares = columns.shares
+        codes, (paid, owed), counts = group_sum(
+            [shares["user"], shares["currency"]],
+            [len(columns.users), len(columns.currencies)],
+            [shares["paid"], shares["owed"]],
+            self._mask(shares, group_id, start, end),
+        )
+        rows = []
+        for index in np.argsort(-owed, kind="stable"):
+            user_id = columns.users[codes[0][index]]
+            rows.append(
+                {
+                    "user_id": user_id,
+                    "name": columns.user_names.get(user_id),
+                    "currency": columns.currencies[codes[1][index]],
+                    "paid": round(float(paid[index]), 2),
+                    "owed": round(float(owed[index]), 2),
+                    "count": int(counts[index]),
+                }
+            )
+        return rows
+
+    def spend_by_vendor(
+        self,
+        group_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top vendors by total spend, where the vendor is the normalized description
+
+        Returns:
+            List[Dict]: vendor, currency, total and count, largest total first
+        """
+        columns = self._expense_columns()
+        expenses = columns.expenses
+        codes, (totals,), counts = group_sum(
+            [expenses["vendor"], expenses["currency"]],
+            [len(columns.vendors), len(columns.currencies)],
+            [expenses["cost"]],
+            self._mask(expenses, group_id, start, end),
+        )
+        top = np.argsort(-totals, kind="stable")[:limit]
+        return [
+            {
+                "vendor": columns.vendors[codes[0][index]],
+                "currency": columns.currencies[codes[1][index]],
+                "total": round(float(totals[index]), 2),
+                "count": int(counts[index]),
+            }
+            for index in top
+        ]
+
+    def spend_by_receipt_item(
+        self,
+        by: str = "category",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Receipt line item totals grouped by item category or vendor
+
+        Returns:
+            List[Dict]: category or vendor, total, quantity and item count
+        """
+        if by not in ("category", "vendor"):
+            raise ValueError(f"Unsupported receipt item grouping: {by}")
+        columns = self._item_columns()
+        key = columns.category if by == "category" else columns.vendor
+        labels = columns.categories if by == "category" else columns.vendors
+        mask = self._month_mask(columns.month, start, end)
+        codes, (totals, quantities), counts = group_sum(
+            [key], [len(labels)], [columns.total, columns.quantity], mask
+        )
+        top = np.argsort(-totals, kind="stable")[:limit]
+        return [
+            {
+                by: labels[codes[0][index]],
+                "total": round(float(totals[index]), 2),
+                "quantity": round(float(quantities[index]), 2),
+                "count": int(counts[index]),
+            }
+            for index in top
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return loaded row counts and how often the columns were rebuilt"""
+        with self._lock:
+            return {
+                **self.loads,
+                "expense_rows": self._expenses.rows if self._expenses else 0,
+                "receipt_item_rows": self._items.rows if self._items else 0,
+            }
@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List
+
+from ..utils.serialization import to_json
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English/JSON prompts
+CHARS_PER_TOKEN = 4
+
+BATCH_INSTRUCTIONS = (
+    "Analyze each expense below and return ONLY a JSON array with one object per "
+    "expense, in any order. Each object must have:\n"
+    '- "id": the expense id, copied exactly\n'
+    '- "category": expense category (e.g. food, transport, utilities)\n'
+    '- "tags": list of short tags for organization\n'
+    '- "split_suggestion": one of "equal", "by_share", "personal"\n'
+    '- "notes": patterns, recurring indicators or special handling, or ""\n\n'
+    "Expenses (one JSON object per line):\n"
+)
+
+# Only these response fields are merged into an expense, so a model reply can't
+# overwrite its id, amount or other source data
+ANALYSIS_FIELDS = ("category", "tags", "split_suggestion", "notes")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for packing prompts"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _compact(expense: Dict[str, Any]) -> str:
+    return to_json(expense)
+
+
+def chunk_by_token_budget(
+    expenses: List[Dict[str, Any]], token_budget: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Pack expenses into chunks whose prompt stays within a token budget
+
+    Args:
+        expenses: Expense dicts, each with an "id"
+        token_budget: Maximum estimated prompt tokens per chunk
+
+    Returns:
+        List[List[Dict]]: Chunks in input order; an oversized expense gets its own chunk
+    """
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = estimate_tokens(BATCH_INSTRUCTIONS)
+    for expense in expenses:
+        cost = estimate_tokens(_compact(expense)) + 1
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], estimate_tokens(BATCH_INSTRUCTIONS)
+        current.append(expense)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_batch_prompt(chunk: List[Dict[str, Any]]) -> str:
+    return BATCH_INSTRUCTIONS + "\n".join(_compact(expense) for expense in chunk)
+
+
+def parse_batch_response(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse a JSON array response into analyses keyed by expense id
+
+    Tolerates code fences and prose around the array. Entries without an id or
+    category are dropped so their expenses are retried.
+    """
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    analyses = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and item.get("id") is not None and item.get("category"):
+            analyses[str(item["id"])] = {
+                k: v for k, v in item.items() if k in ANALYSIS_FIELDS
+            }
+    return analyses
+
+
+class BatchExpenseAnalyzer:
+    """
+    Analyzes many expenses with one LLM call per chunk instead of one per expense.
+
+    Expenses whose analysis is missing or malformed in the response are retried
+    on their own in later rounds; anything still unresolved gets the same fallback
+    as a failed single-expense analysis. run_prompt(prompt, use_cache) is called
+    with use_cache=False on retries.
+    """
+
+    def __init__(
+        self,
+        run_prompt: Callable[..., str],
+        token_budget: int = 3000,
+        max_retries: int = 1,
+    ):
+        self.run_prompt = run_prompt
+        self.token_budget = token_budget
+        self.max_retries = max_retries
+        self.calls = 0
+
+    def analyze(self, expenses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze a batch of expenses
+
+        Args:
+            expenses: Expense dicts, each with an "id"
+
+        Returns:
+            List[Dict]: Expenses in input order with analysis fields merged in
+        """
+        analyses: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        pending = list(expenses)
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            # Retries use smaller chunks so one bad item spoils less of a response
+            budget = max(1, self.token_budget // (2**attempt))
+            for chunk in chunk_by_token_budget(pending, budget):
+                try:
+                    self.calls += 1
+                    # A retry's prompt can match the failed one; skip the LLM cache
+                    response = self.run_prompt(
+                        build_batch_prompt(chunk), use_cache=attempt == 0
+                    )
+                    parsed = parse_batch_response(response)
+                except Exception as e:
+                    logger.warning(f"Batch analysis call failed: {str(e)}")
+                    parsed = {}
+                    for expense in chunk:
+                        errors[str(expense["id"])] = str(e)
+                analyses.update(
+                    {key: value for key, value in parsed.items() if key not in analyses}
+                )
+            pending = [expense for expense in pending if str(expense["id"]) not in analyses]
+
+        results = []
+        for expense in expenses:
+            key = str(expense["id"])
+            analysis = analyses.get(key) or {
+                "analysis_error": errors.get(key, "Missing from batch analysis response"),
+                "category": "uncategorized",
+                "tags": [],
+            }
+            results.append({**expense, **analysis})
+        return results
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.cache import CacheBackend, TieredCache
+
+logger = logging.getLogger(__name__)
+
+BULK_CREATED = "created"
+BULK_DUPLICATE = "duplicate"
+BULK_FAILED = "failed"
+
+
+def idempotency_key(item: Dict[str, Any]) -> str:
+    """
+    Return the item's idempotency key, deriving one from its content if unset
+
+    Derived keys make a resubmitted import a no-op; items that are genuinely
+    identical (same description, amount, date and split) need explicit keys.
+    A key is only derived for dated items, so the same undated expense
+    entered on two different days is not mistaken for a duplicate.
+
+    Raises:
+        ValueError: If the item has neither an idempotency_key nor a date
+    """
+    if item.get("idempotency_key"):
+        return str(item["idempotency_key"])
+    if not item.get("date"):
+        raise ValueError("An expense needs an idempotency_key or a date")
+    content = {key: value for key, value in item.items() if key != "idempotency_key"}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def idempotency_marker(key: str) -> str:
+    """Marker stored in the expense details so a created expense can be found again"""
+    return f"[idempotency-key:{key}]"
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    status = getattr(error, "http_status", None)
+    # The Splitwise SDK stores the status as a one-element tuple
+    if isinstance(status, tuple):
+        status = status[0] if status else None
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "http_headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether the request may not have reached Splitwise, or may have succeeded"""
+    import requests
+
+    status = _http_status(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket pacing calls to a rate-limited API.
+
+    Holds up to capacity tokens, refilled at rate tokens per second. pause()
+    stops all callers for a while, e.g. after a 429 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("Token bucket rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if now >= self._paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self.tokens) / self.rate)
+            self.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the given number of seconds"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+            self.tokens = 0.0
+
+
+class BulkExpenseScheduler:
+    """
+    Creates many expenses concurrently within a token-bucket rate limit.
+
+    Every item has an idempotency key. Results are stored under the key, so a
+    resubmitted item is reported as a duplicate instead of being created again.
+    Undated items without a key are dated today before their key is derived.
+    429 responses pause the whole bucket (honouring Retry-After) and are
+    retried with jitter. After a 5xx or connection error the expense may
+    already exist, so find_existing is consulted before the retry.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[Dict[str, Any], str], Dict[str, Any]],
+        bucket: TokenBucket,
+        results: CacheBackend,
+        find_existing: Optional[Callable[[Dict[str, Any], str], Optional[Dict]]] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        max_items: int = 200,
+        sleep: Callable[[float], None] = time.sleep,
+        today: Callable[[], str] = lambda: date.today().isoformat(),
+    ):
+        self.create = create
+        self.bucket = bucket
+        self.results = results
+        self.find_existing = find_existing
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_items = max_items
+        self.sleep = sleep
+        self.today = today
+        self.stats = {
+            BULK_CREATED: 0,
+            BULK_DUPLICATE: 0,
+            BULK_FAILED: 0,
+            "throttled": 0,
+        }
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrency), thread_name_prefix="expense-bulk"
+        )
+
+    @classmethod
+    def from_env(
+        cls,
+        create: Callable[[Dict[str, Any], str], Dict[str, Any]],
+        find_existing: Optional[Callable[[Dict[str, Any], str], Optional[Dict]]] = None,
+    ) -> "BulkExpenseScheduler":
+        """Build a scheduler from SPLITWISE_RATE_LIMIT_* and EXPENSE_BULK_* variables"""
+        try:
+            bucket = TokenBucket(
+                rate=float(os.getenv("SPLITWISE_RATE_LIMIT_PER_MINUTE", "60")) / 60,
+                capacity=int(os.getenv("SPLITWISE_RATE_LIMIT_BURST", "5")),
+            )
+            return cls(
+                create,
+                bucket,
+                TieredCache.from_env(
+                    "EXPENSE_IDEMPOTENCY",
+                    default_ttl=30 * 24 * 3600,
+                    default_db_path="expense_idempotency.db",
+                ),
+                find_existing=find_existing,
+                max_concurrency=int(os.getenv("EXPENSE_BULK_CONCURRENCY", "4")),
+                max_retries=int(os.getenv("EXPENSE_BULK_MAX_RETRIES", "4")),
+                backoff_base=float(os.getenv("EXPENSE_BULK_BACKOFF_SECONDS", "1")),
+                max_items=int(os.getenv("EXPENSE_BULK_MAX_ITEMS", "200")),
+            )
+        except ValueError as e:
+            logger.error(f"Invalid bulk expense configuration: {str(e)}")
+            raise ValueError(f"Invalid bulk expense configuration: {str(e)}")
+
+    def create_all(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create expenses concurrently and return one result per item, in order
+
+        Args:
+            items: Expense fields, each optionally with an idempotency_key
+
+        Returns:
+            List[Dict]: Per-item index, idempotency_key, status (created,
+                duplicate or failed), data or error, and attempts
+
+        Raises:
+            ValueError: If more than max_items items are given
+        """
+        if len(items) > self.max_items:
+            raise ValueError(f"At most {self.max_items} expenses per request")
+        futures = [
+            self._executor.submit(self._create_one, index, item)
+            for index, item in enumerate(items)
+        ]
+        return [future.result() for future in futures]
+
+    def _claim(self, key: str) -> Optional[threading.Event]:
+        """Return an event to wait on if another thread is creating this key"""
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+            return event
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key).set()
+
+    def _create_one(self, index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        if not item.get("idempotency_key") and not item.get("date"):
+            # Pin the date the expense will be posted with so the derived key
+            # covers it and a retry tomorrow is a new expense
+            item = {**item, "date": self.today()}
+        key = idempotency_key(item)
+        result = {"index": index, "idempotency_key": key, "attempts": 0}
+        while True:
+            stored = self.results.get(key)
+            if stored is not None:
+                return self._finish(result, BULK_DUPLICATE, data=stored)
+            busy = self._claim(key)
+            if busy is None:
+                break
+            busy.wait()
+
+        try:
+            return self._create_with_retries(result, item, key)
+        finally:
+            self._release(key)
+
+    def _create_with_retries(
+        self, result: Dict[str, Any], item: Dict[str, Any], key: str
+    ) -> Dict[str, Any]:
+        uncertain = False
+        while True:
+            if uncertain and self.find_existing is not None:
+                # The previous attempt may have created the expense before failing
+                existing = self.find_existing(item, key)
+                if existing is not None:
+                    self.results.set(key, existing)
+                    return self._finish(result, BULK_CREATED, data=existing)
+
+            result["attempts"] += 1
+            self.bucket.acquire()
+            try:
+                data = self.create(item, key)
+            except Exception as e:
+                status = _http_status(e)
+                retryable = status == 429 or _is_transient(e)
+                if not retryable or result["attempts"] > self.max_retries:
+                    logger.error(f"Bulk expense {result['index']} failed: {str(e)}")
+                    return self._finish(result, BULK_FAILED, error=str(e))
+
+                delay = self._backoff(result["attempts"])
+                if status == 429:
+                    with self._lock:
+                        self.stats["throttled"] += 1
+                    retry_after = _retry_after(e)
+                    if retry_after is not None:
+                        delay = retry_after + random.uniform(0, self.backoff_base)
+                    # Slow every worker down, not just this one
+                    self.bucket.pause(delay)
+                else:
+                    uncertain = True
+                self.sleep(delay)
+                continue
+
+            self.results.set(key, data)
+            return self._finish(result, BULK_CREATED, data=data)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from hitting the API in lockstep
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def _finish(
+        self, result: Dict[str, Any], status: str, **fields: Any
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self.stats[status] += 1
+        return {**result, "status": status, **fields}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=wait)
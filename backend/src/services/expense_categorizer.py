@@ -0,0 +1,275 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # The nearest-neighbour lookup is optional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z][a-z&']+")
+_STOP_WORDS = {"the", "and", "for", "with", "from", "to", "at", "of", "in", "on"}
+# Splitwise defaults that say nothing about what was bought
+_UNINFORMATIVE = {"", "general", "uncategorized", "other", "none"}
+
+# Seed keywords so common vendors are categorized before any history exists
+KEYWORD_RULES: Dict[str, Tuple[str, ...]] = {
+    "transport": (
+        "uber", "lyft", "taxi", "cab", "ride", "bus", "train", "metro", "subway",
+        "parking", "toll", "fuel", "petrol", "flight", "airline", "airport",
+    ),
+    "food": (
+        "restaurant", "cafe", "coffee", "starbucks", "pizza", "burger", "sushi",
+        "bar", "pub", "dinner", "lunch", "breakfast", "brunch", "bakery",
+        "groceries", "grocery", "supermarket", "takeaway", "doordash",
+    ),
+    "utilities": (
+        "electricity", "electric", "water", "internet", "wifi", "broadband",
+        "phone", "mobile", "heating",
+    ),
+    "entertainment": (
+        "movie", "movies", "cinema", "netflix", "spotify", "concert", "theatre",
+        "museum", "tickets", "bowling", "games",
+    ),
+    "accommodation": ("hotel", "airbnb", "hostel", "motel", "booking"),
+    "rent": ("rent",),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of a description, without numbers, prices or stop words"""
+    return [
+        token
+        for token in _TOKEN.findall((text or "").lower())
+        if token not in _STOP_WORDS
+    ]
+
+
+class Prediction(NamedTuple):
+    """A locally predicted category and how it was found"""
+
+    category: str
+    confidence: float
+    source: str
+
+
+class ExpenseCategorizer:
+    """
+    Categorizes expense descriptions from past categorized expenses.
+
+    Three lookups run in order of precision: an exact vendor index keyed by
+    the description's words, a keyword index of per-word category counts, and,
+    with NumPy installed, a cosine nearest-neighbour search over hashed
+    character trigrams. The first prediction whose confidence reaches
+    min_confidence wins; callers fall back to the LLM otherwise and feed its
+    answer back through learn().
+    """
+
+    def __init__(
+        self,
+        min_confidence: float = 0.8,
+        min_support: int = 2,
+        max_examples: int = 5000,
+        neighbors: int = 5,
+        use_vectors: bool = True,
+        dimensions: int = 512,
+    ):
+        self.min_confidence = min_confidence
+        self.min_support = min_support
+        self.neighbors = neighbors
+        self.use_vectors = use_vectors and np is not None
+        self.dimensions = dimensions
+        self.stats = {"local": 0, "fallback": 0, "learned": 0}
+        self._examples: deque = deque(maxlen=max_examples)
+        self._vendors: Dict[str, Counter] = defaultdict(Counter)
+        self._keywords: Dict[str, Counter] = defaultdict(Counter)
+        self._matrix = None
+        self._labels: List[str] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        for category, keywords in KEYWORD_RULES.items():
+            for keyword in keywords:
+                self._keywords[keyword][category] += min_support
+
+    @classmethod
+    def from_env(cls) -> "ExpenseCategorizer":
+        """Build a categorizer from EXPENSE_CATEGORIZER_* environment variables"""
+        try:
+            return cls(
+                min_confidence=float(
+                    os.getenv("EXPENSE_CATEGORIZER_MIN_CONFIDENCE", "0.8")
+                ),
+                max_examples=int(os.getenv("EXPENSE_CATEGORIZER_MAX_EXAMPLES", "5000")),
+                use_vectors=os.getenv("EXPENSE_CATEGORIZER_VECTORS", "true").lower()
+                == "true",
+            )
+        except ValueError as e:
+            logger.error(f"Invalid expense categorizer configuration: {str(e)}")
+            raise ValueError(f"Invalid expense categorizer configuration: {str(e)}")
+
+    def learn(self, text: str, category: Optional[str]) -> bool:
+        """
+        Add a categorized description to the indexes
+
+        Args:
+            text: Expense description or receipt item name
+            category: Its category; uninformative values such as "General" are ignored
+
+        Returns:
+            bool: Whether the example was added
+        """
+        if not isinstance(category, str):
+            return False
+        category = category.strip().lower()
+        tokens = tokenize(text)
+        if category in _UNINFORMATIVE or not tokens:
+            return False
+        vector = self._vector(tokens) if self.use_vectors else None
+        with self._lock:
+            if len(self._examples) == self._examples.maxlen:
+                self._forget(*self._examples[0])
+            self._examples.append((tokens, category, vector))
+            self._vendors[" ".join(tokens)][category] += 1
+            for token in set(tokens):
+                self._keywords[token][category] += 1
+            self._dirty = True
+            self.stats["learned"] += 1
+        return True
+
+    def learn_many(self, examples: Iterable[Tuple[str, Optional[str]]]) -> int:
+        """Add (description, category) pairs; returns how many were added"""
+        return sum(self.learn(text, category) for text, category in examples)
+
+    def _forget(self, tokens: List[str], category: str, vector: Any = None) -> None:
+        # The oldest example is about to fall out of the bounded history
+        self._vendors[" ".join(tokens)][category] -= 1
+        for token in set(tokens):
+            self._keywords[token][category] -= 1
+
+    def predict(self, text: str) -> Optional[Prediction]:
+        """
+        Return the most confident local prediction, even if below min_confidence
+
+        Args:
+            text: Expense description or receipt item name
+
+        Returns:
+            Optional[Prediction]: Category, confidence in [0, 1] and the lookup
+                that produced it, or None if nothing matched
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        best = None
+        for lookup in (self._vendor_lookup, self._keyword_lookup, self._vector_lookup):
+            prediction = lookup(tokens)
+            if prediction is None:
+                continue
+            if prediction.confidence >= self.min_confidence:
+                return prediction
+            if best is None or prediction.confidence > best.confidence:
+                best = prediction
+        return best
+
+    def categorize(self, text: str) -> Optional[Prediction]:
+        """Return a prediction only if it is confident enough to skip the LLM"""
+        prediction = self.predict(text)
+        confident = (
+            prediction is not None and prediction.confidence >= self.min_confidence
+        )
+        with self._lock:
+            self.stats["local" if confident else "fallback"] += 1
+        return prediction if confident else None
+
+    def _vendor_lookup(self, tokens: List[str]) -> Optional[Prediction]:
+        with self._lock:
+            counts = +self._vendors.get(" ".join(tokens), Counter())
+        total = sum(counts.values())
+        if total < self.min_support:
+            return None
+        category, count = counts.most_common(1)[0]
+        return Prediction(category, round(count / total, 4), "vendor")
+
+    def _keyword_lookup(self, tokens: List[str]) -> Optional[Prediction]:
+        votes: Counter = Counter()
+        unknown = 0
+        with self._lock:
+            for token in set(tokens):
+                counts = +self._keywords.get(token, Counter())
+                total = sum(counts.values())
+                if total < self.min_support:
+                    unknown += 1
+                    continue
+                # Each known word votes with its category distribution
+                for category, count in counts.items():
+                    votes[category] += count / total
+        if not votes:
+            return None
+        category, score = votes.most_common(1)[0]
+        # Unknown words count against the winner, so one keyword among other
+        # words ("coffee table", "bottled water") is not enough on its own
+        confidence = score / (sum(votes.values()) + unknown)
+        return Prediction(category, round(confidence, 4), "keyword")
+
+    def _vector_lookup(self, tokens: List[str]) -> Optional[Prediction]:
+        if not self.use_vectors:
+            return None
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            matrix, labels = self._matrix, self._labels
+        if matrix is None or not labels:
+            return None
+
+        similarities = matrix @ self._vector(tokens)
+        count = min(self.neighbors, len(labels))
+        nearest = np.argpartition(-similarities, count - 1)[:count]
+        votes: Counter = Counter()
+        for index in nearest:
+            if similarities[index] > 0:
+                votes[labels[index]] += float(similarities[index])
+        if not votes:
+            return None
+        category, score = votes.most_common(1)[0]
+        # Scale the vote share by how close the best matching neighbour is
+        closest = float(similarities[nearest].max())
+        confidence = score / sum(votes.values()) * closest
+        return Prediction(category, round(confidence, 4), "neighbors")
+
+    def _rebuild(self) -> None:
+        examples = list(self._examples)
+        if examples:
+            self._matrix = np.stack([vector for _, _, vector in examples])
+        else:
+            self._matrix = None
+        self._labels = [category for _, category, _ in examples]
+        self._dirty = False
+
+    def _vector(self, tokens: List[str]):
+        """L2-normalized hashed character trigrams of the joined words"""
+        text = f" {' '.join(tokens)} "
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for start in range(len(text) - 2):
+            trigram = text[start : start + 3].encode("utf-8")
+            vector[zlib.crc32(trigram) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def summary(self) -> Dict[str, Any]:
+        """Return fast-path counters and index sizes"""
+        with self._lock:
+            decided = self.stats["local"] + self.stats["fallback"]
+            local_rate = self.stats["local"] / decided if decided else 0.0
+            return {
+                **self.stats,
+                "local_rate": round(local_rate, 4),
+                "examples": len(self._examples),
+                "vendors": len(self._vendors),
+                "vectors": self.use_vectors,
+            }
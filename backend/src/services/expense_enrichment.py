@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config.storage_config import data_path
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_PENDING = "pending"
+ENRICHMENT_SUCCEEDED = "succeeded"
+ENRICHMENT_FAILED = "failed"
+
+
+class AnnotationStore:
+    """SQLite store of expense enrichments, keyed by Splitwise expense ID"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS expense_annotations ("
+            "expense_id INTEGER PRIMARY KEY, status TEXT NOT NULL, source TEXT, "
+            "annotation TEXT, error TEXT, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "AnnotationStore":
+        """Build a store from EXPENSE_ENRICHMENT_DB_PATH; empty keeps it in memory"""
+        path = os.getenv("EXPENSE_ENRICHMENT_DB_PATH", "expense_annotations.db")
+        return cls(data_path(path) or ":memory:")
+
+    def add_pending(self, expense_id: int, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Record that an expense is waiting for enrichment, replacing older results"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO expense_annotations "
+                "(expense_id, status, source, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    expense_id,
+                    ENRICHMENT_PENDING,
+                    json.dumps(source, default=str),
+                    now,
+                    now,
+                ),
+            )
+            self._conn.commit()
+        return self.get(expense_id)
+
+    def update(self, expense_id: int, **fields: Any) -> None:
+        """Update status, annotation or error of an existing record"""
+        if "annotation" in fields:
+            fields["annotation"] = json.dumps(fields["annotation"], default=str)
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE expense_annotations SET {columns} WHERE expense_id = ?",
+                (*fields.values(), expense_id),
+            )
+            self._conn.commit()
+
+    def get(self, expense_id: int) -> Optional[Dict[str, Any]]:
+        """Return the enrichment record of an expense, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expense_id, status, annotation, error, created_at, updated_at "
+                "FROM expense_annotations WHERE expense_id = ?",
+                (expense_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "expense_id": row[0],
+            "status": row[1],
+            "annotation": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "created_at": row[4],
+            "updated_at": row[5],
+        }
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Return the expense ID and source data of records not yet enriched"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT expense_id, source FROM expense_annotations WHERE status = ? "
+                "ORDER BY created_at",
+                (ENRICHMENT_PENDING,),
+            ).fetchall()
+        return [{"expense_id": row[0], "source": json.loads(row[1])} for row in rows]
+
+    def categorized(self, limit: int = 5000) -> List[Tuple[str, str]]:
+        """Return (description, category) of the newest successful enrichments"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, annotation FROM expense_annotations WHERE status = ? "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (ENRICHMENT_SUCCEEDED, limit),
+            ).fetchall()
+        pairs = []
+        for source, annotation in rows:
+            description = json.loads(source).get("description")
+            category = (json.loads(annotation) or {}).get("category")
+            if description and isinstance(category, str):
+                pairs.append((description, category))
+        return pairs
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ExpenseEnricher:
+    """
+    Runs expense analysis after the expense is created, off the request path.
+
+    The expense data is stored with a pending status before the job is
+    queued, so enrichments interrupted by a restart are queued again when the
+    next enricher starts.
+    """
+
+    def __init__(
+        self,
+        store: AnnotationStore,
+        analyze: Callable[[Dict[str, Any]], Dict[str, Any]],
+        max_workers: int = 2,
+        resume: bool = True,
+    ):
+        self.store = store
+        self.analyze = analyze
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="expense-enrichment"
+        )
+        if resume:
+            for record in store.pending():
+                self._executor.submit(self._run, record["expense_id"], record["source"])
+
+    @classmethod
+    def from_env(
+        cls, analyze: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> "ExpenseEnricher":
+        """Build an enricher from EXPENSE_ENRICHMENT_* environment variables"""
+        try:
+            return cls(
+                AnnotationStore.from_env(),
+                analyze,
+                max_workers=int(os.getenv("EXPENSE_ENRICHMENT_WORKERS", "2")),
+            )
+        except (ValueError, sqlite3.Error) as e:
+            logger.error(f"Invalid expense enrichment configuration: {str(e)}")
+            raise ValueError(f"Invalid expense enrichment configuration: {str(e)}")
+
+    def submit(self, expense_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue an expense for analysis
+
+        Args:
+            expense_data: Created expense, with its Splitwise "id"
+
+        Returns:
+            Dict: The pending enrichment record
+        """
+        record = self.store.add_pending(expense_data["id"], expense_data)
+        self._executor.submit(self._run, expense_data["id"], expense_data)
+        return record
+
+    def get(self, expense_id: int) -> Optional[Dict[str, Any]]:
+        """Return the current enrichment of an expense"""
+        return self.store.get(expense_id)
+
+    def _run(self, expense_id: int, expense_data: Dict[str, Any]) -> None:
+        try:
+            annotation = self.analyze(expense_data)
+        except Exception as e:
+            logger.error(f"Enrichment of expense {expense_id} failed: {str(e)}")
+            self.store.update(expense_id, status=ENRICHMENT_FAILED, error=str(e))
+            return
+        # The analysis falls back to "uncategorized" instead of raising
+        error = annotation.get("analysis_error")
+        self.store.update(
+            expense_id,
+            status=ENRICHMENT_FAILED if error else ENRICHMENT_SUCCEEDED,
+            annotation=annotation,
+            error=error,
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool and close the store"""
+        self._executor.shutdown(wait=wait)
+        self.store.close()
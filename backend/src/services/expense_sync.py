@@ -0,0 +1,459 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from ..config.storage_config import data_path
+from ..models.splitwise import Member, StoredExpense
+
+logger = logging.getLogger(__name__)
+
+# Upserts remembered by changed_since before consumers must reload everything
+CHANGE_LOG_SIZE = 256
+
+
+def _scope(group_id: Optional[int]) -> str:
+    return "all" if group_id is None else f"group:{group_id}"
+
+
+class ExpenseStore:
+    """Local SQLite copy of Splitwise expenses and their per-user shares"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        # (write number, expense IDs) of recent upserts
+        self._changes: Deque[Tuple[int, List[int]]] = deque(maxlen=CHANGE_LOG_SIZE)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS expenses (
+                id INTEGER PRIMARY KEY,
+                group_id INTEGER,
+                description TEXT,
+                cost REAL NOT NULL,
+                currency_code TEXT,
+                date TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                deleted_at TEXT,
+                created_by_id INTEGER,
+                created_by_name TEXT,
+                category TEXT,
+                payment INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_expenses_group_date
+                ON expenses (group_id, date DESC);
+            CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date DESC);
+            CREATE TABLE IF NOT EXISTS expense_shares (
+                expense_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                user_name TEXT,
+                paid_share REAL NOT NULL,
+                owed_share REAL NOT NULL,
+                PRIMARY KEY (expense_id, user_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                scope TEXT PRIMARY KEY,
+                cursor TEXT,
+                last_synced_at REAL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def upsert_expenses(self, expenses: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace expenses and their shares; returns the row count"""
+        count = 0
+        with self._lock:
+            self._writes += 1
+            changed: List[int] = []
+            self._changes.append((self._writes, changed))
+            for expense in expenses:
+                changed.append(expense["id"])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO expenses (id, group_id, description, cost, "
+                    "currency_code, date, created_at, updated_at, deleted_at, "
+                    "created_by_id, created_by_name, category, payment) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        expense["id"],
+                        expense["group_id"],
+                        expense["description"],
+                        expense["amount"],
+                        expense["currency_code"],
+                        expense["date"],
+                        expense["created_at"],
+                        expense["updated_at"],
+                        expense["deleted_at"],
+                        expense["created_by"]["id"],
+                        expense["created_by"]["name"],
+                        expense["category"],
+                        int(bool(expense["payment"])),
+                    ),
+                )
+                self._conn.execute(
+                    "DELETE FROM expense_shares WHERE expense_id = ?", (expense["id"],)
+                )
+                self._conn.executemany(
+                    "INSERT INTO expense_shares "
+                    "(expense_id, user_id, user_name, paid_share, owed_share) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            expense["id"],
+                            share["user_id"],
+                            share["name"],
+                            share["paid_share"],
+                            share["owed_share"],
+                        )
+                        for share in expense["shares"]
+                    ],
+                )
+                count += 1
+            self._conn.commit()
+        return count
+
+    def get_sync_state(self, scope: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor, last_synced_at FROM sync_state WHERE scope = ?", (scope,)
+            ).fetchone()
+        if row is None:
+            return {"cursor": None, "last_synced_at": None}
+        return {"cursor": row[0], "last_synced_at": row[1]}
+
+    def set_sync_state(self, scope: str, cursor: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (scope, cursor, last_synced_at) "
+                "VALUES (?, ?, ?)",
+                (scope, cursor, time.time()),
+            )
+            self._conn.commit()
+
+    def query_expenses(
+        self,
+        group_id: Optional[int] = None,
+        limit: int = 50,
+        offset: int = 0,
+        include_deleted: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Return a page of locally stored expenses, newest first
+
+        Args:
+            group_id: Optional group ID to filter expenses
+            limit: Page size
+            offset: Number of expenses to skip
+            include_deleted: Whether to include expenses deleted in Splitwise
+
+        Returns:
+            Dict: items for the page plus the total matching count
+        """
+        clauses, params = [], []
+        if group_id is not None:
+            clauses.append("group_id = ?")
+            params.append(group_id)
+        if not include_deleted:
+            clauses.append("deleted_at IS NULL")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM expenses {where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT id, group_id, description, cost, currency_code, date, "
+                "updated_at, deleted_at, created_by_id, created_by_name, category "
+                f"FROM expenses {where} ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+
+        items = [
+            StoredExpense(
+                id=row[0],
+                group_id=row[1],
+                description=row[2],
+                amount=row[3],
+                currency_code=row[4],
+                date=row[5],
+                updated_at=row[6],
+                deleted_at=row[7],
+                created_by=Member(row[8], row[9]),
+                category=row[10],
+            )
+            for row in rows
+        ]
+        return {"items": items, "total": total, "limit": limit, "offset": offset}
+
+    def group_shares(
+        self, group_id: int
+    ) -> Dict[str, List[Tuple[int, int, float, float]]]:
+        """
+        Return the per-user shares of a group's live expenses, payments included
+
+        Returns:
+            Dict: (expense_id, user_id, paid_share, owed_share) rows per currency
+        """
+        with self._lock:
+            currencies = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT currency_code FROM expenses "
+                    "WHERE group_id = ? AND deleted_at IS NULL",
+                    (group_id,),
+                )
+            ]
+            return {
+                currency or "": self._conn.execute(
+                    "SELECT s.expense_id, s.user_id, s.paid_share, s.owed_share "
+                    "FROM expenses e JOIN expense_shares s ON s.expense_id = e.id "
+                    "WHERE e.group_id = ? AND e.deleted_at IS NULL "
+                    "AND e.currency_code IS ?",
+                    (group_id, currency),
+                ).fetchall()
+                for currency in currencies
+            }
+
+    def group_member_names(self, group_id: int) -> Dict[int, str]:
+        """Return the latest known name of everyone with a share in the group"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.user_id, s.user_name FROM expenses e "
+                "JOIN expense_shares s ON s.expense_id = e.id "
+                "WHERE e.group_id = ? ORDER BY e.updated_at",
+                (group_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def analytics_rows(
+        self, expense_ids: Optional[List[int]] = None
+    ) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Return live, non-payment expenses and their shares for analytics
+
+        Args:
+            expense_ids: Only these expenses; all of them when omitted
+
+        Returns:
+            Tuple: (id, group_id, cost, currency_code, month, category,
+                description) rows, with month as YYYY-MM, and (expense_id,
+                user_id, user_name, paid_share, owed_share) rows
+        """
+        where = "e.deleted_at IS NULL AND e.payment = 0"
+        params: Tuple = ()
+        if expense_ids is not None:
+            where += " AND e.id IN (SELECT value FROM json_each(?))"
+            params = (json.dumps(expense_ids),)
+        with self._lock:
+            expenses = self._conn.execute(
+                "SELECT e.id, e.group_id, e.cost, e.currency_code, "
+                "substr(e.date, 1, 7), e.category, e.description "
+                f"FROM expenses e WHERE {where}",
+                params,
+            ).fetchall()
+            shares = self._conn.execute(
+                "SELECT s.expense_id, s.user_id, s.user_name, s.paid_share, "
+                "s.owed_share FROM expenses e "
+                f"JOIN expense_shares s ON s.expense_id = e.id WHERE {where}",
+                params,
+            ).fetchall()
+        return expenses, shares
+
+    def changed_since(self, writes: int) -> Tuple[int, Optional[List[int]]]:
+        """
+        Return the IDs of expenses upserted after a given write number
+
+        Args:
+            writes: First element of an earlier data_version()
+
+        Returns:
+            Tuple: Current write number and the changed IDs, or None when the
+                change log no longer reaches back that far
+        """
+        with self._lock:
+            if writes == self._writes:
+                return writes, []
+            if writes > self._writes or not self._changes:
+                return self._writes, None
+            if self._changes[0][0] > writes + 1:
+                return self._writes, None
+            changed = {
+                expense_id
+                for number, expense_ids in self._changes
+                if number > writes
+                for expense_id in expense_ids
+            }
+            return self._writes, sorted(changed)
+
+    def data_version(self) -> Tuple[int, int]:
+        """Changes whenever this or another connection commits a write"""
+        with self._lock:
+            # PRAGMA data_version only tracks commits by other connections
+            return self._writes, self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> "ExpenseStore":
+        """Build a store from EXPENSE_STORE_DB_PATH"""
+        return cls(data_path(os.getenv("EXPENSE_STORE_DB_PATH", "expenses.db")))
+
+    def categorized_descriptions(self, limit: int = 5000) -> List[Tuple[str, str]]:
+        """Return (description, category) of the newest categorized expenses"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT description, category FROM expenses "
+                "WHERE category IS NOT NULL AND deleted_at IS NULL AND payment = 0 "
+                "ORDER BY date DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ExpenseSyncEngine:
+    """
+    Incrementally mirrors Splitwise expenses into an ExpenseStore.
+
+    Each sync pages through expenses updated after the stored cursor, so the
+    network cost is proportional to what changed since the last sync rather than
+    the size of the history. Deleted expenses are kept with deleted_at set.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        store: ExpenseStore,
+        page_size: int = 100,
+        min_interval: float = 60.0,
+    ):
+        self.client = client
+        self.store = store
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self._scope_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client: Any) -> "ExpenseSyncEngine":
+        """Build an engine from EXPENSE_STORE_* / EXPENSE_SYNC_* environment variables"""
+        return cls(
+            client,
+            ExpenseStore.from_env(),
+            page_size=int(os.getenv("EXPENSE_SYNC_PAGE_SIZE", "100")),
+            min_interval=float(os.getenv("EXPENSE_SYNC_MIN_INTERVAL_SECONDS", "60")),
+        )
+
+    def _scope_lock(self, scope: str) -> threading.Lock:
+        with self._lock:
+            return self._scope_locks.setdefault(scope, threading.Lock())
+
+    def sync(self, group_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Pull expenses updated since the last sync of this scope
+
+        Args:
+            group_id: Optional group ID; None syncs expenses across all groups
+
+        Returns:
+            Dict: Counts of pages, fetched, upserted and deleted expenses, and the new cursor
+        """
+        scope = _scope(group_id)
+        with self._scope_lock(scope):
+            cursor = self.store.get_sync_state(scope)["cursor"]
+            new_cursor = cursor
+            pages = fetched = deleted = 0
+            offset = 0
+
+            while True:
+                page = self.client.getExpenses(
+                    group_id=group_id,
+                    updated_after=cursor,
+                    limit=self.page_size,
+                    offset=offset,
+                )
+                pages += 1
+                records = [self._to_record(expense) for expense in page]
+                self.store.upsert_expenses(records)
+                fetched += len(records)
+                deleted += sum(1 for record in records if record["deleted_at"])
+                for record in records:
+                    if record["updated_at"] and (
+                        new_cursor is None or record["updated_at"] > new_cursor
+                    ):
+                        new_cursor = record["updated_at"]
+
+                if len(page) < self.page_size:
+                    break
+                offset += self.page_size
+
+            self.store.set_sync_state(scope, new_cursor)
+            logger.info(
+                f"Synced {fetched} expenses ({deleted} deleted) for {scope} in {pages} pages"
+            )
+            return {
+                "scope": scope,
+                "pages": pages,
+                "fetched": fetched,
+                "deleted": deleted,
+                "cursor": new_cursor,
+            }
+
+    def ensure_fresh(self, group_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Sync unless this scope (or the all-groups scope) synced within min_interval"""
+        now = time.time()
+        for scope in {_scope(group_id), _scope(None)}:
+            last = self.store.get_sync_state(scope)["last_synced_at"]
+            if last is not None and now - last < self.min_interval:
+                return None
+        return self.sync(group_id)
+
+    def query(
+        self,
+        group_id: Optional[int] = None,
+        limit: int = 50,
+        offset: int = 0,
+        include_deleted: bool = False,
+    ) -> Dict[str, Any]:
+        """Return a page of expenses from the local store"""
+        return self.store.query_expenses(group_id, limit, offset, include_deleted)
+
+    @staticmethod
+    def _to_record(expense: Any) -> Dict[str, Any]:
+        created_by = expense.getCreatedBy()
+        category = expense.getCategory()
+        return {
+            "id": expense.getId(),
+            "group_id": expense.getGroupId(),
+            "description": expense.getDescription(),
+            "amount": float(expense.getCost()),
+            "currency_code": expense.getCurrencyCode(),
+            "date": expense.getDate(),
+            "created_at": expense.getCreatedAt(),
+            "updated_at": expense.getUpdatedAt(),
+            "deleted_at": expense.getDeletedAt(),
+            "created_by": {
+                "id": created_by.getId() if created_by else None,
+                "name": created_by.getFirstName() if created_by else None,
+            },
+            "category": category.getName() if category else None,
+            "payment": expense.getPayment(),
+            "shares": [
+                {
+                    "user_id": user.getId(),
+                    "name": user.getFirstName(),
+                    "paid_share": float(user.getPaidShare()),
+                    "owed_share": float(user.getOwedShare()),
+                }
+                for user in expense.getUsers() or []
+            ],
+        }
@@ -0,0 +1,73 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from ..models.splitwise import Group
+from ..utils.cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+GROUP_LIST_KEY = "groups"
+
+
+class GroupSummaryService:
+    """
+    Builds group summaries with at most one expense request per group.
+
+    Per-group lookups fan out over a bounded thread pool, and results are cached
+    for a short TTL. Writes to a group must call invalidate() so the next read
+    reflects them.
+    """
+
+    def __init__(self, client: Any, max_workers: int = 8, ttl: float = 30.0):
+        self.client = client
+        self.ttl = ttl
+        self.cache = MemoryCache(max_entries=1024, default_ttl=ttl)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="group-summary"
+        )
+
+    @classmethod
+    def from_env(cls, client: Any) -> "GroupSummaryService":
+        """Build a service from GROUP_SUMMARY_* environment variables"""
+        return cls(
+            client,
+            max_workers=int(os.getenv("GROUP_SUMMARY_MAX_WORKERS", "8")),
+            ttl=float(os.getenv("GROUP_SUMMARY_TTL_SECONDS", "30")),
+        )
+
+    def get_groups(self) -> List[Group]:
+        """Return summaries for all groups of the current user"""
+        cached = self.cache.get(GROUP_LIST_KEY)
+        if cached is not None:
+            return cached
+
+        groups = self.client.getGroups()
+        totals = list(
+            self._executor.map(self._group_total, [group.getId() for group in groups])
+        )
+        summaries = [
+            Group.from_splitwise(group, total) for group, total in zip(groups, totals)
+        ]
+        self.cache.set(GROUP_LIST_KEY, summaries)
+        return summaries
+
+    def _group_total(self, group_id: int) -> float:
+        key = f"group:{group_id}:total"
+        total = self.cache.get(key)
+        if total is None:
+            # A single request per group; the latest expense provides the total
+            expenses = self.client.getExpenses(group_id=group_id, limit=1)
+            total = float(expenses[0].getCost()) if expenses else 0
+            self.cache.set(key, total)
+        return total
+
+    def invalidate(self, group_id: Optional[int] = None) -> None:
+        """Drop cached summaries affected by a write to the given group"""
+        self.cache.delete(GROUP_LIST_KEY)
+        if group_id is not None:
+            self.cache.delete(f"group:{group_id}:total")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
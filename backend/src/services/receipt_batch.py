@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from ..utils.execution_pool import ExecutionPool, PoolSaturatedError
+from ..utils.image_pipeline import to_data_url
+
+logger = logging.getLogger(__name__)
+
+BATCH_STAGES = ("prepare", "upload", "extract")
+
+# Execution pool route whose admission limits apply to every stage call
+BATCH_ROUTE = "receipt_batch"
+
+
+@dataclass
+class BatchItem:
+    """One receipt of a batch: a spooled upload, or the reason it was rejected"""
+
+    index: int
+    filename: str
+    upload: Optional[Any] = None
+    error: Optional[str] = None
+    preparing: bool = False
+
+
+class StageLimit:
+    """Concurrency bound and counters for one pipeline stage"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+class ReceiptBatchPipeline:
+    """
+    Processes many receipts through overlapping optimize, upload and extract stages.
+
+    Each stage has its own concurrency limit, so while one receipt waits on the
+    LLM the next ones are already being optimized and archived. With inline
+    image delivery a receipt's upload and extraction also run at the same time.
+    Stage calls run on the shared execution pool under its admission limits; a
+    receipt whose stage is rejected fails with the pool's retry hint. Results are
+    yielded in completion order.
+    """
+
+    def __init__(
+        self,
+        receipt_agent: Any,
+        limits: Optional[Dict[str, int]] = None,
+        max_files: int = 50,
+        pool: Optional[ExecutionPool] = None,
+    ):
+        limits = {"prepare": 2, "upload": 8, "extract": 4, **(limits or {})}
+        self.receipt_agent = receipt_agent
+        self.max_files = max_files
+        self.stages = {name: StageLimit(limits[name]) for name in BATCH_STAGES}
+        self.batches = 0
+        self._owns_pool = pool is None
+        self.pool = pool or ExecutionPool()
+
+    @classmethod
+    def from_env(
+        cls, receipt_agent: Any, pool: Optional[ExecutionPool] = None
+    ) -> "ReceiptBatchPipeline":
+        """Build a pipeline from RECEIPT_BATCH_* environment variables"""
+        try:
+            limits = {
+                name: int(os.getenv(f"RECEIPT_BATCH_{name.upper()}_CONCURRENCY"))
+                for name in BATCH_STAGES
+                if os.getenv(f"RECEIPT_BATCH_{name.upper()}_CONCURRENCY")
+            }
+            max_files = int(os.getenv("RECEIPT_BATCH_MAX_FILES", "50"))
+        except ValueError as e:
+            logger.error(f"Invalid receipt batch configuration: {str(e)}")
+            raise ValueError(f"Invalid receipt batch configuration: {str(e)}")
+        return cls(receipt_agent, limits, max_files, pool)
+
+    async def _stage(self, name: str, func: Callable, *args: Any) -> Any:
+        stage = self.stages[name]
+        async with stage.semaphore():
+            stage.running += 1
+            started = time.monotonic()
+            try:
+                result = await self.pool.run(BATCH_ROUTE, func, *args)
+                stage.completed += 1
+                return result
+            except Exception:
+                stage.failed += 1
+                raise
+            finally:
+                stage.running -= 1
+                stage.busy_seconds += time.monotonic() - started
+
+    async def _archive(self, optimized: bytes) -> Tuple[Optional[str], Optional[str]]:
+        """Return (image_url, error) of a background archive upload"""
+        store_image = self.receipt_agent.s3_helper.store_image
+        try:
+            return await self._stage("upload", store_image, optimized), None
+        except Exception as e:
+            logger.error(f"Receipt archive upload failed: {str(e)}")
+            return None, str(e)
+
+    async def _run_stages(self, item: BatchItem) -> Dict[str, Any]:
+        agent = self.receipt_agent
+        if item.error is not None:
+            raise ValueError(item.error)
+        item.preparing = True
+        try:
+            # Returns only once the worker is done reading, even when cancelled
+            prepared = await self._stage("prepare", agent.prepare_receipt, item.upload)
+        finally:
+            item.upload.close()
+
+        if prepared.cached is not None:
+            return {"status": "success", "cached": True, "data": prepared.cached}
+
+        archive_error = None
+        if agent.image_delivery == "inline":
+            archive = None
+            if agent.archive_enabled:
+                archive = asyncio.ensure_future(self._archive(prepared.optimized))
+            result = await self._stage(
+                "extract", agent.extract_receipt, to_data_url(prepared.optimized)
+            )
+            image_url, archive_error = await archive if archive else (None, None)
+        else:
+            image_url = await self._stage(
+                "upload", agent.s3_helper.store_image, prepared.optimized
+            )
+            result = await self._stage("extract", agent.extract_receipt, image_url)
+
+        data = agent.complete_receipt(prepared, result, image_url, archive_error)
+        return {"status": "success", "cached": False, "data": data}
+
+    async def process_item(self, item: BatchItem) -> Dict[str, Any]:
+        """
+        Run one receipt through the pipeline stages
+
+        Args:
+            item: Receipt to process; its upload is closed once it is prepared
+
+        Returns:
+            Dict: Result line with index, filename, status, data or error and
+                elapsed_ms
+        """
+        started = time.monotonic()
+        try:
+            outcome = await self._run_stages(item)
+        except PoolSaturatedError as e:
+            outcome = {"status": "error", "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            outcome = {"status": "error", "error": str(e)}
+        return {
+            "index": item.index,
+            "filename": item.filename,
+            **outcome,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    async def run(self, items: List[BatchItem]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a batch and yield each receipt's result as soon as it finishes
+
+        A final summary line closes the stream. If the consumer stops early
+        (e.g. the client disconnects), unfinished receipts are cancelled.
+
+        Args:
+            items: Receipts to process
+
+        Yields:
+            Dict: Per-receipt result lines, then {"summary": {...}}
+        """
+        self.batches += 1
+        started = time.monotonic()
+        pending = [asyncio.ensure_future(self.process_item(item)) for item in items]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(pending):
+                line = await next_done
+                succeeded += line["status"] == "success"
+                yield line
+        finally:
+            for future in pending:
+                future.cancel()
+            # Receipts already being prepared close their own upload
+            for item in items:
+                if item.upload is not None and not item.preparing:
+                    item.upload.close()
+
+        yield {
+            "summary": {
+                "total": len(items),
+                "succeeded": succeeded,
+                "failed": len(items) - succeeded,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-stage concurrency and utilization"""
+        return {
+            "batches": self.batches,
+            "stages": {name: stage.snapshot() for name, stage in self.stages.items()},
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the stage workers, unless they belong to the shared execution pool"""
+        if self._owns_pool:
+            self.pool.shutdown(wait=wait)
@@ -0,0 +1,385 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Set
+
+from ..config.storage_config import data_path
+from ..utils.execution_pool import ExecutionPool, PoolSaturatedError
+from ..utils.serialization import from_json, to_json
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Jobs run under the execution pool's receipt limits, like synchronous uploads
+JOB_ROUTE = "receipts"
+
+
+class JobStore(ABC):
+    """Persistence backend for receipt processing jobs"""
+
+    # Seconds an unfinished job stays owned without renew(); None if not leased
+    lease_seconds: Optional[float] = None
+
+    @abstractmethod
+    def create(self, job_id: str) -> Dict[str, Any]:
+        """Create a new queued job and return it"""
+        pass
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update fields (status, result, error) of an existing job"""
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job by ID, or None if it does not exist"""
+        pass
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs last updated before the given timestamp"""
+        pass
+
+    def renew(self) -> None:
+        """Extend the lease on the unfinished jobs this store created"""
+        pass
+
+    def close(self) -> None:
+        """Release any resources held by the store"""
+        pass
+
+    @staticmethod
+    def _new_job(job_id: str) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "id": job_id,
+            "status": JOB_QUEUED,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+
+
+class InMemoryJobStore(JobStore):
+    """Job store kept in process memory; jobs are lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> Dict[str, Any]:
+        job = self._new_job(job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+            return dict(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job["status"] in (JOB_SUCCEEDED, JOB_FAILED)
+                and job["updated_at"] < older_than
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store persisted to a SQLite database file
+
+    Several processes may share the file. Each unfinished job is leased by the
+    store that created it, which keeps the lease alive through renew(); a job
+    whose lease ran out belonged to a process that stopped and is marked failed.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS receipt_jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, result TEXT, error TEXT, owner TEXT, "
+            "lease_expires REAL)"
+        )
+        # Databases created before job leases lack the lease columns
+        info = self._conn.execute("PRAGMA table_info(receipt_jobs)")
+        columns = {row[1] for row in info}
+        for column, kind in (("owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                self._conn.execute(
+                    f"ALTER TABLE receipt_jobs ADD COLUMN {column} {kind}"
+                )
+        self._expire()
+        self._conn.commit()
+
+    def _expire(self, job_id: Optional[str] = None) -> None:
+        # Jobs whose owner stopped renewing their lease cannot resume
+        now = time.time()
+        query = (
+            "UPDATE receipt_jobs SET status = ?, error = ?, updated_at = ? "
+            "WHERE status IN (?, ?) AND (lease_expires IS NULL OR lease_expires < ?)"
+        )
+        params = [JOB_FAILED, "Interrupted by service restart", now]
+        params += [JOB_QUEUED, JOB_RUNNING, now]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        self._conn.execute(query, params)
+
+    def create(self, job_id: str) -> Dict[str, Any]:
+        job = self._new_job(job_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO receipt_jobs "
+                "(id, status, created_at, updated_at, owner, lease_expires) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"],
+                    job["status"],
+                    job["created_at"],
+                    job["updated_at"],
+                    self.owner,
+                    job["created_at"] + self.lease_seconds,
+                ),
+            )
+            self._conn.commit()
+        return job
+
+    def renew(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE receipt_jobs SET lease_expires = ? "
+                "WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + self.lease_seconds, self.owner, JOB_QUEUED, JOB_RUNNING),
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = to_json(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE receipt_jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire(job_id)
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT id, status, created_at, updated_at, result, error "
+                "FROM receipt_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "updated_at": row[3],
+            "result": from_json(row[4]) if row[4] else None,
+            "error": row[5],
+        }
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM receipt_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_SUCCEEDED, JOB_FAILED, older_than),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ReceiptJobRunner:
+    """
+    Runs receipt processing jobs in the background on the shared execution pool
+
+    Jobs are admitted under the pool's receipt route limits, so they compete
+    for the same slots as synchronous uploads; a job that is not admitted yet
+    stays queued and tries again after the pool's retry hint. submit() must be
+    called from the event loop that runs the jobs.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        process: Callable[[bytes], Dict],
+        pool: Optional[ExecutionPool] = None,
+        max_queued: int = 100,
+        ttl_seconds: int = 86400,
+    ):
+        self.store = store
+        self.process = process
+        self._owns_pool = pool is None
+        self.pool = pool or ExecutionPool()
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopped = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        if store.lease_seconds:
+            self._heartbeat = threading.Thread(
+                target=self._renew_leases, name="receipt-job-lease", daemon=True
+            )
+            self._heartbeat.start()
+
+    @classmethod
+    def from_env(
+        cls, process: Callable[[bytes], Dict], pool: Optional[ExecutionPool] = None
+    ) -> "ReceiptJobRunner":
+        """Build a runner from RECEIPT_JOB_* environment variables"""
+        backend = os.getenv("RECEIPT_JOB_STORE", "memory").lower()
+        if backend == "sqlite":
+            store = SQLiteJobStore(
+                data_path(os.getenv("RECEIPT_JOB_DB_PATH", "receipt_jobs.db")),
+                lease_seconds=float(os.getenv("RECEIPT_JOB_LEASE_SECONDS", "60")),
+            )
+        elif backend == "memory":
+            store = InMemoryJobStore()
+        else:
+            raise ValueError(f"Unsupported receipt job store: {backend}")
+
+        return cls(
+            store=store,
+            process=process,
+            pool=pool,
+            max_queued=int(os.getenv("RECEIPT_JOB_MAX_QUEUED", "100")),
+            ttl_seconds=int(os.getenv("RECEIPT_JOB_TTL_SECONDS", "86400")),
+        )
+
+    def submit(self, image_data: bytes) -> Dict[str, Any]:
+        """
+        Queue a receipt image for background processing
+
+        Args:
+            image_data: Raw image bytes, or a spooled upload that the runner
+                closes once the job finishes
+
+        Returns:
+            Dict: The newly created job record
+
+        Raises:
+            PoolSaturatedError: If too many jobs are already outstanding
+        """
+        with self._lock:
+            if self._outstanding >= self.max_queued:
+                raise PoolSaturatedError(
+                    "Receipt job queue is full, please retry later",
+                    status_code=503,
+                    retry_after=5,
+                )
+            self._outstanding += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            self.store.purge(time.time() - self.ttl_seconds)
+            job = self.store.create(uuid.uuid4().hex)
+            task = loop.create_task(self._run(job["id"], image_data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return job
+        except Exception:
+            with self._lock:
+                self._outstanding -= 1
+            self._close(image_data)
+            raise
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the current state of a job"""
+        return self.store.get(job_id)
+
+    async def _run(self, job_id: str, image_data: bytes) -> None:
+        try:
+            while True:
+                try:
+                    await self.pool.run_local(
+                        JOB_ROUTE, self._execute, job_id, image_data
+                    )
+                    return
+                except PoolSaturatedError as e:
+                    # Not admitted yet; the job stays queued until a slot frees up
+                    await asyncio.sleep(e.retry_after)
+        finally:
+            self._close(image_data)
+            with self._lock:
+                self._outstanding -= 1
+
+    def _execute(self, job_id: str, image_data: bytes) -> None:
+        try:
+            self.store.update(job_id, status=JOB_RUNNING)
+            result = self.process(image_data)
+            self.store.update(job_id, status=JOB_SUCCEEDED, result=result)
+        except Exception as e:
+            logger.error(f"Receipt job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status=JOB_FAILED, error=str(e))
+
+    def _renew_leases(self) -> None:
+        interval = self.store.lease_seconds / 3
+        while not self._stopped.wait(interval):
+            if not self._outstanding:
+                continue
+            try:
+                self.store.renew()
+            except Exception as e:
+                logger.error(f"Failed to renew receipt job leases: {str(e)}")
+
+    @staticmethod
+    def _close(image_data: Any) -> None:
+        # Spooled uploads hold a temporary file until the job is done with them
+        close = getattr(image_data, "close", None)
+        if close is not None:
+            close()
+
+    async def drain(self) -> None:
+        """Wait for every submitted job to finish"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop renewing leases, close the store and any pool the runner owns"""
+        self._stopped.set()
+        if self._heartbeat is not None and wait:
+            self._heartbeat.join()
+        if self._owns_pool:
+            self.pool.shutdown(wait=wait)
+        self.store.close()
@@ -0,0 +1,225 @@
+import heapq
+import logging
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .expense_sync import ExpenseStore
+
+logger = logging.getLogger(__name__)
+
+# Expenses per dense block, so memory stays flat for groups with long histories
+BLOCK_SIZE = 4096
+
+
+def balance_matrix(
+    expense_index: np.ndarray,
+    member_index: np.ndarray,
+    paid: np.ndarray,
+    owed: np.ndarray,
+    members: int,
+    block_size: int = BLOCK_SIZE,
+) -> np.ndarray:
+    """
+    Return who owes whom across a set of expenses
+
+    In each expense, members who owed more than they paid owe the difference
+    to the members who paid more than they owed, in proportion to how much
+    each of those overpaid.
+
+    Args:
+        expense_index: Dense expense index (0..E-1) of each share row
+        member_index: Dense member index (0..members-1) of each share row
+        paid: Paid share of each row
+        owed: Owed share of each row
+        members: Number of members
+        block_size: Expenses per dense block
+
+    Returns:
+        np.ndarray: members x members matrix; [i, j] is what i owes j
+    """
+    owes = np.zeros((members, members))
+    if len(expense_index) == 0:
+        return owes
+    order = np.argsort(expense_index, kind="stable")
+    expense_index, member_index = expense_index[order], member_index[order]
+    net = paid[order] - owed[order]
+    expenses = int(expense_index[-1]) + 1
+    starts = np.arange(0, expenses + block_size, block_size)
+    bounds = np.searchsorted(expense_index, starts)
+
+    for block, start in enumerate(bounds[:-1]):
+        end = bounds[block + 1]
+        if start == end:
+            continue
+        rows = expense_index[start:end] - block * block_size
+        dense = np.zeros((min(block_size, expenses - block * block_size), members))
+        # (expense, member) is unique in the store, so plain assignment suffices
+        dense[rows, member_index[start:end]] = net[start:end]
+        credit = np.clip(dense, 0, None)
+        debit = np.clip(-dense, 0, None)
+        total = credit.sum(axis=1, keepdims=True)
+        weights = np.divide(credit, total, out=np.zeros_like(credit), where=total > 0)
+        owes += debit.T @ weights
+    np.fill_diagonal(owes, 0)
+    return owes
+
+
+def to_cents(balances: np.ndarray) -> np.ndarray:
+    """Round balances to integer cents that still sum to zero"""
+    cents = np.rint(balances * 100).astype(np.int64)
+    residual = int(cents.sum())
+    if residual and len(cents):
+        # Rounding noise goes to the member with the largest balance
+        cents[int(np.argmax(np.abs(cents)))] -= residual
+    return cents
+
+
+def settle_up(cents: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """
+    Plan transfers that clear every balance
+
+    Debtors and creditors with equal amounts are paired first. Then the
+    largest debtor pays the largest creditor until both sides are exhausted.
+    This takes at most n - 1 transfers for n members with a non-zero balance.
+
+    Args:
+        cents: Net balance per member in cents; positive means owed money
+
+    Returns:
+        List[Tuple[int, int, int]]: (payer index, payee index, cents) transfers
+    """
+    transfers = []
+    creditors: Dict[int, List[int]] = {}
+    debtors = []
+    for index, amount in enumerate(cents):
+        if amount > 0:
+            creditors.setdefault(int(amount), []).append(index)
+        elif amount < 0:
+            debtors.append(index)
+
+    remaining = []
+    for index in debtors:
+        matches = creditors.get(-int(cents[index]))
+        if matches:
+            transfers.append((index, matches.pop(), -int(cents[index])))
+        else:
+            remaining.append(index)
+
+    payers = [(int(cents[index]), index) for index in remaining]
+    payees = [
+        (-amount, index) for amount, indexes in creditors.items() for index in indexes
+    ]
+    heapq.heapify(payers)
+    heapq.heapify(payees)
+    while payers and payees:
+        debt, payer = heapq.heappop(payers)
+        credit, payee = heapq.heappop(payees)
+        amount = min(-debt, -credit)
+        transfers.append((payer, payee, amount))
+        if -debt > amount:
+            heapq.heappush(payers, (debt + amount, payer))
+        if -credit > amount:
+            heapq.heappush(payees, (credit + amount, payee))
+    return transfers
+
+
+class SettlementEngine:
+    """
+    Computes group balances and settle-up plans from the local expense store.
+
+    Shares are loaded into NumPy arrays per currency. Pairwise debts come from
+    a blocked matrix product and the settle-up plan is computed on per-member
+    net balances, so the cost grows linearly with the number of shares.
+    Results are reused until the store changes.
+    """
+
+    def __init__(self, store: ExpenseStore, block_size: int = BLOCK_SIZE):
+        self.store = store
+        self.block_size = block_size
+        self._results: Dict[int, Tuple[Any, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def balances(self, group_id: int) -> Dict[str, Any]:
+        """
+        Return balances, pairwise debts and a settle-up plan for a group
+
+        Args:
+            group_id: Splitwise group ID; the group must have been synced
+
+        Returns:
+            Dict: Expense count and, per currency, member totals, simplified
+                pairwise debts and the minimal transfer plan
+        """
+        version = self.store.data_version()
+        with self._lock:
+            cached = self._results.get(group_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        shares = self.store.group_shares(group_id)
+        names = self.store.group_member_names(group_id) if shares else {}
+        currencies = {
+            currency: self._currency_balances(np.asarray(rows, dtype=float), names)
+            for currency, rows in sorted(shares.items())
+            if rows
+        }
+        result = {
+            "group_id": group_id,
+            "expenses": sum(balances["expenses"] for balances in currencies.values()),
+            "currencies": currencies,
+        }
+        with self._lock:
+            self._results[group_id] = (version, result)
+        return result
+
+    def _currency_balances(
+        self, shares: np.ndarray, names: Dict[int, str]
+    ) -> Dict[str, Any]:
+        expense_ids, expense_index = np.unique(
+            shares[:, 0].astype(np.int64), return_inverse=True
+        )
+        members, member_index = np.unique(
+            shares[:, 1].astype(np.int64), return_inverse=True
+        )
+        paid, owed = shares[:, 2], shares[:, 3]
+        owes = balance_matrix(
+            expense_index, member_index, paid, owed, len(members), self.block_size
+        )
+
+        paid_totals = np.bincount(member_index, paid, minlength=len(members))
+        owed_totals = np.bincount(member_index, owed, minlength=len(members))
+        cents = to_cents(paid_totals - owed_totals)
+        net_debts = np.clip(owes - owes.T, 0, None)
+        people = [
+            {"id": user_id, "name": names.get(user_id)} for user_id in members.tolist()
+        ]
+
+        debtors, creditors = np.nonzero(np.rint(net_debts * 100) > 0)
+        return {
+            "expenses": len(expense_ids),
+            "members": [
+                {
+                    **person,
+                    "paid": round(float(paid_total), 2),
+                    "owed": round(float(owed_total), 2),
+                    "balance": balance / 100,
+                }
+                for person, paid_total, owed_total, balance in zip(
+                    people, paid_totals, owed_totals, cents.tolist()
+                )
+            ],
+            "debts": [
+                {"from": people[i], "to": people[j], "amount": round(amount, 2)}
+                for i, j, amount in zip(
+                    debtors.tolist(),
+                    creditors.tolist(),
+                    net_debts[debtors, creditors].tolist(),
+                )
+            ],
+            "transfers": [
+                {"from": people[payer], "to": people[payee], "amount": amount / 100}
+                for payer, payee, amount in settle_up(cents.tolist())
+            ],
+        }
@@ -0,0 +1,22 @@
+import pytest
+from src.agents.receipt_agent import ReceiptAgent
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    # SQLite stores with default paths are created per test, not in the tree
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path / "data"))
+
+
+@pytest.fixture
+def receipt_env(monkeypatch):
+    # Keep the receipt cache and item store in memory
+    monkeypatch.setenv("AWS_S3_BUCKET", "receipts-bucket")
+    monkeypatch.setenv("RECEIPT_CACHE_DB_PATH", "")
+    monkeypatch.setenv("RECEIPT_ITEMS_DB_PATH", "")
+    return monkeypatch
+
+
+@pytest.fixture
+def receipt_agent(receipt_env):
+    return ReceiptAgent()
@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from src.services.analytics import ExpenseAnalytics, ReceiptItemStore, group_sum
+from src.services.expense_sync import ExpenseStore
+
+
+def record(
+    expense_id,
+    cost,
+    description="Groceries",
+    category="groceries",
+    date="2024-01-15T00:00:00Z",
+    group_id=1,
+    currency="USD",
+    payment=False,
+    deleted_at=None,
+):
+    half = cost / 2
+    return {
+        "id": expense_id,
+        "group_id": group_id,
+        "description": description,
+        "amount": cost,
+        "currency_code": currency,
+        "date": date,
+        "created_at": None,
+        "updated_at": None,
+        "deleted_at": deleted_at,
+        "created_by": {"id": 1, "name": "user1"},
+        "category": category,
+        "payment": payment,
+        "shares": [
+            {"user_id": 1, "name": "user1", "paid_share": cost, "owed_share": half},
+            {"user_id": 2, "name": "user2", "paid_share": 0, "owed_share": half},
+        ],
+    }
+
+
+@pytest.fixture
+def analytics(tmp_path):
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    store.upsert_expenses(
+        [
+            record(1, 40, "Trader Joes 12.50"),
+            record(2, 60, "trader joes", date="2024-02-03T00:00:00Z"),
+            record(3, 30, "Uber", "transport", date="2024-02-10T00:00:00Z"),
+            record(4, 25, "Croissants", currency="EUR"),
+            record(5, 100, "Settle up", None, payment=True),
+            record(6, 500, "Deleted", deleted_at="2024-03-01T00:00:00Z"),
+            record(7, 70, "Trader Joes", group_id=2),
+        ]
+    )
+    items = ReceiptItemStore(":memory:")
+    return ExpenseAnalytics(store, items)
+
+
+def test_group_sum_totals_each_key_combination():
+    codes, (totals,), counts = group_sum(
+        [np.array([0, 1, 0, 1]), np.array([0, 0, 0, 1])],
+        [2, 2],
+        [np.array([1.0, 2.0, 3.0, 4.0])],
+        np.array([True, True, True, False]),
+    )
+    assert [c.tolist() for c in codes] == [[0, 1], [0, 0]]
+    assert totals.tolist() == [4.0, 2.0]
+    assert counts.tolist() == [2, 1]
+
+
+def test_category_spend_by_month_skips_payments_and_deleted(analytics):
+    rows = analytics.spend_by_category(group_id=1)
+    assert rows[0] == {
+        "month": "2024-01",
+        "category": "groceries",
+        "currency": "USD",
+        "total": 40.0,
+        "count": 1,
+    }
+    assert [(r["month"], r["category"], r["currency"], r["total"]) for r in rows] == [
+        ("2024-01", "groceries", "USD", 40.0),
+        ("2024-01", "groceries", "EUR", 25.0),
+        ("2024-02", "groceries", "USD", 60.0),
+        ("2024-02", "transport", "USD", 30.0),
+    ]
+
+    totals = analytics.spend_by_category(start="2024-02", end="2024-02", monthly=False)
+    assert {(row["category"], row["total"]) for row in totals} == {
+        ("groceries", 60.0),
+        ("transport", 30.0),
+    }
+    with pytest.raises(ValueError):
+        analytics.spend_by_category(start="2024-13")
+
+
+def test_member_and_vendor_spend(analytics):
+    members = analytics.spend_by_member(group_id=1, end="2024-01")
+    assert [(m["name"], m["currency"], m["paid"], m["owed"]) for m in members] == [
+        ("user1", "USD", 40.0, 20.0),
+        ("user2", "USD", 0.0, 20.0),
+        ("user1", "EUR", 25.0, 12.5),
+        ("user2", "EUR", 0.0, 12.5),
+    ]
+
+    # Descriptions are grouped by their words, so prices and case do not matter
+    vendors = analytics.spend_by_vendor(limit=2)
+    assert vendors[0] == {
+        "vendor": "trader joes",
+        "currency": "USD",
+        "total": 170.0,
+        "count": 3,
+    }
+    assert len(vendors) == 2
+
+
+def test_syncs_patch_only_the_changed_expenses(analytics):
+    analytics.spend_by_category()
+    analytics.store.upsert_expenses(
+        [
+            record(3, 45, "Uber", "transport", date="2024-02-10T00:00:00Z"),
+            record(4, 25, "Croissants", currency="EUR", deleted_at="2024-03-01"),
+            record(8, 10, "Bus", "transport", group_id=None),
+        ]
+    )
+
+    totals = analytics.spend_by_category(monthly=False)
+    assert {(row["category"], row["currency"], row["total"]) for row in totals} == {
+        ("groceries", "USD", 170.0),
+        ("transport", "USD", 55.0),
+    }
+    assert analytics.loads["expenses"] == 1
+    assert analytics.loads["patches"] == 1
+    assert analytics.stats()["expense_rows"] == 5
+
+    # Writes from another connection cannot be patched, so everything reloads
+    other = ExpenseStore(analytics.store.path)
+    other.upsert_expenses([record(9, 5, "Bus", "transport")])
+    other.close()
+    assert analytics.spend_by_vendor()[-1]["vendor"] == "bus"
+    assert analytics.loads["expenses"] == 2
+
+
+def test_receipt_items_by_category_and_vendor(analytics):
+    receipt = {
+        "vendor": {"name": "Trader Joe's"},
+        "transaction": {"date": "2024-01-15T10:00:00"},
+        "items": [
+            {"name": "Bananas", "quantity": 6, "total_price": 1.5, "category": "Food"},
+            {"name": "Soap", "total_price": 4.0, "expense_category": "household"},
+            {"name": "Milk", "quantity": 2, "total_price": 5.0, "category": "food"},
+        ],
+    }
+    assert analytics.receipt_items.add_receipt("receipt-1", receipt) == 3
+    # Re-recording the same receipt replaces its items
+    analytics.receipt_items.add_receipt("receipt-1", receipt)
+
+    assert analytics.spend_by_receipt_item("category") == [
+        {"category": "food", "total": 6.5, "quantity": 8.0, "count": 2},
+        {"category": "household", "total": 4.0, "quantity": 1.0, "count": 1},
+    ]
+    assert analytics.spend_by_receipt_item("vendor", end="2023-12") == []
+    with pytest.raises(ValueError):
+        analytics.spend_by_receipt_item("name")
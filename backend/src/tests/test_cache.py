@@ -0,0 +1,57 @@
+import time
+from src.utils.cache import MemoryCache, SQLiteCache, TieredCache, content_key
+
+
+def test_content_key_is_stable_and_namespaced():
+    assert content_key(b"abc", "raw") == content_key(b"abc", "raw")
+    assert content_key(b"abc", "raw") != content_key(b"abc", "jpeg")
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_evicts_by_size(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    cache.get("a")
+    cache.set("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.stats()["bytes"] <= 30
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "cache.db")
+    TieredCache(MemoryCache(), SQLiteCache(path)).set("k", {"total": 1.5})
+
+    cache = TieredCache(MemoryCache(), SQLiteCache(path))
+    assert cache.get("k") == {"total": 1.5}
+    assert cache.memory.get("k") == {"total": 1.5}
+    assert cache.stats()["hits"] == 1
+
+
+def test_default_db_paths_resolve_under_the_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("RESULTS_DB_PATH", "results.db")
+    cache = TieredCache.from_env("RESULTS", default_ttl=60)
+    assert cache.disk.path == str(tmp_path / "data" / "results.db")
+
+    monkeypatch.setenv("RESULTS_DB_PATH", "")
+    assert TieredCache.from_env("RESULTS", default_ttl=60).disk is None
+    cache.disk.close()
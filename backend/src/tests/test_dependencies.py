@@ -0,0 +1,93 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.api import dependencies
+from src.api.dependencies import LazyProvider
+
+
+def test_provider_builds_once_under_concurrency():
+    builds = []
+
+    def factory():
+        time.sleep(0.05)
+        builds.append(1)
+        return object()
+
+    provider = LazyProvider("component", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+    assert provider.status()["initialized"]
+
+
+def test_provider_records_failure_and_retries():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("bucket missing")
+        return "ok"
+
+    provider = LazyProvider("component", factory)
+    with pytest.raises(ValueError):
+        provider.get()
+    assert provider.status()["error"] == "bucket missing"
+    assert provider.get() == "ok"
+    assert provider.status()["error"] is None
+
+
+def test_health_does_not_build_agents():
+    from src.main import app
+
+    client = TestClient(app)
+    assert client.get("/api/health").status_code == 200
+    assert not dependencies.receipt_agent_provider.initialized
+    assert not dependencies.splitwise_agent_provider.initialized
+
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    assert response.json()["warmup"]["status"] == "disabled"
+
+
+def test_agents_share_one_receipt_item_store_and_seeded_categorizer(
+    monkeypatch, tmp_path
+):
+    from src.agents import receipt_agent, splitwise_agent
+    from src.services.expense_enrichment import AnnotationStore
+
+    class FakeAgent:
+        def __init__(self, receipt_items=None, categorizer=None):
+            self.receipt_items = receipt_items
+            self.categorizer = categorizer
+
+    annotations_path = str(tmp_path / "annotations.db")
+    annotations = AnnotationStore(annotations_path)
+    annotations.add_pending(1, {"description": "Blue Bottle Coffee"})
+    annotations.update(1, status="succeeded", annotation={"category": "Coffee"})
+    annotations.close()
+
+    monkeypatch.setenv("RECEIPT_ITEMS_DB_PATH", "")
+    monkeypatch.setenv("EXPENSE_STORE_DB_PATH", str(tmp_path / "expenses.db"))
+    monkeypatch.setenv("EXPENSE_ENRICHMENT_DB_PATH", annotations_path)
+    monkeypatch.setattr(receipt_agent, "ReceiptAgent", FakeAgent)
+    monkeypatch.setattr(splitwise_agent, "SplitwiseAgent", FakeAgent)
+    provider = LazyProvider("receipt_items", dependencies._build_receipt_items)
+    monkeypatch.setattr(dependencies, "receipt_items_provider", provider)
+    categorizer = LazyProvider("categorizer", dependencies._build_categorizer)
+    monkeypatch.setattr(dependencies, "categorizer_provider", categorizer)
+
+    first = dependencies._build_receipt_agent()
+    second = dependencies._build_splitwise_agent()
+
+    assert first.receipt_items is second.receipt_items is provider.peek()
+    assert first.categorizer is second.categorizer is categorizer.peek()
+    assert categorizer.peek().stats["learned"] == 1
+    provider.peek().close()
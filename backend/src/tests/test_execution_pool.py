@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.utils.execution_pool import ExecutionPool, PoolSaturatedError
+
+
+def test_run_executes_off_event_loop():
+    pool = ExecutionPool(max_workers=2)
+    loop_thread = threading.get_ident()
+
+    async def main():
+        return await pool.run("groups", threading.get_ident)
+
+    try:
+        assert asyncio.run(main()) != loop_thread
+    finally:
+        pool.shutdown()
+
+
+def test_route_queue_full_returns_429():
+    pool = ExecutionPool(max_workers=4, route_limits={"receipts": (1, 1)})
+
+    async def main():
+        slow = [
+            asyncio.create_task(pool.run("receipts", time.sleep, 0.2)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturatedError) as exc:
+            await pool.run("receipts", time.sleep, 0)
+        # Other routes are unaffected by the receipt backlog
+        await pool.run("groups", time.sleep, 0)
+        await asyncio.gather(*slow)
+        return exc.value
+
+    try:
+        error = asyncio.run(main())
+        assert error.status_code == 429
+        assert error.retry_after >= 1
+    finally:
+        pool.shutdown()
+
+
+def test_global_pending_limit_returns_503():
+    pool = ExecutionPool(max_workers=2, max_pending=1)
+
+    async def main():
+        slow = asyncio.create_task(pool.run("receipts", time.sleep, 0.1))
+        await asyncio.sleep(0.02)
+        with pytest.raises(PoolSaturatedError) as exc:
+            await pool.run("groups", time.sleep, 0)
+        await slow
+        return exc.value
+
+    try:
+        assert asyncio.run(main()).status_code == 503
+        assert pool.stats()["pending"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_run_local_counts_against_a_process_pool_route():
+    pool = ExecutionPool(
+        kind="process", max_workers=1, route_limits={"receipts": (1, 0)}
+    )
+    events = []
+
+    async def main():
+        # A closure cannot be pickled to a worker process
+        slow = asyncio.create_task(
+            pool.run_local("receipts", lambda: time.sleep(0.1) or events.append("done"))
+        )
+        await asyncio.sleep(0.02)
+        with pytest.raises(PoolSaturatedError) as exc:
+            await pool.run_local("receipts", events.append, "rejected")
+        await slow
+        return exc.value
+
+    try:
+        assert asyncio.run(main()).status_code == 429
+        assert events == ["done"]
+        assert pool.stats()["routes"]["receipts"]["completed"] == 1
+    finally:
+        pool.shutdown()
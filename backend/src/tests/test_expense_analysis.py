@@ -0,0 +1,68 @@
+import json
+import re
+from src.services.expense_analysis import (
+    BatchExpenseAnalyzer,
+    chunk_by_token_budget,
+    parse_batch_response,
+)
+
+
+def expenses(count):
+    return [{"id": i, "description": f"Uber ride {i}", "amount": 23.0} for i in range(count)]
+
+
+def ids_in(prompt):
+    return [int(i) for i in re.findall(r'^\{"id":(\d+)', prompt, re.MULTILINE)]
+
+
+def test_chunks_respect_token_budget_and_order():
+    chunks = chunk_by_token_budget(expenses(30), token_budget=200)
+    assert len(chunks) > 1
+    assert [e["id"] for chunk in chunks for e in chunk] == list(range(30))
+
+
+def test_parse_tolerates_fences_and_drops_incomplete_items():
+    text = '```json\n[{"id": 1, "category": "transport"}, {"id": 2}]\n```'
+    assert parse_batch_response(text) == {"1": {"category": "transport"}}
+    assert parse_batch_response("not json") == {}
+
+
+def test_only_failed_items_are_retried():
+    prompts = []
+
+    def run_prompt(prompt, use_cache=True):
+        prompts.append((ids_in(prompt), use_cache))
+        # First response omits the last expense of the chunk
+        answered = ids_in(prompt)[:-1] if len(prompts) == 1 else ids_in(prompt)
+        return json.dumps([{"id": i, "category": "transport", "tags": []} for i in answered])
+
+    analyzer = BatchExpenseAnalyzer(run_prompt, token_budget=3000)
+    results = analyzer.analyze(expenses(5))
+
+    assert prompts == [([0, 1, 2, 3, 4], True), ([4], False)]
+    assert all(r["category"] == "transport" for r in results)
+    assert [r["id"] for r in results] == [0, 1, 2, 3, 4]
+
+
+def test_unresolved_items_get_fallback_analysis():
+    analyzer = BatchExpenseAnalyzer(lambda prompt, use_cache: "[]", max_retries=1)
+    results = analyzer.analyze(expenses(2))
+    assert analyzer.calls == 2
+    assert results[0]["category"] == "uncategorized"
+    assert "analysis_error" in results[0]
+
+
+def test_response_cannot_overwrite_source_fields():
+    reply = json.dumps(
+        [{"id": 0, "category": "transport", "amount": 0, "description": "x", "tags": []}]
+    )
+    results = BatchExpenseAnalyzer(lambda prompt, use_cache: reply).analyze(expenses(1))
+    assert results == [
+        {
+            "id": 0,
+            "description": "Uber ride 0",
+            "amount": 23.0,
+            "category": "transport",
+            "tags": [],
+        }
+    ]
@@ -0,0 +1,194 @@
+import threading
+import time
+import pytest
+from splitwise.exception import SplitwiseBadRequestException, SplitwiseException
+from src.services.expense_bulk import (
+    BulkExpenseScheduler,
+    TokenBucket,
+    idempotency_key,
+)
+from src.utils.cache import MemoryCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def scheduler(create, find_existing=None, **kwargs):
+    sleeps = []
+    instance = BulkExpenseScheduler(
+        create,
+        TokenBucket(rate=1000, capacity=1000),
+        MemoryCache(),
+        find_existing=find_existing,
+        backoff_base=0.01,
+        sleep=sleeps.append,
+        **kwargs,
+    )
+    return instance, sleeps
+
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(0.5)
+    assert clock.now == pytest.approx(1.0)
+
+    bucket.pause(10)
+    assert bucket.acquire() == pytest.approx(10)
+
+
+def test_derived_keys_ignore_field_order_and_respect_explicit_keys():
+    first = {"description": "Taxi", "amount": 12.5, "date": "2024-05-01"}
+    second = {"date": "2024-05-01", "amount": 12.5, "description": "Taxi"}
+    assert idempotency_key(first) == idempotency_key(second)
+    assert idempotency_key({**first, "idempotency_key": "r-1"}) == "r-1"
+    with pytest.raises(ValueError):
+        idempotency_key({"description": "Taxi", "amount": 12.5})
+
+
+def test_undated_items_are_keyed_by_the_day_they_are_created():
+    created = []
+
+    def create(item, key):
+        created.append(item["date"])
+        return {"id": len(created)}
+
+    bulk, _ = scheduler(create)
+    item = {"description": "Coffee", "amount": 4}
+    bulk.today = lambda: "2024-05-01"
+    first = bulk.create_all([item])
+    again = bulk.create_all([item])
+    bulk.today = lambda: "2024-05-02"
+    next_day = bulk.create_all([item])
+
+    assert [r[0]["status"] for r in (first, again, next_day)] == [
+        "created",
+        "duplicate",
+        "created",
+    ]
+    assert created == ["2024-05-01", "2024-05-02"]
+
+
+def test_rate_limited_items_are_retried_with_retry_after():
+    calls = []
+
+    def create(item, key):
+        calls.append(key)
+        if len(calls) == 1:
+            raise SplitwiseException(
+                "Unknown error happened", FakeResponse(429, {"Retry-After": "2"})
+            )
+        return {"id": 7, "description": item["description"]}
+
+    bulk, sleeps = scheduler(create)
+    [result] = bulk.create_all([{"description": "Hotel", "amount": 300}])
+
+    assert result["status"] == "created"
+    assert result["attempts"] == 2
+    assert 2 <= sleeps[0] <= 2.01
+    assert bulk.stats["throttled"] == 1
+
+
+def test_resubmitted_items_are_not_created_twice():
+    created = []
+
+    def create(item, key):
+        created.append(key)
+        return {"id": len(created)}
+
+    bulk, _ = scheduler(create)
+    items = [
+        {"description": "Dinner", "amount": 80},
+        {"description": "Taxi", "amount": 20},
+    ]
+    first = bulk.create_all(items)
+    second = bulk.create_all(items + [{"description": "Museum", "amount": 30}])
+
+    assert [result["status"] for result in first] == ["created", "created"]
+    assert [result["status"] for result in second] == [
+        "duplicate",
+        "duplicate",
+        "created",
+    ]
+    assert second[0]["data"] == first[0]["data"]
+    assert len(created) == 3
+
+
+def test_uncertain_failures_check_for_an_existing_expense_before_retrying():
+    remote = {}
+
+    def create(item, key):
+        # The expense is created but the response is lost
+        remote[key] = {"id": 42}
+        raise SplitwiseException("Unknown error happened", FakeResponse(502))
+
+    bulk, _ = scheduler(create, find_existing=lambda item, key: remote.get(key))
+    [result] = bulk.create_all([{"description": "Flight", "amount": 500}])
+
+    assert result["status"] == "created"
+    assert result["data"] == {"id": 42}
+    assert result["attempts"] == 1
+
+
+def test_client_errors_fail_without_retrying():
+    attempts = []
+
+    def create(item, key):
+        attempts.append(key)
+        raise SplitwiseBadRequestException(
+            "Please check your request", FakeResponse(400)
+        )
+
+    bulk, sleeps = scheduler(create)
+    [result] = bulk.create_all([{"description": "Bad", "amount": -1}])
+
+    assert result["status"] == "failed"
+    assert "check your request" in result["error"]
+    assert len(attempts) == 1 and sleeps == []
+
+
+def test_concurrent_duplicates_in_one_batch_create_once():
+    created = []
+    lock = threading.Lock()
+
+    def create(item, key):
+        time.sleep(0.05)
+        with lock:
+            created.append(key)
+        return {"id": 1}
+
+    bulk, _ = scheduler(create, max_concurrency=4)
+    item = {"description": "Groceries", "amount": 45, "idempotency_key": "receipt-9"}
+    results = bulk.create_all([item, dict(item), dict(item)])
+
+    assert sorted(result["status"] for result in results) == [
+        "created",
+        "duplicate",
+        "duplicate",
+    ]
+    assert created == ["receipt-9"]
+
+
+def test_batches_over_the_limit_are_rejected():
+    bulk, _ = scheduler(lambda item, key: {}, max_items=1)
+    with pytest.raises(ValueError):
+        bulk.create_all([{"description": "a", "amount": 1}] * 2)
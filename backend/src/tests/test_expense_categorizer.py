@@ -0,0 +1,116 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api import routes
+from src.services import expense_categorizer
+from src.services.expense_categorizer import ExpenseCategorizer, tokenize
+
+
+def test_tokenize_drops_prices_and_stop_words():
+    assert tokenize("Uber ride to the airport $23.50") == ["uber", "ride", "airport"]
+
+
+def test_seed_keywords_categorize_common_vendors():
+    categorizer = ExpenseCategorizer()
+    prediction = categorizer.categorize("Uber ride $23")
+    assert prediction.category == "transport"
+    assert prediction.source == "keyword"
+    assert categorizer.categorize("Bought a lamp") is None
+    assert categorizer.summary()["local"] == 1
+    assert categorizer.summary()["fallback"] == 1
+
+
+@pytest.mark.parametrize(
+    "description", ["Bottled water", "Coffee table IKEA", "Bar soap", "Train set toy"]
+)
+def test_one_keyword_among_unknown_words_is_not_enough(description):
+    categorizer = ExpenseCategorizer()
+    assert categorizer.categorize(description) is None
+    assert categorizer.predict(description).confidence <= 0.5
+
+
+def test_vendor_history_outranks_keywords():
+    categorizer = ExpenseCategorizer()
+    categorizer.learn_many([("Corner Bar rent", "rent")] * 3)
+    prediction = categorizer.categorize("Corner bar rent 1200")
+    assert prediction == ("rent", 1.0, "vendor")
+
+
+def test_uninformative_categories_are_not_learned():
+    categorizer = ExpenseCategorizer()
+    assert not categorizer.learn("Something", "General")
+    assert not categorizer.learn("Something", {"name": "food"})
+    assert categorizer.learn("Something", "Household")
+
+
+def test_mixed_history_falls_back_to_the_llm():
+    categorizer = ExpenseCategorizer(use_vectors=False)
+    categorizer.learn_many([("Costco", "groceries"), ("Costco", "household")] * 2)
+    assert categorizer.predict("Costco").confidence == 0.5
+    assert categorizer.categorize("Costco") is None
+
+
+@pytest.mark.skipif(expense_categorizer.np is None, reason="NumPy is not installed")
+def test_neighbours_match_spelling_variants():
+    categorizer = ExpenseCategorizer(min_confidence=0.5)
+    categorizer.learn("Trader Joes groceries", "groceries")
+    categorizer.learn("Trader Joe's weekly shop", "groceries")
+    categorizer.learn("Gym membership", "health")
+
+    prediction = categorizer.predict("TraderJoes")
+    assert prediction.category == "groceries"
+    assert prediction.source == "neighbors"
+
+
+def test_bounded_history_forgets_the_oldest_examples():
+    categorizer = ExpenseCategorizer(max_examples=2, use_vectors=False)
+    categorizer.learn_many([("Acme", "tools"), ("Acme", "tools"), ("Other", "x")])
+    assert categorizer.predict("Acme") is None
+    assert categorizer.summary()["examples"] == 2
+
+
+def test_only_unsure_items_are_sent_to_the_llm(receipt_agent, monkeypatch):
+    prompts = []
+
+    def fake_execute(items, use_cache=True, validate=None):
+        prompts.append(items)
+        return json.dumps([{"name": "Lamp", "expense_category": "household"}])
+
+    # The categorization "task" is just the items sent to the model
+    monkeypatch.setattr(receipt_agent, "_categorization_task", lambda items: items)
+    monkeypatch.setattr(receipt_agent, "execute_single_task", fake_execute)
+
+    items = [
+        {"name": "Coffee", "total_price": 3.5},
+        {"name": "Lamp", "total_price": 20},
+    ]
+    categorized = receipt_agent.categorize_items(items)
+
+    assert prompts == [[{"name": "Lamp", "total_price": 20}]]
+    assert categorized[0]["expense_category"] == "food"
+    assert categorized[0]["categorized_by"] == "keyword"
+    assert categorized[1] == {
+        "name": "Lamp",
+        "expense_category": "household",
+        "total_price": 20,
+    }
+
+    # The LLM's answer is learned, so repeat items soon need no call at all
+    receipt_agent.categorizer.learn("Lamp", "household")
+    repeated = receipt_agent.categorize_items([{"name": "Lamp"}])
+    assert repeated[0]["categorized_by"] == "vendor"
+    assert len(prompts) == 1
+
+
+def test_agent_status_reports_categorizer_hit_rates(receipt_agent, monkeypatch):
+    receipt_agent.categorizer.categorize("Coffee")
+    agents = {"receipt_agent": receipt_agent}
+    monkeypatch.setattr(routes, "built_agents", lambda: agents)
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+
+    data = TestClient(app).get("/api/status/agents").json()["data"]
+
+    assert data["receipt_agent"]["categorizer"]["local"] == 1
+    assert data["receipt_agent"]["categorizer"]["local_rate"] == 1.0
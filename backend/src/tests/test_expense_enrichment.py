@@ -0,0 +1,80 @@
+import threading
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.dependencies import get_splitwise_agent
+from src.api.routes import router
+from src.services.expense_enrichment import AnnotationStore, ExpenseEnricher
+
+
+def test_submit_returns_before_the_analysis_finishes(tmp_path):
+    release = threading.Event()
+
+    def analyze(expense):
+        release.wait(5)
+        return {"category": "food", "tags": ["dinner"]}
+
+    enricher = ExpenseEnricher(AnnotationStore(str(tmp_path / "a.db")), analyze)
+    record = enricher.submit({"id": 7, "description": "Dinner", "amount": 42.0})
+
+    assert record["status"] == "pending"
+    assert enricher.get(7)["annotation"] is None
+
+    release.set()
+    enricher._executor.shutdown(wait=True)
+    enrichment = enricher.get(7)
+    assert enrichment["status"] == "succeeded"
+    assert enrichment["annotation"] == {"category": "food", "tags": ["dinner"]}
+    enricher.store.close()
+
+
+def test_fallback_analyses_are_recorded_as_failed(tmp_path):
+    def analyze(expense):
+        return {"analysis_error": "LLM timed out", "category": "uncategorized"}
+
+    enricher = ExpenseEnricher(AnnotationStore(str(tmp_path / "a.db")), analyze)
+    enricher.submit({"id": 1, "description": "Taxi"})
+    enricher.shutdown()
+
+    enrichment = AnnotationStore(str(tmp_path / "a.db")).get(1)
+    assert enrichment["status"] == "failed"
+    assert enrichment["error"] == "LLM timed out"
+    assert enrichment["annotation"]["category"] == "uncategorized"
+
+
+def test_pending_enrichments_resume_after_restart(tmp_path):
+    path = str(tmp_path / "a.db")
+    store = AnnotationStore(path)
+    store.add_pending(3, {"id": 3, "description": "Hotel"})
+    store.close()
+
+    seen = []
+    enricher = ExpenseEnricher(
+        AnnotationStore(path), lambda expense: seen.append(expense) or {"tags": []}
+    )
+    enricher.shutdown()
+
+    assert seen == [{"id": 3, "description": "Hotel"}]
+    assert AnnotationStore(path).get(3)["status"] == "succeeded"
+
+
+def test_enrichment_route_returns_404_until_queued(tmp_path):
+    enricher = ExpenseEnricher(
+        AnnotationStore(str(tmp_path / "a.db")), lambda expense: {"category": "rent"}
+    )
+
+    class FakeSplitwiseAgent:
+        def get_expense_enrichment(self, expense_id):
+            return enricher.get(expense_id)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_splitwise_agent] = lambda: FakeSplitwiseAgent()
+    client = TestClient(app)
+
+    assert client.get("/api/expenses/5/enrichment").status_code == 404
+
+    enricher.submit({"id": 5, "description": "Rent"})
+    enricher._executor.shutdown(wait=True)
+    response = client.get("/api/expenses/5/enrichment")
+    assert response.json()["data"]["annotation"] == {"category": "rent"}
+    enricher.store.close()
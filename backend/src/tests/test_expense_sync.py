@@ -0,0 +1,121 @@
+from src.services.expense_sync import ExpenseStore, ExpenseSyncEngine
+
+
+class FakeUser:
+    def __init__(self, user_id, paid, owed):
+        self.user_id, self.paid, self.owed = user_id, paid, owed
+
+    def getId(self):
+        return self.user_id
+
+    def getFirstName(self):
+        return f"user{self.user_id}"
+
+    def getPaidShare(self):
+        return str(self.paid)
+
+    def getOwedShare(self):
+        return str(self.owed)
+
+
+class FakeExpense:
+    def __init__(self, expense_id, updated_at, deleted_at=None, group_id=1):
+        self.expense_id = expense_id
+        self.updated_at = updated_at
+        self.deleted_at = deleted_at
+        self.group_id = group_id
+
+    def getId(self):
+        return self.expense_id
+
+    def getGroupId(self):
+        return self.group_id
+
+    def getDescription(self):
+        return f"expense {self.expense_id}"
+
+    def getCost(self):
+        return "10.0"
+
+    def getCurrencyCode(self):
+        return "USD"
+
+    def getDate(self):
+        return f"2024-01-{self.expense_id:02d}T00:00:00Z"
+
+    def getCreatedAt(self):
+        return self.getDate()
+
+    def getUpdatedAt(self):
+        return self.updated_at
+
+    def getDeletedAt(self):
+        return self.deleted_at
+
+    def getCreatedBy(self):
+        return FakeUser(1, 0, 0)
+
+    def getCategory(self):
+        return None
+
+    def getPayment(self):
+        return False
+
+    def getUsers(self):
+        return [FakeUser(1, 10, 5), FakeUser(2, 0, 5)]
+
+
+class FakeClient:
+    def __init__(self, expenses):
+        self.expenses = expenses
+        self.calls = []
+
+    def getExpenses(self, group_id=None, updated_after=None, limit=None, offset=None):
+        self.calls.append(updated_after)
+        matching = [
+            e for e in self.expenses if updated_after is None or e.updated_at > updated_after
+        ]
+        return matching[offset : offset + limit]
+
+
+def make_engine(tmp_path, expenses):
+    client = FakeClient(expenses)
+    engine = ExpenseSyncEngine(client, ExpenseStore(str(tmp_path / "expenses.db")), page_size=2)
+    return client, engine
+
+
+def test_initial_sync_pages_through_history(tmp_path):
+    expenses = [FakeExpense(i, f"2024-02-{i:02d}") for i in range(1, 6)]
+    client, engine = make_engine(tmp_path, expenses)
+
+    result = engine.sync()
+
+    assert result["fetched"] == 5
+    assert result["pages"] == 3
+    assert result["cursor"] == "2024-02-05"
+    page = engine.query(limit=2, offset=0)
+    assert page["total"] == 5
+    assert [item.id for item in page["items"]] == [5, 4]
+
+
+def test_incremental_sync_fetches_only_changes_and_tracks_deletions(tmp_path):
+    expenses = [FakeExpense(i, f"2024-02-{i:02d}") for i in range(1, 4)]
+    client, engine = make_engine(tmp_path, expenses)
+    engine.sync()
+
+    expenses[0].updated_at = "2024-03-01"
+    expenses[0].deleted_at = "2024-03-01"
+    result = engine.sync()
+
+    assert client.calls[-1] == "2024-02-03"
+    assert result["fetched"] == 1
+    assert result["deleted"] == 1
+    assert engine.query()["total"] == 2
+    assert engine.query(include_deleted=True)["total"] == 3
+
+
+def test_ensure_fresh_skips_recent_sync(tmp_path):
+    client, engine = make_engine(tmp_path, [FakeExpense(1, "2024-02-01")])
+    engine.sync()
+    assert engine.ensure_fresh(group_id=1) is None
+    assert len(client.calls) == 1
@@ -0,0 +1,82 @@
+import threading
+import time
+from src.models.splitwise import Member
+from src.services.group_summary import GroupSummaryService
+
+
+class FakeMember:
+    def getId(self):
+        return 7
+
+    def getFirstName(self):
+        return "Ana"
+
+
+class FakeGroup:
+    def __init__(self, group_id):
+        self.group_id = group_id
+
+    def getId(self):
+        return self.group_id
+
+    def getName(self):
+        return f"Group {self.group_id}"
+
+    def getMembers(self):
+        return [FakeMember()]
+
+    def getCreatedAt(self):
+        return "2024-01-01T00:00:00Z"
+
+
+class FakeExpense:
+    def getCost(self):
+        return "12.50"
+
+
+class FakeClient:
+    def __init__(self, group_count):
+        self.group_count = group_count
+        self.expense_calls = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def getGroups(self):
+        return [FakeGroup(i) for i in range(1, self.group_count + 1)]
+
+    def getExpenses(self, group_id=None, limit=None):
+        with self._lock:
+            self.expense_calls.append(group_id)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(0.01)
+        with self._lock:
+            self._in_flight -= 1
+        return [FakeExpense()] if group_id % 2 else []
+
+
+def test_one_request_per_group_with_bounded_fan_out():
+    client = FakeClient(group_count=40)
+    service = GroupSummaryService(client, max_workers=4)
+
+    groups = service.get_groups()
+
+    assert sorted(client.expense_calls) == list(range(1, 41))
+    assert 1 < client.max_in_flight <= 4
+    assert groups[0].total == 12.5
+    assert groups[1].total == 0
+    assert groups[0].members == [Member(id=7, name="Ana")]
+
+
+def test_summaries_are_cached_until_invalidated():
+    client = FakeClient(group_count=3)
+    service = GroupSummaryService(client, max_workers=2)
+
+    service.get_groups()
+    service.get_groups()
+    assert len(client.expense_calls) == 3
+
+    service.invalidate(2)
+    service.get_groups()
+    assert client.expense_calls[3:] == [2]
@@ -0,0 +1,79 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+from splitwise.exception import SplitwiseNotFoundException
+from src.config.http_config import HTTPConfig, build_requests_session, http_pool_stats
+from src.config.splitwise_config import PooledSplitwise
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = {}
+
+    def _reply(self):
+        remaining = self.failures.get(self.path, 0)
+        status = 503 if remaining else 200
+        self.failures[self.path] = max(0, remaining - 1)
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_service_settings_override_shared_defaults(monkeypatch):
+    monkeypatch.setenv("HTTP_POOL_SIZE", "10")
+    monkeypatch.setenv("S3_HTTP_POOL_SIZE", "50")
+    assert HTTPConfig.from_env("s3").pool_size == 50
+    assert HTTPConfig.from_env("splitwise").pool_size == 10
+
+
+def test_session_reuses_connections_and_reports_metrics(server):
+    session = build_requests_session("test-reuse", HTTPConfig(pool_size=4))
+    for _ in range(5):
+        assert session.get(f"{server}/ok").status_code == 200
+
+    stats = http_pool_stats()["test-reuse"]
+    assert stats["requests"] == 5
+    assert stats["in_flight"] == 0
+    assert stats["connections_opened"] == 1
+    assert stats["connection_reuse"] == 0.8
+
+
+def test_only_idempotent_requests_are_retried(server):
+    session = build_requests_session("test-retry", HTTPConfig(max_retries=2, backoff_factor=0))
+    Handler.failures = {"/get": 1, "/post": 1}
+    assert session.get(f"{server}/get").status_code == 200
+    assert session.post(f"{server}/post").status_code == 503
+
+
+def test_splitwise_requests_use_the_shared_session():
+    sent = []
+
+    class FakeSession:
+        def send(self, request):
+            sent.append(request)
+            status = 404 if request.url.endswith("/missing") else 200
+            return SimpleNamespace(status_code=status, content=b'{"ok": true}', headers={})
+
+    client = PooledSplitwise("key", "secret", api_key="token", session=FakeSession())
+    assert client._Splitwise__makeRequest("https://example.com/ok") == '{"ok": true}'
+    assert sent[0].headers["Authorization"] == "Bearer token"
+    with pytest.raises(SplitwiseNotFoundException):
+        client._Splitwise__makeRequest("https://example.com/missing")
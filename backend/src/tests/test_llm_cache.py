@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+from src.agents.base_agent import BaseAgent
+from src.utils.cache import MemoryCache, SQLiteCache
+from src.utils.llm_cache import LLMResponseCache
+
+
+class CountingAgent(BaseAgent):
+    def __init__(self):
+        super().__init__(name="Cached", role="Tester")
+        self.llm_cache = LLMResponseCache(MemoryCache())
+        self.kickoffs = 0
+
+    def create_agent(self):
+        return None
+
+    def _kickoff_pooled(self, tasks):
+        self.kickoffs += 1
+        self._thread_usage.metrics = {
+            "prompt_tokens": 90,
+            "completion_tokens": 30,
+            "total_tokens": 120,
+        }
+        return f"answer {self.kickoffs}"
+
+
+class FakeLLM:
+    """Counts tokens for its whole lifetime, like a CrewAI LLM"""
+
+    def __init__(self):
+        self.totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+    def get_token_usage_summary(self):
+        return dict(self.totals)
+
+
+class FakeCrew:
+    def __init__(self):
+        self.agents = [SimpleNamespace(llm=FakeLLM())]
+        self.tasks = []
+
+    def kickoff(self):
+        llm = self.agents[0].llm
+        usage = {"prompt_tokens": 90, "completion_tokens": 30, "total_tokens": 120}
+        for key, tokens in usage.items():
+            llm.totals[key] += tokens
+        # Crews report their agents' lifetime totals
+        return SimpleNamespace(raw="answer", token_usage=llm.get_token_usage_summary())
+
+    def __str__(self):
+        return "answer"
+
+
+class PooledAgent(BaseAgent):
+    def __init__(self):
+        super().__init__(name="Pooled", role="Tester")
+        self.llm_cache = LLMResponseCache(MemoryCache())
+
+    def create_agent(self):
+        return None
+
+    def _build_pooled_crew(self):
+        return FakeCrew()
+
+
+def task(description, tools=None, context=None):
+    return SimpleNamespace(
+        description=description, expected_output="JSON", tools=tools, context=context
+    )
+
+
+def test_repeated_prompts_are_served_from_the_cache():
+    agent = CountingAgent()
+
+    first = agent.execute_single_task(task("Categorize: Uber ride $23"))
+    second = agent.execute_single_task(task("Categorize:   Uber ride $23\n"))
+
+    assert first == second == "answer 1"
+    assert agent.kickoffs == 1
+    assert agent.last_usage()["total_tokens"] == 0
+    assert agent.llm_cache.stats() == {
+        "enabled": True,
+        "hits": 1,
+        "misses": 1,
+        "bypassed": 0,
+        "hit_rate": 0.5,
+        "tokens_saved": 120,
+    }
+
+
+def test_bypass_tools_and_settings_skip_the_cache():
+    agent = CountingAgent()
+    agent.execute_single_task(task("Split this"))
+
+    assert agent.execute_single_task(task("Split this"), use_cache=False) == "answer 2"
+    assert agent.execute_single_task(task("Split this", tools=["vision"])) == "answer 3"
+    agent.config["temperature"] = 0.0
+    assert agent.execute_single_task(task("Split this")) == "answer 4"
+    assert agent.llm_cache.stats()["bypassed"] == 1
+
+
+def test_upstream_outputs_are_part_of_the_key():
+    agent = CountingAgent()
+    upstream = task("Extract")
+    upstream.output = SimpleNamespace(raw="total 10")
+
+    agent.execute_single_task(task("Summarize", context=[upstream]))
+    upstream.output = SimpleNamespace(raw="total 12")
+    agent.execute_single_task(task("Summarize", context=[upstream]))
+
+    assert agent.kickoffs == 2
+
+
+def test_cache_hits_set_the_task_output_for_dependents():
+    agent = CountingAgent()
+    agent.execute_single_task(task("Categorize items"))
+
+    repeated = task("Categorize items")
+    agent.execute_single_task(repeated)
+    assert repeated.output.raw == "answer 1"
+
+
+def test_sqlite_backend_persists_entries(tmp_path):
+    path = str(tmp_path / "llm.db")
+    key = LLMResponseCache.key("prompt", "gpt-4", 0.5)
+    LLMResponseCache(SQLiteCache(path)).set(key, "cached", {"total_tokens": 50})
+
+    cache = LLMResponseCache(SQLiteCache(path))
+    assert cache.get(key) == "cached"
+    assert cache.stats()["tokens_saved"] == 50
+
+
+def test_reused_pooled_crews_report_only_their_own_tokens():
+    agent = PooledAgent()
+
+    for _ in range(2):
+        agent.execute_single_task(task("Categorize: rent"), use_cache=False)
+        assert agent.last_usage() == {
+            "prompt_tokens": 90,
+            "completion_tokens": 30,
+            "total_tokens": 120,
+        }
+
+    assert agent.crews.stats()["reused"] == 1
+    assert agent.usage["total_tokens"] == 240
+
+
+def test_cache_entries_record_the_tokens_of_their_own_call():
+    agent = PooledAgent()
+    agent.execute_single_task(task("Categorize: rent"))
+    # Runs on the same pooled crew, whose LLM has now counted both calls
+    agent.execute_single_task(task("Categorize: groceries"))
+    assert agent.crews.stats()["reused"] == 1
+
+    agent.execute_single_task(task("Categorize: groceries"))
+    assert agent.llm_cache.stats()["tokens_saved"] == 120
+
+
+def test_outputs_failing_validation_are_not_cached():
+    agent = CountingAgent()
+    agent.execute_single_task(task("Split this"), validate=lambda text: False)
+    assert agent.execute_single_task(task("Split this")) == "answer 2"
+    assert agent.execute_single_task(task("Split this")) == "answer 2"
+    assert agent.kickoffs == 2
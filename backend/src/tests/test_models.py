@@ -0,0 +1,94 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.dependencies import get_splitwise_agent
+from src.api.routes import router
+from src.models.splitwise import (
+    Expense,
+    Group,
+    Member,
+    StoredExpense,
+    as_models,
+    to_dict,
+)
+from src.utils.cache import SQLiteCache
+from src.utils.serialization import from_json, to_json
+
+
+class FakeUser:
+    def getId(self):
+        return 3
+
+    def getFirstName(self):
+        return "Ana"
+
+
+class FakeExpense:
+    def getId(self):
+        return 11
+
+    def getDescription(self):
+        return "Dinner"
+
+    def getCost(self):
+        return "42.50"
+
+    def getDate(self):
+        return "2024-05-01T19:00:00Z"
+
+    def getCreatedBy(self):
+        return FakeUser()
+
+
+def test_expense_from_splitwise_keeps_the_listing_shape():
+    expense = Expense.from_splitwise(FakeExpense())
+
+    assert expense.created_by == Member(3, "Ana")
+    assert not hasattr(expense, "__dict__")
+    assert to_dict(expense) == {
+        "id": 11,
+        "description": "Dinner",
+        "amount": 42.5,
+        "date": "2024-05-01T19:00:00Z",
+        "created_by": {"id": 3, "name": "Ana"},
+    }
+    assert to_dict({"id": 1}) == {"id": 1}
+
+
+def test_models_serialize_compactly_and_round_trip_through_the_disk_cache(tmp_path):
+    group = Group(1, "Flat", [Member(3, "Ana")], total=12.5)
+    assert to_json(group) == (
+        '{"id":1,"name":"Flat","members":[{"id":3,"name":"Ana"}],'
+        '"created_at":null,"total":12.5}'
+    )
+    assert to_json({1: "x"}) == '{"1":"x"}'
+
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    cache.set("groups:all", [group])
+    assert cache.get("groups:all") == [from_json(to_json(group))]
+    # Listings rebuild models from the disk tier's dicts
+    assert as_models(Group, cache.get("groups:all")) == [group]
+    assert as_models(Group, [group])[0] is group
+    cache.close()
+
+    stored = StoredExpense(7, "Rent", 900.0, created_by=Member(3, "Ana"), group_id=2)
+    assert as_models(StoredExpense, [from_json(to_json(stored))]) == [stored]
+    assert Expense.from_dict({"id": 1, "created_by": None, "extra": 1}) == Expense(1)
+
+
+def test_listing_routes_serialize_models():
+    class FakeSplitwiseAgent:
+        def get_expense_history(self, **kwargs):
+            item = StoredExpense(7, "Rent", 900.0, created_by=Member(3), group_id=2)
+            return {"items": [item], "total": 1, "limit": 50, "offset": 0}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_splitwise_agent] = lambda: FakeSplitwiseAgent()
+
+    response = TestClient(app).get("/api/expenses/history")
+
+    assert response.status_code == 200
+    item = response.json()["data"]["items"][0]
+    assert item["created_by"] == {"id": 3, "name": None}
+    assert item["group_id"] == 2
+    assert item["deleted_at"] is None
@@ -0,0 +1,56 @@
+import gc
+from src.utils.object_pool import ObjectPool
+
+
+class Resource:
+    def __init__(self):
+        self.state = None
+
+
+def test_checkout_reuses_and_resets_instances():
+    pool = ObjectPool(Resource, reset=lambda r: setattr(r, "state", None))
+    with pool.checkout() as first:
+        first.state = "task-1"
+    with pool.checkout() as second:
+        assert second is first
+        assert second.state is None
+
+    assert pool.stats() == {"created": 1, "reused": 1, "in_use": 0, "idle": 1}
+
+
+def test_concurrent_checkouts_get_distinct_instances():
+    pool = ObjectPool(Resource, max_idle=1)
+    with pool.checkout() as first, pool.checkout() as second:
+        assert first is not second
+    # Only max_idle instances are kept
+    assert pool.stats()["idle"] == 1
+
+
+def test_failed_reset_discards_instance():
+    def reset(resource):
+        raise RuntimeError("stale")
+
+    pool = ObjectPool(Resource, reset=reset)
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        assert second is not first
+
+
+def test_lease_returns_on_release_or_collection():
+    class Owner:
+        pass
+
+    pool = ObjectPool(Resource)
+    owner = Owner()
+    leased = pool.lease(owner)
+    assert pool.stats()["in_use"] == 1
+    pool.release_owner(owner)
+    pool.release_owner(owner)
+    assert pool.stats() == {"created": 1, "reused": 0, "in_use": 0, "idle": 1}
+
+    owner = Owner()
+    assert pool.lease(owner) is leased
+    del owner
+    gc.collect()
+    assert pool.stats()["in_use"] == 0
@@ -0,0 +1,76 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from src.agents.base_agent import BaseAgent
+
+
+class FakeTaskAgent(BaseAgent):
+    def __init__(self, durations, fail=()):
+        super().__init__(name="Parallel", role="Tester")
+        self.durations = durations
+        self.fail = set(fail)
+        self.started = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_agent(self):
+        return None
+
+    def execute_single_task(self, task):
+        with self._lock:
+            self.started[task.index] = time.monotonic()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.durations[task.index])
+        with self._lock:
+            self.in_flight -= 1
+        if task.index in self.fail:
+            raise RuntimeError("boom")
+        return f"result {task.index}"
+
+
+def make_tasks(count):
+    return [SimpleNamespace(index=i, context=None) for i in range(count)]
+
+
+def test_independent_tasks_run_concurrently_in_order():
+    agent = FakeTaskAgent([0.1, 0.05, 0.1, 0.05])
+    started = time.monotonic()
+    results = agent.execute_tasks(make_tasks(4), parallel=True, max_in_flight=4)
+    elapsed = time.monotonic() - started
+
+    assert results == ["result 0", "result 1", "result 2", "result 3"]
+    assert elapsed < 0.25
+    assert agent.max_in_flight == 4
+
+
+def test_max_in_flight_is_respected():
+    agent = FakeTaskAgent([0.02] * 6)
+    agent.execute_tasks(make_tasks(6), parallel=True, max_in_flight=2)
+    assert agent.max_in_flight == 2
+
+
+def test_dependencies_wait_and_receive_context():
+    agent = FakeTaskAgent([0.05, 0.01, 0.01])
+    tasks = make_tasks(3)
+    results = agent.execute_tasks(tasks, dependencies={2: [0, 1]})
+
+    assert results[2] == "result 2"
+    assert agent.started[2] >= agent.started[0] + 0.05
+    assert tasks[2].context == [tasks[0], tasks[1]]
+
+
+def test_failed_dependency_skips_dependents():
+    agent = FakeTaskAgent([0.01] * 3, fail={2})
+    results = agent.execute_tasks(make_tasks(3), dependencies={0: [1], 1: [2]})
+    assert results[2].startswith("Task failed")
+    assert results[1].startswith("Task skipped")
+    assert results[0].startswith("Task skipped")
+
+
+def test_dependency_cycle_is_rejected():
+    agent = FakeTaskAgent([0.01] * 2)
+    with pytest.raises(ValueError):
+        agent.execute_tasks(make_tasks(2), dependencies={0: [1], 1: [0]})
@@ -0,0 +1,75 @@
+import time
+from src.utils.cache import MemoryCache, SQLiteCache
+from src.utils.read_through_cache import ReadThroughCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [{"call": self.calls}]
+
+
+def wait_for_refresh(cache):
+    deadline = time.time() + 1
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def test_fresh_entries_are_served_from_cache():
+    cache = ReadThroughCache(MemoryCache(), {"friends": (60, 0)})
+    loader = Loader()
+    assert cache.get_or_load("friends", "all", loader) == [{"call": 1}]
+    assert cache.get_or_load("friends", "all", loader) == [{"call": 1}]
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entries_are_served_while_revalidating():
+    cache = ReadThroughCache(MemoryCache(), {"groups": (0.01, 60)})
+    loader = Loader()
+    cache.get_or_load("groups", "all", loader)
+    time.sleep(0.02)
+
+    assert cache.get_or_load("groups", "all", loader) == [{"call": 1}]
+    wait_for_refresh(cache)
+    assert loader.calls == 2
+    assert cache.get_or_load("groups", "all", loader) == [{"call": 2}]
+
+
+def test_invalidate_forces_reload():
+    cache = ReadThroughCache(MemoryCache(), {"expenses": (60, 60)})
+    loader = Loader()
+    cache.get_or_load("expenses", "None:20", loader)
+    cache.invalidate("expenses")
+    assert cache.get_or_load("expenses", "None:20", loader) == [{"call": 2}]
+
+
+def test_invalidation_survives_restart_with_sqlite(tmp_path):
+    path = str(tmp_path / "cache.db")
+    loader = Loader()
+    first = ReadThroughCache(SQLiteCache(path), {"expenses": (60, 60)})
+    first.get_or_load("expenses", "1:20", loader)
+    first.invalidate("expenses")
+
+    second = ReadThroughCache(SQLiteCache(path), {"expenses": (60, 60)})
+    assert second.get_or_load("expenses", "1:20", loader) == [{"call": 2}]
+
+
+def test_lookups_reread_the_invalidation_marker_after_its_ttl():
+    backend = MemoryCache()
+    cache = ReadThroughCache(backend, {"friends": (60, 0)}, marker_ttl=0.05)
+    loader = Loader()
+    for _ in range(3):
+        cache.get_or_load("friends", "all", loader)
+
+    # One miss for the marker, one for the entry, then two entry hits
+    assert (backend.hits, backend.misses) == (2, 2)
+
+    # Another process sharing the backend invalidates the entity
+    ReadThroughCache(backend, {"friends": (60, 0)}).invalidate("friends")
+    assert cache.get_or_load("friends", "all", loader) == [{"call": 1}]
+    time.sleep(0.06)
+    assert cache.get_or_load("friends", "all", loader) == [{"call": 2}]
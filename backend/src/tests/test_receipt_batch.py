@@ -0,0 +1,221 @@
+import asyncio
+import io
+import json
+import threading
+import time
+import zipfile
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from src.agents.receipt_agent import PreparedReceipt
+from src.api.dependencies import get_receipt_batch
+from src.api.routes import router
+from src.services.receipt_batch import BatchItem, ReceiptBatchPipeline
+from src.utils.execution_pool import ExecutionPool
+from src.utils.upload_stream import SpooledUpload
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeS3:
+    def __init__(self, agent):
+        self.agent = agent
+
+    def store_image(self, data):
+        with self.agent.track("upload"):
+            time.sleep(0.02)
+        return f"https://bucket.s3.amazonaws.com/{len(data)}.jpg"
+
+
+class FakeReceiptAgent:
+    image_delivery = "inline"
+    archive_enabled = True
+
+    def __init__(self):
+        self.s3_helper = FakeS3(self)
+        self.active = {"prepare": 0, "upload": 0, "extract": 0}
+        self.peak = dict(self.active)
+        self._lock = threading.Lock()
+
+    def track(self, stage):
+        agent = self
+
+        class Tracker:
+            def __enter__(self):
+                with agent._lock:
+                    agent.active[stage] += 1
+                    agent.peak[stage] = max(agent.peak[stage], agent.active[stage])
+
+            def __exit__(self, *exc_info):
+                with agent._lock:
+                    agent.active[stage] -= 1
+
+        return Tracker()
+
+    def prepare_receipt(self, upload):
+        with self.track("prepare"):
+            data = upload.read()
+            time.sleep(0.01)
+        if data == b"cached":
+            return PreparedReceipt("raw", cached={"total": 1.0, "image_url": "cached"})
+        if data == b"bad":
+            raise ValueError("Invalid image data")
+        return PreparedReceipt("raw", "jpeg", data)
+
+    def extract_receipt(self, image_url):
+        assert image_url.startswith("data:image/jpeg;base64,")
+        with self.track("extract"):
+            time.sleep(0.05)
+        return {"items": [], "summary": {"total": 2.0}}
+
+    def complete_receipt(self, prepared, result, image_url, archive_error=None):
+        return {**result, "image_url": image_url}
+
+
+def collect(pipeline, items):
+    async def run():
+        return [line async for line in pipeline.run(items)]
+
+    return asyncio.run(run())
+
+
+def test_stages_overlap_within_their_limits():
+    agent = FakeReceiptAgent()
+    pipeline = ReceiptBatchPipeline(agent, {"prepare": 2, "upload": 3, "extract": 2})
+    items = [
+        BatchItem(index, f"r{index}.png", SpooledUpload.from_bytes(b"img%d" % index))
+        for index in range(8)
+    ]
+
+    started = time.monotonic()
+    lines = collect(pipeline, items)
+    elapsed = time.monotonic() - started
+
+    results, summary = lines[:-1], lines[-1]["summary"]
+    assert sorted(line["index"] for line in results) == list(range(8))
+    assert all(line["status"] == "success" for line in results)
+    assert all(line["data"]["image_url"].startswith("https://") for line in results)
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (8, 8, 0)
+    assert agent.peak["prepare"] == 2
+    assert agent.peak["extract"] == 2
+    assert agent.peak["upload"] <= 3
+    # Eight sequential receipts would take at least 8 * (0.01 + 0.05) seconds
+    assert elapsed < 0.45
+    assert all(upload.closed for upload in (item.upload for item in items))
+    assert pipeline.stats()["stages"]["extract"]["completed"] == 8
+
+
+def test_failed_and_cached_receipts_do_not_stop_the_batch():
+    pipeline = ReceiptBatchPipeline(FakeReceiptAgent())
+    items = [
+        BatchItem(0, "bad.png", SpooledUpload.from_bytes(b"bad")),
+        BatchItem(1, "cached.png", SpooledUpload.from_bytes(b"cached")),
+        BatchItem(2, "big.png", error="Image size exceeds 10MB limit"),
+        BatchItem(3, "ok.png", SpooledUpload.from_bytes(b"ok")),
+    ]
+
+    lines = {line.get("index"): line for line in collect(pipeline, items)}
+
+    assert lines[0]["status"] == "error"
+    assert lines[0]["error"] == "Invalid image data"
+    assert lines[1]["cached"] is True
+    assert lines[2]["error"] == "Image size exceeds 10MB limit"
+    assert lines[3]["status"] == "success"
+    assert lines[None]["summary"]["failed"] == 2
+
+
+def test_stages_are_admitted_by_the_shared_execution_pool():
+    pool = ExecutionPool(max_pending=0)
+    pipeline = ReceiptBatchPipeline(FakeReceiptAgent(), pool=pool)
+    items = [BatchItem(0, "ok.png", SpooledUpload.from_bytes(b"ok"))]
+
+    line = collect(pipeline, items)[0]
+
+    assert line["status"] == "error"
+    assert line["retry_after"] >= 1
+    assert pool.stats()["routes"]["receipt_batch"]["rejected"] == 1
+    assert items[0].upload.closed
+
+
+def test_stopping_early_keeps_uploads_open_until_prepared():
+    class SlowPrepareAgent(FakeReceiptAgent):
+        def __init__(self):
+            super().__init__()
+            self.prepared = []
+
+        def prepare_receipt(self, upload):
+            if upload.read(3) == b"bad":
+                raise ValueError("Invalid image data")
+            time.sleep(0.1)
+            upload.seek(0)
+            self.prepared.append(upload.read())
+            return PreparedReceipt("raw", "jpeg", b"")
+
+    agent = SlowPrepareAgent()
+    pipeline = ReceiptBatchPipeline(agent, {"prepare": 1})
+    items = [
+        BatchItem(0, "bad.png", SpooledUpload.from_bytes(b"bad")),
+        BatchItem(1, "slow.png", SpooledUpload.from_bytes(b"slow")),
+        BatchItem(2, "queued.png", SpooledUpload.from_bytes(b"queued")),
+    ]
+
+    async def first_line_only():
+        lines = pipeline.run(items)
+        first = await lines.__anext__()
+        # Let the slow receipt reach its worker before the client goes away
+        await asyncio.sleep(0.05)
+        await lines.aclose()
+        return first
+
+    assert asyncio.run(first_line_only())["index"] == 0
+    # The receipt being prepared was read in full; the queued one never started
+    assert agent.prepared == [b"slow"]
+    assert all(item.upload.closed for item in items)
+
+
+def test_batch_route_expands_zip_archives_and_streams_ndjson():
+    pipeline = ReceiptBatchPipeline(FakeReceiptAgent())
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_receipt_batch] = lambda: pipeline
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipped:
+        zipped.writestr("trip/a.png", png_bytes())
+        zipped.writestr("trip/b.png", png_bytes())
+        zipped.writestr("__MACOSX/trip/._a.png", b"metadata")
+
+    response = TestClient(app).post(
+        "/api/receipts/batch",
+        files=[
+            ("files", ("single.png", png_bytes(), "image/png")),
+            ("files", ("trip.zip", archive.getvalue(), "application/zip")),
+        ],
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["filename"] for line in lines[:-1]) == [
+        "single.png",
+        "trip.zip/trip/a.png",
+        "trip.zip/trip/b.png",
+    ]
+    assert lines[-1]["summary"]["succeeded"] == 3
+
+
+def test_batch_route_rejects_too_many_receipts():
+    pipeline = ReceiptBatchPipeline(FakeReceiptAgent(), max_files=1)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_receipt_batch] = lambda: pipeline
+
+    response = TestClient(app).post(
+        "/api/receipts/batch",
+        files=[("files", ("a.png", b"a")), ("files", ("b.png", b"b"))],
+    )
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+import io
+import threading
+import pytest
+from PIL import Image
+from src.agents.receipt_agent import ReceiptAgent
+
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def agent(receipt_env):
+    receipt_env.setenv("RECEIPT_IMAGE_DELIVERY", "inline")
+    return ReceiptAgent()
+
+
+def test_inline_delivery_overlaps_archive_with_extraction(agent):
+    uploaded = threading.Event()
+    seen = {}
+
+    def store_image(data):
+        uploaded.set()
+        return "https://receipts-bucket.s3.amazonaws.com/receipts/r.jpg"
+
+    def extract(image_url):
+        seen["image_url"] = image_url
+        # The upload runs while extraction is still in progress
+        assert uploaded.wait(timeout=5)
+        return {"items": [], "summary": {"total": 1.0}}
+
+    agent.s3_helper.store_image = store_image
+    agent._extract_receipt = extract
+
+    result = agent.process_receipt(jpeg_bytes())
+    assert seen["image_url"].startswith("data:image/jpeg;base64,")
+    assert result["image_url"] == "https://receipts-bucket.s3.amazonaws.com/receipts/r.jpg"
+
+
+def test_failed_archive_keeps_extraction_and_skips_cache(agent):
+    def store_image(data):
+        raise Exception("Failed to upload image to S3: AccessDenied")
+
+    agent.s3_helper.store_image = store_image
+    agent._extract_receipt = lambda image_url: {"items": [], "summary": {"total": 1.0}}
+
+    result = agent.process_receipt(jpeg_bytes())
+    assert result["summary"]["total"] == 1.0
+    assert result["image_url"] is None
+    assert "AccessDenied" in result["archive_error"]
+    assert agent.result_cache.stats()["memory"]["entries"] == 0
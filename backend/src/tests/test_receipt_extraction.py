@@ -0,0 +1,68 @@
+import json
+import pytest
+from pydantic import ValidationError
+from src.models.receipt import ReceiptExtraction
+from src.utils.json_repair import repair_json
+
+
+def test_repair_handles_fences_prose_and_trailing_commas():
+    text = 'Here is the data:\n```json\n{"items": [{"name": "Tea", "total_price": 3.5},],}\n```'
+    assert repair_json(text) == {"items": [{"name": "Tea", "total_price": 3.5}]}
+
+
+def test_repair_closes_truncated_output():
+    text = '{"vendor": {"name": "Cafe"}, "items": [{"name": "Bagel", "total_price": 2'
+    assert repair_json(text) == {
+        "vendor": {"name": "Cafe"},
+        "items": [{"name": "Bagel", "total_price": 2}],
+    }
+
+
+def test_repair_only_replaces_curly_quotes_around_strings():
+    text = "{“vendor”: “Joe’s “Best” Deli”, “note”: “say \"hi\"”,}"
+    assert repair_json(text) == {"vendor": "Joe’s “Best” Deli", "note": 'say "hi"'}
+    assert repair_json('{"name": "The “Corner” Cafe",}') == {
+        "name": "The “Corner” Cafe"
+    }
+
+
+def test_repair_gives_up_without_json():
+    with pytest.raises(json.JSONDecodeError):
+        repair_json("I could not read this receipt.")
+
+
+def test_receipt_model_coerces_amounts_and_dates():
+    receipt = ReceiptExtraction.model_validate(
+        {
+            "vendor": {"name": "Cafe"},
+            "transaction": {"date": "2024-03-05", "receipt_number": 1234},
+            "items": [{"name": "Tea", "quantity": "2", "total_price": "$7.00"}],
+            "summary": {"total": "$1,007.00", "tax_details": [{"type": "VAT", "amount": "0.5"}]},
+        }
+    ).model_dump()
+
+    assert receipt["items"][0]["total_price"] == 7.0
+    assert receipt["items"][0]["quantity"] == 2.0
+    assert receipt["summary"]["total"] == 1007.0
+    assert receipt["transaction"]["date"] == "2024-03-05T00:00:00"
+    assert receipt["transaction"]["receipt_number"] == "1234"
+
+
+def test_receipt_model_reads_decimal_commas_and_rejects_ambiguous_amounts():
+    items = [
+        {"name": "Bread", "total_price": "12,50"},
+        {"name": "Milk", "total_price": "€ 3,99"},
+        {"name": "TV", "total_price": "1,299.00"},
+    ]
+    receipt = ReceiptExtraction.model_validate(
+        {"items": items, "summary": {"total": "1315.49"}}
+    ).model_dump()
+    assert [item["total_price"] for item in receipt["items"]] == [12.5, 3.99, 1299.0]
+
+    with pytest.raises(ValidationError):
+        ReceiptExtraction.model_validate({"summary": {"total": "1.315,49"}})
+
+
+def test_receipt_model_requires_total():
+    with pytest.raises(ValidationError):
+        ReceiptExtraction.model_validate({"items": []})
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.services.receipt_jobs import (
+    InMemoryJobStore,
+    ReceiptJobRunner,
+    SQLiteJobStore,
+)
+from src.utils.execution_pool import ExecutionPool
+
+
+def run_job(runner, data=b"receipt"):
+    async def main():
+        job = runner.submit(data)
+        assert job["status"] == "queued"
+        await runner.drain()
+        return runner.get(job["id"])
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.db"))
+    return InMemoryJobStore()
+
+
+def test_job_succeeds_with_result(store):
+    runner = ReceiptJobRunner(store, process=lambda data: {"size": len(data)})
+    try:
+        finished = run_job(runner)
+        assert finished["status"] == "succeeded"
+        assert finished["result"] == {"size": 7}
+    finally:
+        runner.shutdown()
+
+
+def test_job_failure_is_recorded(store):
+    def fail(data):
+        raise ValueError("bad image")
+
+    runner = ReceiptJobRunner(store, process=fail)
+    try:
+        finished = run_job(runner)
+        assert finished["status"] == "failed"
+        assert finished["error"] == "bad image"
+    finally:
+        runner.shutdown()
+
+
+def test_jobs_wait_for_a_slot_on_the_receipts_route():
+    pool = ExecutionPool(max_workers=4, route_limits={"receipts": (1, 0)})
+    release = threading.Event()
+    runner = ReceiptJobRunner(
+        InMemoryJobStore(), process=lambda data: release.wait(1) and {}, pool=pool
+    )
+
+    async def main():
+        first = runner.submit(b"a")
+        second = runner.submit(b"b")
+        await asyncio.sleep(0.05)
+        # The route admits one call at a time, so the second job is not started
+        states = [runner.get(job["id"])["status"] for job in (first, second)]
+        release.set()
+        await runner.drain()
+        return states, runner.get(second["id"])["status"]
+
+    try:
+        states, second_status = asyncio.run(main())
+        assert states == ["running", "queued"]
+        assert second_status == "succeeded"
+        assert pool.routes["receipts"].completed == 2
+    finally:
+        runner.shutdown()
+        pool.shutdown()
+
+
+def test_sqlite_store_only_expires_jobs_whose_lease_ran_out(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    stopped = SQLiteJobStore(path, lease_seconds=0.05)
+    stopped.create("stale")
+    live = SQLiteJobStore(path, lease_seconds=0.05)
+    live.create("live")
+    time.sleep(0.1)
+    live.renew()
+
+    restarted = SQLiteJobStore(path)
+    assert restarted.get("stale")["status"] == "failed"
+    assert restarted.get("live")["status"] == "queued"
@@ -0,0 +1,177 @@
+import io
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from src.agents import receipt_agent as receipt_agent_module
+from src.agents.receipt_agent import ReceiptAgent
+from src.api.dependencies import get_agent_pool, get_receipt_agent
+from src.api.routes import router
+from src.utils.execution_pool import ExecutionPool
+from src.utils.json_stream import IncrementalJSONParser
+
+RESPONSE = (
+    "```json\n"
+    '{"vendor": {"name": "Cafe \\"Brace}\\""}, "transaction": {"date": "2024-03-01"},\n'
+    ' "items": [{"name": "Tea", "quantity": 1, "total_price": "3.50"},\n'
+    '           {"name": "Cake {slice}", "quantity": 2, "total_price": 8}],\n'
+    ' "summary": {"subtotal": 11.5, "total": 11.5}, "payment": {"method": "card"}}\n'
+    "```"
+)
+
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_parser_emits_fields_and_items_as_they_close():
+    parser = IncrementalJSONParser(stream_arrays=("items",))
+    seen = []
+    for index, char in enumerate(RESPONSE):
+        for event in parser.feed(char):
+            seen.append((event.key, event.element, index))
+
+    assert [(key, element) for key, element, _ in seen] == [
+        ("vendor", False),
+        ("transaction", False),
+        ("items", True),
+        ("items", True),
+        ("summary", False),
+        ("payment", False),
+    ]
+    # The first item is available well before the response ends
+    assert seen[2][2] < len(RESPONSE) / 2
+    assert parser.done
+
+
+def test_parser_repairs_values_and_ignores_trailing_text():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"flag": True, "items": [1, 2,], "n": 3} and more {"x": 1}')
+    assert [(event.key, event.value) for event in events] == [
+        ("flag", True),
+        ("items", [1, 2]),
+        ("n", 3),
+    ]
+
+
+def test_parser_emits_non_object_values_of_streamed_arrays():
+    parser = IncrementalJSONParser(stream_arrays=("items", "tags"))
+    events = parser.feed('{"items": null, "tags": ["a", {"b": 1}, 2], "total": 3}')
+    assert [(event.key, event.value, event.element) for event in events] == [
+        ("items", None, False),
+        ("tags", {"b": 1}, True),
+        ("tags", "a", True),
+        ("tags", 2, True),
+        ("total", 3, False),
+    ]
+
+
+@pytest.fixture
+def agent(receipt_env, monkeypatch):
+    monkeypatch.setenv("RECEIPT_IMAGE_DELIVERY", "inline")
+    monkeypatch.setenv("RECEIPT_EXTRACTION_MODE", "single_pass")
+    monkeypatch.setenv("RECEIPT_STREAM_TOKENS", "true")
+
+    def fake_stream(prompt, image_url, usage=None, **kwargs):
+        assert image_url.startswith("data:image/jpeg;base64,")
+        usage.update(prompt_tokens=900, completion_tokens=120)
+        for start in range(0, len(RESPONSE), 7):
+            yield RESPONSE[start : start + 7]
+
+    monkeypatch.setattr(receipt_agent_module, "stream_vision_completion", fake_stream)
+    agent = ReceiptAgent()
+    agent.s3_helper.store_image = lambda data: "https://receipts-bucket/r.jpg"
+    return agent
+
+
+def test_stream_receipt_emits_stages_in_order(agent):
+    events = []
+    result = agent.stream_receipt(
+        jpeg_bytes(), lambda event, data: events.append((event, data))
+    )
+
+    names = [event for event, _ in events]
+    assert names[0] == "prepared"
+    assert names[-2:] == ["totals", "result"]
+    assert names.index("header") < names.index("item") < names.index("totals")
+    assert names.count("item") == 2 and "uploaded" in names
+
+    first_item = next(data for event, data in events if event == "item")
+    assert first_item["index"] == 0
+    assert first_item["item"]["total_price"] == 3.5
+    assert result["summary"]["total"] == 11.5
+    assert result["image_url"] == "https://receipts-bucket/r.jpg"
+    assert result["extraction"]["streamed"] is True
+    assert result["extraction"]["llm_calls"] == 1
+    assert agent.usage["total_tokens"] == 1020
+
+
+def test_cached_receipt_replays_parts(agent):
+    image = jpeg_bytes()
+    agent.stream_receipt(image, lambda event, data: None)
+
+    events = []
+    result = agent.stream_receipt(image, lambda event, data: events.append(event))
+    assert result["extraction"] == {"cached": True, "llm_calls": 0}
+    assert events[0] == "prepared"
+    assert events.count("item") == 2
+    assert "uploaded" not in events and events[-1] == "result"
+
+
+def test_stream_route_sends_server_sent_events(agent):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_receipt_agent] = lambda: agent
+    app.dependency_overrides[get_agent_pool] = lambda: ExecutionPool()
+
+    response = TestClient(app).post(
+        "/api/receipts/process/stream",
+        files={"file": ("r.jpg", jpeg_bytes(), "image/jpeg")},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block for block in response.text.split("\n\n") if block]
+    names = [block.split("\n")[0].removeprefix("event: ") for block in blocks]
+    assert names[0] == "prepared" and names[-1] == "result"
+    result = json.loads(blocks[-1].split("\n")[1].removeprefix("data: "))
+    assert result["vendor"]["name"] == 'Cafe "Brace}"'
+
+
+def test_stream_route_reports_errors_as_events(agent):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_receipt_agent] = lambda: agent
+    app.dependency_overrides[get_agent_pool] = lambda: ExecutionPool()
+
+    response = TestClient(app).post(
+        "/api/receipts/process/stream", files={"file": ("r.jpg", b"not an image")}
+    )
+    assert response.text.startswith("event: error\n")
+
+
+def test_single_pass_calls_the_vision_model_with_the_schema(receipt_env, monkeypatch):
+    receipt_env.setenv("RECEIPT_EXTRACTION_MODE", "single_pass")
+    answers = ['{"items": []}', RESPONSE]
+    calls = []
+
+    def fake_completion(prompt, image_url, usage=None, response_format=None, **kwargs):
+        calls.append((prompt, response_format))
+        usage.update(calls=1, prompt_tokens=800, completion_tokens=100)
+        return answers[len(calls) - 1]
+
+    monkeypatch.setattr(receipt_agent_module, "vision_completion", fake_completion)
+    agent = ReceiptAgent()
+    result = agent.extract_receipt("https://receipts-bucket/r.jpg")
+
+    assert result["summary"]["total"] == 11.5
+    assert all(
+        fmt["json_schema"]["schema"]["required"] == ["summary"] for _, fmt in calls
+    )
+    assert "- summary: Field required" in calls[1][0]
+    assert result["extraction"]["llm_calls"] == 2
+    assert result["extraction"]["reprompts"] == 1
+    assert result["extraction"]["prompt_tokens"] == 1600
+    assert agent.usage["total_tokens"] == 1800
@@ -0,0 +1,105 @@
+import io
+import pytest
+from botocore.stub import ANY, Stubber
+from src.utils.s3_helper import S3Helper
+
+
+@pytest.fixture
+def s3_env(monkeypatch):
+    monkeypatch.setenv("AWS_S3_BUCKET", "receipts-bucket")
+    monkeypatch.setenv("AWS_REGION", "eu-west-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.delenv("AWS_S3_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_S3_ADDRESSING_STYLE", raising=False)
+    monkeypatch.delenv("S3_VERIFY_UPLOADS", raising=False)
+    return monkeypatch
+
+
+def test_object_urls_follow_addressing_style_and_endpoint(s3_env):
+    assert (
+        S3Helper().build_object_url("receipts/a b.jpg")
+        == "https://receipts-bucket.s3.eu-west-1.amazonaws.com/receipts/a%20b.jpg"
+    )
+
+    s3_env.setenv("AWS_S3_ADDRESSING_STYLE", "path")
+    assert (
+        S3Helper().build_object_url("receipts/a.jpg")
+        == "https://s3.eu-west-1.amazonaws.com/receipts-bucket/receipts/a.jpg"
+    )
+
+    s3_env.setenv("AWS_S3_ENDPOINT_URL", "http://localhost:9000/")
+    assert (
+        S3Helper().build_object_url("receipts/a.jpg")
+        == "http://localhost:9000/receipts-bucket/receipts/a.jpg"
+    )
+
+
+def test_auto_style_uses_path_for_dotted_buckets(s3_env):
+    s3_env.setenv("AWS_S3_BUCKET", "receipts.example.com")
+    s3_env.setenv("AWS_S3_ADDRESSING_STYLE", "auto")
+    assert S3Helper().build_object_url("k.jpg").startswith(
+        "https://s3.eu-west-1.amazonaws.com/receipts.example.com/"
+    )
+
+
+def test_store_image_makes_a_single_put(s3_env):
+    helper = S3Helper()
+    with Stubber(helper.s3_client) as stubber:
+        stubber.add_response(
+            "put_object",
+            {},
+            {
+                "Bucket": "receipts-bucket",
+                "Key": ANY,
+                "Body": b"jpeg",
+                "ContentType": "image/jpeg",
+                "ACL": "public-read",
+                "Metadata": ANY,
+            },
+        )
+        url = helper.store_image(b"jpeg")
+        stubber.assert_no_pending_responses()
+
+    assert url.startswith("https://receipts-bucket.s3.eu-west-1.amazonaws.com/receipts/")
+    assert helper.verify_image_url("https://example.com/other.jpg") is False
+
+
+def test_store_image_streams_large_files_as_multipart(s3_env):
+    s3_env.setenv("S3_MULTIPART_THRESHOLD", str(1024 * 1024))
+    s3_env.setenv("S3_MULTIPART_CHUNKSIZE", str(5 * 1024 * 1024))
+    s3_env.setenv("S3_MULTIPART_CONCURRENCY", "1")
+    helper = S3Helper()
+    body = io.BytesIO(b"x" * (6 * 1024 * 1024))
+
+    with Stubber(helper.s3_client) as stubber:
+        stubber.add_response(
+            "create_multipart_upload",
+            {"UploadId": "upload-1"},
+            {
+                "Bucket": "receipts-bucket",
+                "Key": ANY,
+                "ContentType": "image/jpeg",
+                "ACL": "public-read",
+                "Metadata": ANY,
+                "ChecksumAlgorithm": ANY,
+            },
+        )
+        for part in (1, 2):
+            stubber.add_response(
+                "upload_part",
+                {"ETag": f'"etag-{part}"'},
+                {
+                    "Bucket": "receipts-bucket",
+                    "Key": ANY,
+                    "UploadId": "upload-1",
+                    "PartNumber": part,
+                    "Body": ANY,
+                    "ChecksumAlgorithm": ANY,
+                },
+            )
+        stubber.add_response("complete_multipart_upload", {}, None)
+        url = helper.store_image(body)
+        stubber.assert_no_pending_responses()
+
+    assert url.startswith("https://receipts-bucket.s3.eu-west-1.amazonaws.com/receipts/")
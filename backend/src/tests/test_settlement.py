@@ -0,0 +1,118 @@
+import numpy as np
+from src.services.expense_sync import ExpenseStore
+from src.services.settlement import (
+    SettlementEngine,
+    balance_matrix,
+    settle_up,
+    to_cents,
+)
+
+
+def record(expense_id, shares, group_id=1, currency="USD", deleted_at=None):
+    return {
+        "id": expense_id,
+        "group_id": group_id,
+        "description": f"expense {expense_id}",
+        "amount": sum(paid for _, paid, _ in shares),
+        "currency_code": currency,
+        "date": f"2024-01-{expense_id:02d}T00:00:00Z",
+        "created_at": None,
+        "updated_at": None,
+        "deleted_at": deleted_at,
+        "created_by": {"id": 1, "name": "user1"},
+        "category": None,
+        "payment": False,
+        "shares": [
+            {
+                "user_id": user,
+                "name": f"user{user}",
+                "paid_share": paid,
+                "owed_share": owed,
+            }
+            for user, paid, owed in shares
+        ],
+    }
+
+
+def test_debts_are_shared_in_proportion_to_overpayment():
+    # Expense 0: member 0 paid 90 for three. Expense 1: members 1 and 2 paid
+    # 30 and 10 of 40, member 0 owes all of it.
+    owes = balance_matrix(
+        np.array([0, 0, 0, 1, 1, 1]),
+        np.array([0, 1, 2, 0, 1, 2]),
+        np.array([90.0, 0, 0, 0, 30, 10]),
+        np.array([30.0, 30, 30, 40, 0, 0]),
+        members=3,
+        block_size=1,
+    )
+    expected = np.array([[0, 30, 10], [30, 0, 0], [30, 0, 0]])
+    np.testing.assert_allclose(owes, expected)
+
+
+def test_settle_up_pairs_equal_amounts_and_needs_at_most_n_minus_one():
+    assert settle_up([500, -500, 300, -300]) == [(1, 0, 500), (3, 2, 300)]
+
+    rng = np.random.default_rng(7)
+    cents = to_cents(rng.normal(0, 100, size=40))
+    transfers = settle_up(cents.tolist())
+    assert len(transfers) <= np.count_nonzero(cents) - 1
+
+    settled = cents.copy()
+    for payer, payee, amount in transfers:
+        assert amount > 0
+        settled[payer] += amount
+        settled[payee] -= amount
+    assert not settled.any()
+
+
+def test_to_cents_keeps_the_total_at_zero():
+    cents = to_cents(np.array([10 / 3, 10 / 3, -20 / 3]))
+    assert cents.sum() == 0
+
+
+def test_engine_builds_group_balances_from_the_store(tmp_path):
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    store.upsert_expenses(
+        [
+            record(1, [(1, 90, 30), (2, 0, 30), (3, 0, 30)]),
+            record(2, [(1, 0, 20), (2, 40, 20)]),
+            record(3, [(2, 60, 0), (3, 0, 60)], deleted_at="2024-02-01"),
+            record(4, [(1, 10, 5), (3, 0, 5)], currency="EUR"),
+            record(5, [(1, 0, 50), (2, 50, 0)], group_id=2),
+        ]
+    )
+
+    balances = SettlementEngine(store).balances(1)
+
+    assert balances["expenses"] == 3
+    usd = balances["currencies"]["USD"]
+    assert [(m["id"], m["balance"]) for m in usd["members"]] == [
+        (1, 40.0),
+        (2, -10.0),
+        (3, -30.0),
+    ]
+    assert {(d["from"]["id"], d["to"]["id"], d["amount"]) for d in usd["debts"]} == {
+        (2, 1, 10.0),
+        (3, 1, 30.0),
+    }
+    assert [
+        (t["from"]["name"], t["to"]["name"], t["amount"]) for t in usd["transfers"]
+    ] == [("user3", "user1", 30.0), ("user2", "user1", 10.0)]
+    assert balances["currencies"]["EUR"]["transfers"][0]["amount"] == 5.0
+    assert SettlementEngine(store).balances(99) == {
+        "group_id": 99,
+        "expenses": 0,
+        "currencies": {},
+    }
+
+
+def test_results_are_reused_until_the_store_changes(tmp_path):
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    store.upsert_expenses([record(1, [(1, 20, 10), (2, 0, 10)])])
+    engine = SettlementEngine(store)
+
+    first = engine.balances(1)
+    assert engine.balances(1) is first
+
+    store.upsert_expenses([record(2, [(1, 0, 10), (2, 20, 10)])])
+    assert engine.balances(1)["currencies"]["USD"]["transfers"] == []
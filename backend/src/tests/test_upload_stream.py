@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import io
+import pickle
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from src.api.middleware import UploadLimitMiddleware
+from src.utils.cache import content_key
+from src.utils.image_pipeline import process_image
+from src.utils.upload_stream import SpooledUpload, UploadTooLarge, spool_upload
+
+
+def png_bytes(size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def upload_of(data, size=None):
+    return StarletteUploadFile(CountingFile(data), size=size)
+
+
+def test_spool_keeps_small_uploads_in_memory_and_hashes_them():
+    data = png_bytes()
+    upload = asyncio.run(spool_upload(upload_of(data), max_memory=1024 * 1024))
+
+    assert upload.in_memory
+    assert upload.size == len(data)
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert content_key(upload, "raw") == content_key(data, "raw")
+    assert upload.read() == data
+
+
+def test_spool_rolls_large_uploads_to_disk():
+    data = b"x" * 200_000
+    with asyncio.run(spool_upload(upload_of(data), max_memory=64 * 1024)) as upload:
+        assert not upload.in_memory
+        assert upload.read() == data
+    assert upload.closed
+
+
+def test_declared_size_is_rejected_before_reading():
+    source = upload_of(b"x" * 100, size=11 * 1024 * 1024)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(source))
+    assert source.file.bytes_read == 0
+
+
+def test_copy_stops_at_the_first_chunk_over_the_limit():
+    source = upload_of(b"x" * 1_000_000)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(source, max_bytes=100_000, chunk_size=10_000))
+    assert source.file.bytes_read <= 110_000
+
+
+def test_process_image_reads_a_file_handle():
+    upload = SpooledUpload.from_bytes(png_bytes((2000, 1000)))
+    processed = process_image(upload)
+
+    assert processed.is_valid
+    assert Image.open(io.BytesIO(processed.data)).size == (1024, 512)
+
+
+def test_spooled_upload_pickles_as_its_content():
+    data = png_bytes()
+    restored = pickle.loads(pickle.dumps(SpooledUpload.from_bytes(data)))
+    assert restored.read() == data
+    assert restored.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_middleware_rejects_oversized_bodies_before_parsing():
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/api/receipts/process")
+    async def process(file: UploadFile = File(...)):
+        parsed.append(file.filename)
+        return {"size": file.size}
+
+    @app.post("/api/receipts/batch")
+    async def batch(file: UploadFile = File(...)):
+        return {"size": file.size}
+
+    app.add_middleware(
+        UploadLimitMiddleware,
+        limits={"/api/receipts": 10_000, "/api/receipts/batch": 50_000},
+    )
+    client = TestClient(app)
+
+    small = client.post("/api/receipts/process", files={"file": ("r.png", b"x" * 100)})
+    assert small.status_code == 200
+
+    large = client.post(
+        "/api/receipts/process", files={"file": ("r.png", b"x" * 20_000)}
+    )
+    assert large.status_code == 413
+    assert parsed == ["r.png"]
+    batch = client.post("/api/receipts/batch", files={"file": ("r.png", b"x" * 20_000)})
+    assert batch.status_code == 200
+
+    def chunked():
+        boundary = b"--b\r\n"
+        yield boundary + (
+            b'Content-Disposition: form-data; name="file"; filename="r.png"\r\n\r\n'
+        )
+        for _ in range(5):
+            yield b"x" * 5_000
+        yield b"\r\n--b--\r\n"
+
+    streamed = client.post(
+        "/api/receipts/process",
+        content=chunked(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert streamed.status_code == 413
+    assert parsed == ["r.png"]
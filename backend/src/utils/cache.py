@@ -0,0 +1,345 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+from ..config.storage_config import data_path
+from .serialization import from_json, to_json
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(data: Union[bytes, BinaryIO], namespace: str = "") -> str:
+    """
+    Return a content-addressed cache key for the given bytes or binary file
+
+    Files are hashed in chunks and rewound; a spooled upload reuses the digest
+    computed while it was received.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        digest = hashlib.sha256(data).hexdigest()
+    else:
+        digest = getattr(data, "sha256", None)
+        if digest is None:
+            hasher = hashlib.sha256()
+            data.seek(0)
+            for chunk in iter(lambda: data.read(64 * 1024), b""):
+                hasher.update(chunk)
+            data.seek(0)
+            digest = hasher.hexdigest()
+    return f"{namespace}:{digest}" if namespace else digest
+
+
+class CacheBackend(ABC):
+    """Key/value cache storing JSON-serializable values with a TTL"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring it after ttl seconds if given"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key from the cache"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every key from the cache"""
+        pass
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache bounded by entry count"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: Optional[float] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**super().stats(), "entries": len(self._entries)}
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache bounded by total payload size, evicting least recently used"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        default_ttl: Optional[float] = None,
+    ):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > now):
+                self._conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                self.hits += 1
+                return from_json(row[0])
+            if row is not None:
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        now = time.time()
+        payload = to_json(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + ttl if ttl else None, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,),
+        )
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the store fits again
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM cache_entries ORDER BY accessed_at ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM cache_entries WHERE key = ?", victims)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+        return {**super().stats(), "entries": entries, "bytes": size}
+
+
+class TieredCache(CacheBackend):
+    """Memory LRU tier in front of an optional SQLite tier"""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def from_env(
+        cls, prefix: str, default_ttl: float, default_db_path: str = ""
+    ) -> "TieredCache":
+        """
+        Build a cache from {prefix}_* environment variables
+
+        Args:
+            prefix: Environment variable prefix, e.g. RECEIPT_CACHE
+            default_ttl: TTL in seconds when {prefix}_TTL_SECONDS is unset
+            default_db_path: SQLite path when {prefix}_DB_PATH is unset; empty
+                disables the disk tier
+
+        Returns:
+            TieredCache: Configured cache instance
+        """
+        try:
+            ttl = float(os.getenv(f"{prefix}_TTL_SECONDS", str(default_ttl)))
+            memory = MemoryCache(
+                max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "1024")),
+                default_ttl=ttl,
+            )
+            db_path = data_path(os.getenv(f"{prefix}_DB_PATH", default_db_path))
+            disk = None
+            if db_path:
+                disk = SQLiteCache(
+                    db_path,
+                    max_bytes=int(
+                        os.getenv(f"{prefix}_MAX_BYTES", str(100 * 1024 * 1024))
+                    ),
+                    default_ttl=ttl,
+                )
+            return cls(memory, disk)
+        except (ValueError, sqlite3.Error) as e:
+            logger.error(f"Invalid {prefix} configuration: {str(e)}")
+            raise ValueError(f"Invalid {prefix} configuration: {str(e)}")
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promote to the memory tier for subsequent lookups
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def cache_from_env(
+    prefix: str, default_ttl: Optional[float] = None, default_backend: str = "memory"
+) -> CacheBackend:
+    """
+    Build a single cache backend selected by {prefix}_BACKEND
+
+    Args:
+        prefix: Environment variable prefix, e.g. SPLITWISE_CACHE
+        default_ttl: Default entry TTL in seconds, if any
+        default_backend: Backend used when {prefix}_BACKEND is unset
+
+    Returns:
+        CacheBackend: A memory, sqlite or tiered cache
+    """
+    backend = os.getenv(f"{prefix}_BACKEND", default_backend).lower()
+    db_path = data_path(os.getenv(f"{prefix}_DB_PATH", f"{prefix.lower()}.db"))
+    try:
+        if backend == "memory":
+            return MemoryCache(
+                max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "1024")),
+                default_ttl=default_ttl,
+            )
+        if backend == "sqlite":
+            return SQLiteCache(
+                db_path,
+                max_bytes=int(os.getenv(f"{prefix}_MAX_BYTES", str(100 * 1024 * 1024))),
+                default_ttl=default_ttl,
+            )
+        if backend == "tiered":
+            return TieredCache.from_env(prefix, default_ttl or 0, db_path)
+    except (ValueError, sqlite3.Error) as e:
+        logger.error(f"Invalid {prefix} configuration: {str(e)}")
+        raise ValueError(f"Invalid {prefix} configuration: {str(e)}")
+    raise ValueError(f"Unsupported {prefix} backend: {backend}")
@@ -0,0 +1,294 @@
+import asyncio
+import importlib
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default (concurrency, queue_size) per route. Receipt processing is capped well
+# below the worker count so cheap routes always find a free worker: receipts and
+# receipt_batch together hold at most 8 of the 16 default workers.
+DEFAULT_ROUTE_LIMITS: Dict[str, Tuple[int, int]] = {
+    "receipts": (4, 16),
+    "expenses": (8, 32),
+    "groups": (8, 32),
+    "friends": (8, 32),
+    "analytics": (8, 32),
+    # Stage calls of /receipts/batch, across all stages; the stage limits only
+    # decide which stages queue for these slots
+    "receipt_batch": (4, 50),
+    "default": (8, 32),
+}
+
+# Agent instances created inside process-pool workers, keyed by class path
+_worker_instances: Dict[Tuple[str, str], Any] = {}
+
+
+def _invoke_in_worker(
+    module_name: str, class_name: str, method_name: str, args: tuple, kwargs: dict
+) -> Any:
+    """Call a method on a per-process agent instance (process pool only)"""
+    key = (module_name, class_name)
+    instance = _worker_instances.get(key)
+    if instance is None:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        instance = cls()
+        _worker_instances[key] = instance
+    return getattr(instance, method_name)(*args, **kwargs)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a call cannot be admitted to the execution pool"""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RouteLimit:
+    """Concurrency and queue bounds for a single route"""
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.avg_seconds = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def record(self, elapsed: float) -> None:
+        # Exponentially weighted moving average of service time
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+        self.completed += 1
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + self.running + 1
+        estimate = self.avg_seconds * backlog / self.concurrency
+        return int(min(60, max(1, math.ceil(estimate))))
+
+
+class ExecutionPool:
+    """
+    Runs blocking agent calls on a thread or process pool with admission control.
+
+    Every call is admitted against a global pending limit (503 when exceeded) and a
+    per-route queue limit (429 when exceeded). Admitted calls wait on the event loop
+    for a route slot, so a backlog of slow receipts never blocks other routes.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 16,
+        max_pending: int = 64,
+        route_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported execution pool kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self.routes: Dict[str, RouteLimit] = {
+            name: RouteLimit(*limits)
+            for name, limits in (route_limits or DEFAULT_ROUTE_LIMITS).items()
+        }
+        self.routes.setdefault("default", RouteLimit(*DEFAULT_ROUTE_LIMITS["default"]))
+
+    @classmethod
+    def from_env(cls) -> "ExecutionPool":
+        """Build a pool from AGENT_POOL_* and ROUTE_LIMIT_* environment variables"""
+        try:
+            route_limits = dict(DEFAULT_ROUTE_LIMITS)
+            for name in list(route_limits):
+                value = os.getenv(f"ROUTE_LIMIT_{name.upper()}")
+                if value:
+                    concurrency, _, queue_size = value.partition(":")
+                    route_limits[name] = (
+                        int(concurrency),
+                        int(queue_size or route_limits[name][1]),
+                    )
+
+            return cls(
+                kind=os.getenv("AGENT_POOL_KIND", "thread").lower(),
+                max_workers=int(os.getenv("AGENT_POOL_WORKERS", "16")),
+                max_pending=int(os.getenv("AGENT_POOL_MAX_PENDING", "64")),
+                route_limits=route_limits,
+            )
+        except ValueError as e:
+            logger.error(f"Invalid execution pool configuration: {str(e)}")
+            raise ValueError(f"Invalid execution pool configuration: {str(e)}")
+
+    @property
+    def executor(self) -> Executor:
+        """Get or create the underlying executor"""
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="agent-pool"
+                    )
+            return self._executor
+
+    def _route(self, route: str) -> RouteLimit:
+        return self.routes.get(route) or self.routes["default"]
+
+    def _admit(self, route: str, limit: RouteLimit) -> None:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                limit.rejected += 1
+                raise PoolSaturatedError(
+                    "Server is at capacity, please retry later",
+                    status_code=503,
+                    retry_after=limit.retry_after(),
+                )
+            if limit.running >= limit.concurrency and limit.waiting >= limit.queue_size:
+                limit.rejected += 1
+                raise PoolSaturatedError(
+                    f"Too many concurrent '{route}' requests, please retry later",
+                    status_code=429,
+                    retry_after=limit.retry_after(),
+                )
+            self.pending += 1
+            limit.waiting += 1
+
+    def _prepare_call(self, func: Callable, args: tuple, kwargs: dict) -> Callable:
+        if self.kind == "process" and inspect.ismethod(func):
+            # Bound agent methods are not picklable; rebuild the agent in the worker
+            owner = type(func.__self__)
+            return partial(
+                _invoke_in_worker,
+                owner.__module__,
+                owner.__qualname__,
+                func.__name__,
+                args,
+                kwargs,
+            )
+        return partial(func, *args, **kwargs)
+
+    async def run(self, route: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the pool under the given route's limits
+
+        Args:
+            route: Route name used to select concurrency and queue limits
+            func: Blocking callable to execute
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Any: Return value of func
+
+        Raises:
+            PoolSaturatedError: If the global or route queue is full
+        """
+        call = self._prepare_call(func, args, kwargs)
+        return await self._run(route, self.executor, call)
+
+    async def run_local(
+        self, route: str, func: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        """
+        Like run, but always on a thread of this process
+
+        For calls whose arguments cannot be sent to a process-pool worker, such as
+        progress callbacks. With a thread pool this is the same as run.
+
+        Raises:
+            PoolSaturatedError: If the global or route queue is full
+        """
+        executor = self.executor if self.kind == "thread" else None
+        return await self._run(route, executor, partial(func, *args, **kwargs))
+
+    async def _run(
+        self, route: str, executor: Optional[Executor], call: Callable
+    ) -> Any:
+        limit = self._route(route)
+        self._admit(route, limit)
+        acquired = False
+        try:
+            semaphore = limit.semaphore()
+            await semaphore.acquire()
+            acquired = True
+            with self._lock:
+                limit.waiting -= 1
+                limit.running += 1
+
+            started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(executor, call)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Workers cannot be interrupted; keep the slot, and the caller's
+                # arguments, in use until this one finishes
+                while not future.done():
+                    try:
+                        await asyncio.wait({future})
+                    except asyncio.CancelledError:
+                        pass
+                raise
+            finally:
+                limit.record(time.monotonic() - started)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                if acquired:
+                    limit.running -= 1
+                else:
+                    limit.waiting -= 1
+            if acquired:
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current pool utilization"""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "routes": {
+                    name: {
+                        "concurrency": limit.concurrency,
+                        "queue_size": limit.queue_size,
+                        "running": limit.running,
+                        "waiting": limit.waiting,
+                        "completed": limit.completed,
+                        "rejected": limit.rejected,
+                        "avg_seconds": round(limit.avg_seconds, 3),
+                    }
+                    for name, limit in self.routes.items()
+                },
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the underlying executor"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,149 @@
+import base64
+import io
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple, Union
+
+from PIL import Image
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_DIMENSION = 4000
+SUPPORTED_FORMATS = ("PNG", "JPEG", "JPG")
+
+# Raw bytes, or a seekable binary file such as a spooled upload
+ImageSource = Union[bytes, BinaryIO]
+
+
+@dataclass
+class ProcessedImage:
+    """Outcome of validating and optimizing an image in one pass"""
+
+    is_valid: bool
+    error: Optional[str] = None
+    format: Optional[str] = None
+    size: Optional[Tuple[int, int]] = None
+    data: Optional[bytes] = None
+
+
+def _source_size(image_data: ImageSource) -> int:
+    if isinstance(image_data, (bytes, bytearray)):
+        return len(image_data)
+    image_data.seek(0, io.SEEK_END)
+    size = image_data.tell()
+    image_data.seek(0)
+    return size
+
+
+def _open_and_check(
+    image_data: ImageSource,
+) -> Tuple[Optional[Image.Image], ProcessedImage]:
+    """Read only the image header and apply the validation rules"""
+    if image_data is None:
+        return None, ProcessedImage(False, "Image data cannot be empty")
+
+    # Size is known without decoding, so reject oversized uploads first
+    size = _source_size(image_data)
+    if size == 0:
+        return None, ProcessedImage(False, "Image data cannot be empty")
+    if size > MAX_IMAGE_BYTES:
+        return None, ProcessedImage(False, "Image size exceeds 10MB limit")
+
+    try:
+        # Image.open only parses the header; pixel data is decoded on load().
+        # File handles are read in place rather than copied into memory
+        if isinstance(image_data, (bytes, bytearray)):
+            image_data = io.BytesIO(image_data)
+        image = Image.open(image_data)
+    except Exception as e:
+        return None, ProcessedImage(False, f"Invalid image data: {str(e)}")
+
+    if image.format not in SUPPORTED_FORMATS:
+        return None, ProcessedImage(
+            False, f"Unsupported image format: {image.format}", format=image.format
+        )
+
+    width, height = image.size
+    if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+        return None, ProcessedImage(
+            False,
+            f"Image dimensions ({width}x{height}) exceed maximum allowed "
+            f"({MAX_IMAGE_DIMENSION}x{MAX_IMAGE_DIMENSION})",
+            format=image.format,
+            size=image.size,
+        )
+
+    return image, ProcessedImage(True, format=image.format, size=image.size)
+
+
+def inspect_image(image_data: ImageSource) -> ProcessedImage:
+    """
+    Validate an image from its header without decoding pixel data
+
+    Args:
+        image_data: Raw image bytes or a seekable binary file
+
+    Returns:
+        ProcessedImage: Validation outcome with format and dimensions
+    """
+    return _open_and_check(image_data)[1]
+
+
+def process_image(
+    image_data: ImageSource, max_size: int = 1024, quality: int = 85
+) -> ProcessedImage:
+    """
+    Validate, downscale and re-encode an image as JPEG with a single decode
+
+    Large JPEGs are decoded at reduced scale via draft(), so a 4000x4000 input
+    never materializes at full resolution.
+
+    Args:
+        image_data: Raw image bytes or a seekable binary file
+        max_size: Maximum dimension size (width or height)
+        quality: JPEG quality of the output
+
+    Returns:
+        ProcessedImage: Validation outcome and, when valid, optimized JPEG bytes
+    """
+    image, outcome = _open_and_check(image_data)
+    if image is None:
+        return outcome
+
+    width, height = image.size
+    target = None
+    if width > max_size or height > max_size:
+        ratio = min(max_size / width, max_size / height)
+        target = (int(width * ratio), int(height * ratio))
+
+    try:
+        if target and image.format == "JPEG":
+            # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 while staying >= target
+            image.draft("RGB", target)
+
+        # Convert to RGB if needed, flattening transparency onto white
+        if image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        ):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        if target and image.size != target:
+            # reducing_gap box-reduces first, then finishes with LANCZOS
+            image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+        outcome.data = buffer.getvalue()
+        return outcome
+    except Exception as e:
+        return ProcessedImage(
+            False, f"Failed to optimize image: {str(e)}", outcome.format, outcome.size
+        )
+
+
+def to_data_url(jpeg_data: bytes) -> str:
+    """Encode JPEG bytes as a data URL that vision models accept inline"""
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_data).decode("ascii")
@@ -0,0 +1,108 @@
+import json
+import re
+from typing import Any
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = "“”"
+_CLOSES_STRING = re.compile(r"\s*(?:[:,}\]]|$)")
+
+
+def _normalize_quotes(text: str) -> str:
+    """
+    Replace curly double quotes that delimit JSON strings with ASCII quotes
+
+    A curly quote only closes a string when a delimiter follows it, so quotes and
+    apostrophes inside values (Joe’s, a “quoted” word) are kept as they are.
+    """
+    out = []
+    closer = None
+    escaped = False
+    for index, char in enumerate(text):
+        if closer is None:
+            if char == '"' or char in _SMART_QUOTES:
+                closer = char if char == '"' else _SMART_QUOTES
+                char = '"'
+        elif escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            if closer == '"':
+                closer = None
+            else:
+                char = '\\"'
+        elif char in _SMART_QUOTES and closer == _SMART_QUOTES:
+            if _CLOSES_STRING.match(text, index + 1):
+                closer = None
+                char = '"'
+        out.append(char)
+    return "".join(out)
+
+
+def _balance(text: str) -> str:
+    """Cut text after its first complete JSON value, closing anything left open"""
+    stack = []
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return text[: index + 1]
+
+    # Truncated output: close the open string and containers
+    tail = '"' if in_string else ""
+    return _TRAILING_COMMA.sub(r"\1", text.rstrip().rstrip(",") + tail + "".join(reversed(stack)))
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse JSON from an LLM response, fixing common formatting mistakes locally
+
+    Handles code fences, prose around the value, curly quotes around strings,
+    Python literals, trailing commas and output truncated before the closing
+    brackets.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        Any: The parsed JSON value
+
+    Raises:
+        json.JSONDecodeError: If the text cannot be repaired
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    fenced = _FENCE.search(text)
+    candidate = fenced.group(1) if fenced else text
+    start = min(
+        (index for index in (candidate.find("{"), candidate.find("[")) if index >= 0),
+        default=-1,
+    )
+    if start < 0:
+        raise json.JSONDecodeError("No JSON value found", text, 0)
+
+    candidate = _balance(_normalize_quotes(candidate[start:]))
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    candidate = re.sub(
+        r"(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])",
+        lambda match: _PY_LITERALS[match.group(1)],
+        candidate,
+    )
+    return json.loads(candidate)
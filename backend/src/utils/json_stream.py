@@ -0,0 +1,137 @@
+import json
+from typing import Any, Iterable, List, NamedTuple, Optional
+
+from .json_repair import repair_json
+
+_WHITESPACE = " \t\r\n"
+# repair_json fixes these inside containers; bare field values are mapped here
+_PY_LITERALS = {"True": True, "False": False, "None": None}
+
+
+class JSONEvent(NamedTuple):
+    """A top-level field, or one element of a streamed array, that just closed"""
+
+    key: str
+    value: Any
+    element: bool = False
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON object from text that arrives in chunks, e.g. LLM tokens.
+
+    Each top-level field is emitted as soon as its value closes. Object
+    elements of the arrays named in stream_arrays are emitted one by one as
+    they close, instead of waiting for the whole array; other elements, or a
+    value that turns out not to be an array, are emitted when it closes.
+    Anything before the first "{" (prose, code fences) is skipped. Values that
+    are not valid JSON are passed through repair_json and dropped if still
+    unreadable.
+    """
+
+    def __init__(self, stream_arrays: Iterable[str] = ()):
+        self.stream_arrays = set(stream_arrays)
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._element_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[JSONEvent]:
+        """Add a chunk of text and return the events it completed"""
+        self.buffer += chunk
+        events: List[JSONEvent] = []
+        buffer = self.buffer
+        for index in range(self._pos, len(buffer)):
+            if self.done:
+                break
+            char = buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buffer[self._key_start : index + 1])
+                        self._key_start = None
+                continue
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if (
+                self._depth == 1
+                and self._key is not None
+                and self._value_start is None
+                and char not in _WHITESPACE
+                and char != ":"
+            ):
+                self._value_start = index
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = index
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 3 and char == "{" and self._streaming_array():
+                    self._element_start = index
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._element_start is not None:
+                    self._emit(events, buffer[self._element_start : index + 1], True)
+                    self._element_start = None
+                elif self._depth == 1 and self._value_start is not None:
+                    self._emit(events, buffer[self._value_start : index + 1])
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit(events, buffer[self._value_start : index])
+                    self.done = True
+            elif char == "," and self._depth == 1 and self._value_start is not None:
+                self._emit(events, buffer[self._value_start : index])
+        self._pos = len(buffer)
+        return events
+
+    def _streaming_array(self) -> bool:
+        return (
+            self._key in self.stream_arrays
+            and self._value_start is not None
+            and self.buffer[self._value_start] == "["
+        )
+
+    def _emit(self, events: List[JSONEvent], text: str, element: bool = False) -> None:
+        key = self._key
+        if not element:
+            self._key = None
+            self._value_start = None
+        text = text.strip()
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            if text in _PY_LITERALS:
+                value = _PY_LITERALS[text]
+            else:
+                try:
+                    value = repair_json(text)
+                except Exception:
+                    return
+        if not element and key in self.stream_arrays and isinstance(value, list):
+            # Object elements were already emitted one by one
+            events.extend(
+                JSONEvent(key, item, True)
+                for item in value
+                if not isinstance(item, dict)
+            )
+            return
+        events.append(JSONEvent(key, value, element))
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from .cache import CacheBackend, cache_from_env
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonical_prompt(text: str) -> str:
+    """Collapse whitespace runs so formatting-only differences share a cache entry"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+class LLMResponseCache:
+    """
+    Caches LLM task outputs by prompt, model and temperature.
+
+    Entries record the tokens the original call used, so stats() can report
+    how many tokens cache hits saved. Lookups may be bypassed per call.
+    """
+
+    def __init__(self, backend: CacheBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str = "LLM_CACHE") -> "LLMResponseCache":
+        """Build a cache from {prefix}_* environment variables"""
+        try:
+            ttl = float(os.getenv(f"{prefix}_TTL_SECONDS", "86400"))
+        except ValueError as e:
+            logger.error(f"Invalid {prefix} configuration: {str(e)}")
+            raise ValueError(f"Invalid {prefix} configuration: {str(e)}")
+        return cls(
+            cache_from_env(prefix, default_ttl=ttl),
+            enabled=os.getenv(f"{prefix}_ENABLED", "true").lower() == "true",
+        )
+
+    @staticmethod
+    def key(
+        prompt: str,
+        model: str,
+        temperature: float,
+        extra: Iterable[Any] = (),
+    ) -> str:
+        """
+        Return the cache key of a prompt
+
+        Args:
+            prompt: Prompt text; whitespace is canonicalized
+            model: Model name
+            temperature: Sampling temperature
+            extra: Anything else that shapes the output, e.g. the agent role,
+                expected output and upstream task outputs
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = json.dumps(
+            [canonical_prompt(prompt), model, float(temperature), list(extra)],
+            separators=(",", ":"),
+            default=str,
+        )
+        return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached output, counting the hit and the tokens it saved"""
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += int(entry.get("total_tokens") or 0)
+        return entry["output"]
+
+    def set(
+        self, key: str, output: str, usage: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Store an output with the token usage of the call that produced it"""
+        if not self.enabled or not output:
+            return
+        usage = usage or {}
+        self.backend.set(
+            key,
+            {
+                "output": output,
+                "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+                "completion_tokens": int(usage.get("completion_tokens") or 0),
+                "total_tokens": int(usage.get("total_tokens") or 0),
+            },
+        )
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+            }
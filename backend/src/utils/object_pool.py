@@ -0,0 +1,113 @@
+import logging
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ObjectPool(Generic[T]):
+    """
+    Keeps warmed, reusable instances of an expensive object.
+
+    acquire() hands out an idle instance or builds a new one, so callers never
+    block; release() resets per-use state and keeps up to max_idle instances for
+    the next caller. An instance is only ever held by one caller at a time,
+    which makes pooling safe for objects that are not thread-safe.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        reset: Optional[Callable[[T], None]] = None,
+        max_idle: int = 8,
+        name: str = "pool",
+    ):
+        self.factory = factory
+        self.reset = reset
+        self.max_idle = max_idle
+        self.name = name
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+        self._idle: "deque[T]" = deque()
+        self._leases: Dict[int, weakref.finalize] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> T:
+        with self._lock:
+            self.in_use += 1
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.created += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self.in_use -= 1
+                self.created -= 1
+            raise
+
+    def release(self, instance: T) -> None:
+        try:
+            if self.reset is not None:
+                self.reset(instance)
+        except Exception as e:
+            # A failed reset means the instance may carry stale state; drop it
+            logger.warning(f"Discarding {self.name} instance after failed reset: {str(e)}")
+            with self._lock:
+                self.in_use -= 1
+            return
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self.max_idle:
+                self._idle.append(instance)
+
+    @contextmanager
+    def checkout(self) -> Iterator[T]:
+        instance = self.acquire()
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def lease(self, owner: Any) -> T:
+        """
+        Acquire an instance on behalf of owner
+
+        The instance returns to the pool on release_owner(owner), or when owner is
+        garbage collected if that never happens.
+        """
+        instance = self.acquire()
+        key = id(owner)
+
+        def _return(pool_ref=weakref.ref(self)):
+            pool = pool_ref()
+            if pool is not None:
+                pool._leases.pop(key, None)
+                pool.release(instance)
+
+        with self._lock:
+            self._leases[key] = weakref.finalize(owner, _return)
+        return instance
+
+    def release_owner(self, owner: Any) -> None:
+        """Return instances leased to owner, if any"""
+        with self._lock:
+            finalizer = self._leases.get(id(owner))
+        if finalizer is not None:
+            finalizer()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+            }
@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .cache import CacheBackend, cache_from_env
+
+logger = logging.getLogger(__name__)
+
+# (fresh seconds, stale-while-revalidate seconds) per entity
+DEFAULT_ENTITY_TTLS: Dict[str, Tuple[float, float]] = {
+    "groups": (60, 300),
+    "friends": (300, 900),
+    "expenses": (30, 300),
+}
+
+
+class ReadThroughCache:
+    """
+    Read-through cache with per-entity TTLs and stale-while-revalidate.
+
+    Fresh entries are served directly. Entries past their fresh TTL but within the
+    stale window are served immediately while a background refresh runs. Writers
+    call invalidate(entity) so later reads never see data fetched before the write.
+    Invalidations made by other processes sharing the backend are picked up within
+    marker_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        entity_ttls: Optional[Dict[str, Tuple[float, float]]] = None,
+        refresh_workers: int = 2,
+        marker_ttl: float = 1.0,
+    ):
+        self.backend = backend
+        self.entity_ttls = entity_ttls or DEFAULT_ENTITY_TTLS
+        self.marker_ttl = marker_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        # entity -> (invalidation marker, monotonic time it was read)
+        self._invalidated_at: Dict[str, Tuple[float, float]] = {}
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="cache-refresh"
+        )
+
+    @classmethod
+    def from_env(cls, prefix: str = "SPLITWISE_CACHE") -> "ReadThroughCache":
+        """Build a cache from {prefix}_* environment variables"""
+        try:
+            stale = os.getenv(f"{prefix}_STALE_SECONDS")
+            marker_ttl = float(os.getenv(f"{prefix}_INVALIDATION_CHECK_SECONDS", "1"))
+            entity_ttls = {
+                entity: (
+                    float(os.getenv(f"{prefix}_TTL_{entity.upper()}", str(fresh))),
+                    float(stale) if stale is not None else default_stale,
+                )
+                for entity, (fresh, default_stale) in DEFAULT_ENTITY_TTLS.items()
+            }
+        except ValueError as e:
+            logger.error(f"Invalid {prefix} configuration: {str(e)}")
+            raise ValueError(f"Invalid {prefix} configuration: {str(e)}")
+        return cls(cache_from_env(prefix), entity_ttls, marker_ttl=marker_ttl)
+
+    def get_or_load(self, entity: str, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return a cached value for (entity, key), loading it on a miss
+
+        Args:
+            entity: Entity type, which selects the TTLs (groups, friends, expenses)
+            key: Entity-specific key, e.g. the query parameters
+            loader: Callable fetching the value from the source of truth
+
+        Returns:
+            Any: The cached or freshly loaded value
+        """
+        cache_key = f"{entity}:{key}"
+        fresh_ttl, stale_ttl = self.entity_ttls.get(entity, (0, 0))
+        entry = self.backend.get(cache_key)
+
+        if entry is not None and entry["fetched_at"] > self._last_invalidation(entity):
+            age = time.time() - entry["fetched_at"]
+            if age < fresh_ttl:
+                self.hits += 1
+                return entry["value"]
+            if age < fresh_ttl + stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(entity, cache_key, loader)
+                return entry["value"]
+
+        self.misses += 1
+        return self._load(entity, cache_key, loader)
+
+    def _load(self, entity: str, cache_key: str, loader: Callable[[], Any]) -> Any:
+        started = time.time()
+        value = loader()
+        # Skip the write if the entity was invalidated while the load was in flight
+        if started > self._last_invalidation(entity):
+            fresh_ttl, stale_ttl = self.entity_ttls.get(entity, (0, 0))
+            self.backend.set(
+                cache_key,
+                {"value": value, "fetched_at": started},
+                ttl=fresh_ttl + stale_ttl or None,
+            )
+        return value
+
+    def _refresh_in_background(
+        self, entity: str, cache_key: str, loader: Callable[[], Any]
+    ) -> None:
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            self.refreshes += 1
+
+        def refresh():
+            try:
+                self._load(entity, cache_key, loader)
+            except Exception as e:
+                logger.warning(f"Background refresh of {cache_key} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        self._executor.submit(refresh)
+
+    def _last_invalidation(self, entity: str) -> float:
+        checked = time.monotonic()
+        cached = self._invalidated_at.get(entity)
+        if cached is not None and checked - cached[1] < self.marker_ttl:
+            return cached[0]
+        # The marker is shared with other processes through the backend; re-read
+        # it at most every marker_ttl seconds so lookups do not double traffic
+        marker = self.backend.get(f"invalidated:{entity}") or 0.0
+        with self._lock:
+            local = self._invalidated_at.get(entity, (0.0, 0.0))[0]
+            marker = max(marker, local)
+            self._invalidated_at[entity] = (marker, checked)
+        return marker
+
+    def invalidate(self, *entities: str) -> None:
+        """Mark every cached entry of the given entities as outdated"""
+        now = time.time()
+        for entity in entities:
+            with self._lock:
+                self._invalidated_at[entity] = (now, time.monotonic())
+            self.backend.set(f"invalidated:{entity}", now, ttl=0)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "background_refreshes": self.refreshes,
+            "backend": self.backend.stats(),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.backend.close()
@@ -1,12 +1,16 @@
 import os
 import logging
+import threading
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, BotoCoreError
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from datetime import datetime
-from typing import Optional, Tuple
-from PIL import Image
-import io
+from typing import BinaryIO, Optional, Tuple, Union
+from urllib.parse import quote, unquote, urlsplit
+from .image_pipeline import ImageSource, inspect_image, process_image
+from ..config.http_config import boto_client_config, instrument_boto_client
 
 
 class S3Helper:
@@ -19,15 +23,64 @@ class S3Helper:
         if not self.bucket_name:
             raise ValueError("AWS_S3_BUCKET environment variable is required")
 
-        # Initialize S3 client
+        self.region = os.getenv("AWS_REGION", "us-east-1")
+        # Custom endpoint for S3-compatible stores (MinIO, LocalStack, ...)
+        self.endpoint_url = (os.getenv("AWS_S3_ENDPOINT_URL") or "").rstrip("/") or None
+        self.addressing_style = os.getenv("AWS_S3_ADDRESSING_STYLE", "virtual").lower()
+        if self.addressing_style not in ("virtual", "path", "auto"):
+            raise ValueError(f"Unsupported S3 addressing style: {self.addressing_style}")
+
+        # Inline image delivery does not need public objects; empty means bucket default
+        self.object_acl = os.getenv("S3_OBJECT_ACL", "public-read")
+        # Uploads are trusted once put_object succeeds; HEAD checks are opt-in
+        # and run off the request path
+        self.verify_uploads = os.getenv("S3_VERIFY_UPLOADS", "false").lower() == "true"
+        self.verification_stats = {"verified": 0, "failed": 0}
+        self._verify_executor: Optional[ThreadPoolExecutor] = None
+
+        # File objects are streamed with upload_fileobj, switching to a
+        # multipart upload past the threshold so large bodies are never buffered
+        mb = 1024 * 1024
+        self.multipart_threshold = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * mb)))
+        self.multipart_chunksize = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * mb)))
+        self.multipart_concurrency = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+
+        # The client is created on first use so importing and constructing the
+        # helper stays cheap; check_bucket() verifies access explicitly
+        self._s3_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            with self._client_lock:
+                if self._s3_client is None:
+                    try:
+                        self._s3_client = instrument_boto_client(
+                            boto3.client(
+                                "s3",
+                                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                                region_name=self.region,
+                                endpoint_url=self.endpoint_url,
+                                config=boto_client_config("s3").merge(
+                                    Config(s3={"addressing_style": self.addressing_style})
+                                ),
+                            ),
+                            "s3",
+                        )
+                    except Exception as e:
+                        raise ValueError(f"Failed to initialize S3 client: {str(e)}")
+        return self._s3_client
+
+    def check_bucket(self) -> None:
+        """
+        Verify credentials and bucket access
+
+        Raises:
+            ValueError: If the bucket is missing or not accessible
+        """
         try:
-            self.s3_client = boto3.client(
-                "s3",
-                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-                region_name=os.getenv("AWS_REGION", "us-east-1"),
-            )
-            # Verify credentials and bucket access
             self.s3_client.head_bucket(Bucket=self.bucket_name)
         except ClientError as e:
             error_code = e.response.get("Error", {}).get("Code")
@@ -37,86 +90,49 @@ class S3Helper:
                 raise ValueError(f"Bucket does not exist: {self.bucket_name}")
             else:
                 raise ValueError(f"Failed to initialize S3 client: {str(e)}")
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to initialize S3 client: {str(e)}")
 
-    def optimize_image(self, image_data: bytes, max_size: int = 1024) -> bytes:
+    def optimize_image(self, image_data: ImageSource, max_size: int = 1024) -> bytes:
         """
         Optimize image for upload by resizing and compressing
 
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes or a seekable binary file
             max_size: Maximum dimension size (width or height)
 
         Returns:
             bytes: Optimized image data
-        """
-        image = Image.open(io.BytesIO(image_data))
 
-        # Convert to RGB if needed
-        if image.mode in ("RGBA", "LA") or (
-            image.mode == "P" and "transparency" in image.info
-        ):
-            background = Image.new("RGB", image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[-1])
-            image = background
-
-        # Resize if needed
-        width, height = image.size
-        if width > max_size or height > max_size:
-            ratio = min(max_size / width, max_size / height)
-            new_size = (int(width * ratio), int(height * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-        # Save with optimal quality
-        buffer = io.BytesIO()
-        image.save(buffer, format="JPEG", quality=85, optimize=True)
-        return buffer.getvalue()
+        Raises:
+            ValueError: If the image is invalid or cannot be optimized
+        """
+        processed = process_image(image_data, max_size=max_size)
+        if not processed.is_valid:
+            raise ValueError(processed.error)
+        return processed.data
 
-    def validate_image(self, image_data: bytes) -> Tuple[bool, Optional[str]]:
+    def validate_image(self, image_data: ImageSource) -> Tuple[bool, Optional[str]]:
         """
         Validate image data before upload
 
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes or a seekable binary file
 
         Returns:
             Tuple[bool, Optional[str]]: (is_valid, error_message)
         """
-        if not image_data:
-            return False, "Image data cannot be empty"
+        result = inspect_image(image_data)
+        return result.is_valid, result.error
 
-        try:
-            # Try to open the image to verify it's valid
-            image = Image.open(io.BytesIO(image_data))
-
-            # Check image format
-            if image.format not in ["PNG", "JPEG", "JPG"]:
-                return False, f"Unsupported image format: {image.format}"
-
-            # Check image size (max 10MB)
-            if len(image_data) > 10 * 1024 * 1024:
-                return False, "Image size exceeds 10MB limit"
-
-            # Check dimensions (max 4000x4000)
-            width, height = image.size
-            if width > 4000 or height > 4000:
-                return (
-                    False,
-                    f"Image dimensions ({width}x{height}) exceed maximum allowed (4000x4000)",
-                )
-
-            return True, None
-
-        except Exception as e:
-            return False, f"Invalid image data: {str(e)}"
-
-    def upload_image(self, image_data: bytes) -> str:
+    def upload_image(self, image_data: ImageSource) -> str:
         """
         Upload an image to S3 and return its URL
 
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes or a seekable binary file
 
         Returns:
             str: Public URL of the uploaded image
@@ -125,22 +141,47 @@ class S3Helper:
             ValueError: If image_data is invalid
             Exception: If upload fails
         """
-        # Validate and optimize image
-        is_valid, error_message = self.validate_image(image_data)
-        if not is_valid:
-            self.logger.error(f"Invalid image data: {error_message}")
-            raise ValueError(error_message)
+        return self.store_image(self.prepare_image(image_data))
 
-        # Optimize image before upload
-        try:
-            self.logger.info("Optimizing image for upload...")
-            image_data = self.optimize_image(image_data)
-            self.logger.info(f"Image optimized, size: {len(image_data)} bytes")
+    def prepare_image(self, image_data: ImageSource) -> bytes:
+        """
+        Validate and optimize an image for upload
 
-        except Exception as e:
-            self.logger.error(f"Image optimization failed: {str(e)}")
-            raise ValueError(f"Failed to optimize image: {str(e)}")
+        Args:
+            image_data: Raw image bytes or a seekable binary file
+
+        Returns:
+            bytes: Optimized JPEG bytes
+
+        Raises:
+            ValueError: If image_data is invalid or cannot be optimized
+        """
+        # Validation and optimization share a single decode
+        self.logger.info("Optimizing image for upload...")
+        processed = process_image(image_data)
+        if not processed.is_valid:
+            self.logger.error(f"Invalid image data: {processed.error}")
+            raise ValueError(processed.error)
+
+        self.logger.info(f"Image optimized, size: {len(processed.data)} bytes")
+        return processed.data
+
+    def store_image(self, image_data: Union[bytes, BinaryIO]) -> str:
+        """
+        Upload already optimized JPEG bytes to S3 and return their URL
 
+        Bytes go up in a single put_object. Binary files are streamed with
+        upload_fileobj, which uses a multipart upload past S3_MULTIPART_THRESHOLD.
+
+        Args:
+            image_data: Optimized JPEG bytes from prepare_image, or a binary file
+
+        Returns:
+            str: Public URL of the uploaded image
+
+        Raises:
+            Exception: If upload fails
+        """
         try:
             # Generate a unique filename using UUID and timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -148,45 +189,37 @@ class S3Helper:
             filename = f"receipts/{timestamp}_{unique_id}.jpg"
             self.logger.info(f"Generated filename: {filename}")
 
-            # Upload the file with public-read ACL
+            # Upload the file with the configured ACL (public-read by default)
             self.logger.info(f"Uploading to bucket: {self.bucket_name}")
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=filename,
-                Body=image_data,
-                ContentType="image/jpeg",
-                ACL="public-read",
-                Metadata={
+            extra_args = {
+                "ContentType": "image/jpeg",
+                "Metadata": {
                     "upload_timestamp": timestamp,
                     "content_type": "receipt_image",
                     "id": unique_id,
                 },
-            )
+            }
+            if self.object_acl:
+                extra_args["ACL"] = self.object_acl
+            if isinstance(image_data, (bytes, bytearray)):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name, Key=filename, Body=image_data, **extra_args
+                )
+            else:
+                image_data.seek(0)
+                self.s3_client.upload_fileobj(
+                    image_data,
+                    self.bucket_name,
+                    filename,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_config(),
+                )
             self.logger.info(f"Upload to S3 successful for key: {filename}")
 
-            # Generate and verify the URL
-            # Format: https://{bucket}.s3.{region}.amazonaws.com/{key}
-            region = os.getenv("AWS_REGION", "us-east-1")
-
-            # Use the correct URL format for S3 objects
-            # This format is compatible with the VisionTool
-            url = f"https://{self.bucket_name}.s3.{region}.amazonaws.com/{filename}"
-
-            # Log the URL and ensure it's properly formatted for vision tools
+            url = self.build_object_url(filename)
             self.logger.info(f"Successfully uploaded image to {url}")
-
-            # Verify the URL is accessible
-            if not self.verify_image_url(url):
-                self.logger.warning(f"Uploaded image URL verification failed: {url}")
-                # Try an alternative URL format if verification failed
-                alt_url = (
-                    f"https://s3.{region}.amazonaws.com/{self.bucket_name}/{filename}"
-                )
-                self.logger.info(f"Trying alternative URL format: {alt_url}")
-                if self.verify_image_url(alt_url):
-                    self.logger.info(f"Alternative URL format verified: {alt_url}")
-                    return alt_url
-
+            if self.verify_uploads:
+                self._verify_in_background(filename, url)
             return url
 
         except ClientError as e:
@@ -198,35 +231,91 @@ class S3Helper:
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
-    def verify_image_url(self, url: str) -> bool:
+    def transfer_config(self):
+        """Return the boto3 TransferConfig used for streamed uploads"""
+        from boto3.s3.transfer import TransferConfig
+
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.multipart_concurrency,
+        )
+
+    def _uses_path_style(self) -> bool:
+        if self.addressing_style == "auto":
+            # Dotted bucket names break TLS on virtual-hosted URLs
+            return "." in self.bucket_name
+        return self.addressing_style == "path"
+
+    def build_object_url(self, key: str) -> str:
         """
-        Verify if an image URL exists in the S3 bucket
+        Build the public URL of an object without calling S3
+
+        Follows the configured endpoint and addressing style, so the URL matches
+        what the client itself uses for the bucket.
 
         Args:
-            url: S3 URL to verify
+            key: Object key
 
         Returns:
-            bool: True if image exists and is accessible
+            str: Public URL of the object
         """
-        try:
-            # Extract key from URL - handle different URL formats
-            # Format could be either:
-            # - https://{bucket}.s3.amazonaws.com/{key}
-            # - https://{bucket}.s3.{region}.amazonaws.com/{key}
-            if ".s3.amazonaws.com/" in url:
-                key = url.split(".s3.amazonaws.com/")[1]
-            elif ".s3." in url and ".amazonaws.com/" in url:
-                # Extract the part after amazonaws.com/
-                key = url.split(".amazonaws.com/")[1]
-            else:
-                self.logger.error(f"Invalid S3 URL format: {url}")
-                return False
+        quoted_key = quote(key, safe="/")
+        if self.endpoint_url:
+            parts = urlsplit(self.endpoint_url)
+            if self._uses_path_style():
+                return f"{self.endpoint_url}/{self.bucket_name}/{quoted_key}"
+            return f"{parts.scheme}://{self.bucket_name}.{parts.netloc}{parts.path}/{quoted_key}"
+
+        if self._uses_path_style():
+            return f"https://s3.{self.region}.amazonaws.com/{self.bucket_name}/{quoted_key}"
+        # Format: https://{bucket}.s3.{region}.amazonaws.com/{key}
+        return f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{quoted_key}"
+
+    def _verify_in_background(self, key: str, url: str) -> None:
+        if self._verify_executor is None:
+            with self._client_lock:
+                if self._verify_executor is None:
+                    self._verify_executor = ThreadPoolExecutor(
+                        max_workers=2, thread_name_prefix="s3-verify"
+                    )
+        self._verify_executor.submit(self.verify_object, key, url)
+
+    def verify_object(self, key: str, url: Optional[str] = None) -> bool:
+        """
+        Check that an uploaded object exists
+
+        Args:
+            key: Object key
+            url: Public URL, used for logging only
 
-            # Check if object exists
+        Returns:
+            bool: True if the object exists and is accessible
+        """
+        try:
             self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
-            self.logger.info(f"Successfully verified image URL: {url}")
+            with self._client_lock:
+                self.verification_stats["verified"] += 1
+            self.logger.info(f"Successfully verified image URL: {url or key}")
             return True
+        except (ClientError, BotoCoreError) as e:
+            with self._client_lock:
+                self.verification_stats["failed"] += 1
+            self.logger.error(f"Failed to verify image URL {url or key}: {str(e)}")
+            return False
 
-        except (ClientError, IndexError, BotoCoreError) as e:
-            self.logger.error(f"Failed to verify image URL {url}: {str(e)}")
+    def verify_image_url(self, url: str) -> bool:
+        """
+        Verify if an image URL exists in the S3 bucket
+
+        Args:
+            url: S3 URL to verify
+
+        Returns:
+            bool: True if image exists and is accessible
+        """
+        prefix = self.build_object_url("")
+        if not url.startswith(prefix):
+            self.logger.error(f"Invalid S3 URL format: {url}")
             return False
+        return self.verify_object(unquote(url[len(prefix):]), url)
@@ -0,0 +1,21 @@
+from typing import Any, Union
+
+import orjson
+
+# Dataclass models, datetimes and NumPy values serialize natively; non-string
+# dict keys are stringified as json.dumps does
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def to_json_bytes(value: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON; unsupported types fall back to str()"""
+    return orjson.dumps(value, default=str, option=_OPTIONS)
+
+
+def to_json(value: Any) -> str:
+    """Serialize to compact JSON text, e.g. for prompts and SQLite columns"""
+    return to_json_bytes(value).decode()
+
+
+def from_json(data: Union[str, bytes]) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,218 @@
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from typing import Any, BinaryIO, List, Optional, Tuple
+
+from .image_pipeline import MAX_IMAGE_BYTES
+
+# Uploads are copied in chunks of this size, so no full copy is ever held in memory
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+
+class UploadTooLarge(ValueError):
+    """Raised as soon as an upload is known to exceed the size limit"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Image size exceeds {max_bytes // (1024 * 1024)}MB limit")
+        self.max_bytes = max_bytes
+
+
+class SpooledUpload:
+    """
+    Uploaded file kept in memory up to a threshold and on disk beyond it.
+
+    Behaves as a seekable binary file, so it can be handed to PIL and boto3
+    directly. The SHA-256 of the content is computed while spooling and reused
+    as the cache key, avoiding a second pass over the data.
+    """
+
+    def __init__(self, file: BinaryIO, size: int, sha256: str):
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpooledUpload":
+        return cls(io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest())
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the content has not been rolled over to a temporary file"""
+        return not getattr(self.file, "_rolled", True)
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __reduce__(self):
+        # Process pools pickle arguments; ship the content as bytes
+        self.file.seek(0)
+        return SpooledUpload.from_bytes, (self.file.read(),)
+
+
+def spool_threshold() -> int:
+    """Bytes kept in memory before an upload rolls over to a temporary file"""
+    return int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+
+
+async def spool_upload(
+    upload: Any,
+    max_bytes: int = MAX_IMAGE_BYTES,
+    max_memory: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> SpooledUpload:
+    """
+    Copy an uploaded file into a SpooledUpload, enforcing the size limit
+
+    The declared size is checked before any data is read, and the copy stops at
+    the first chunk that crosses max_bytes, so oversized uploads are rejected
+    without reading them in full.
+
+    Args:
+        upload: FastAPI/Starlette UploadFile
+        max_bytes: Maximum accepted upload size
+        max_memory: Bytes kept in memory before spilling to disk
+        chunk_size: Size of each read from the upload
+
+    Returns:
+        SpooledUpload: Rewound copy of the upload with its size and SHA-256
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes
+    """
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    spooler = _Spooler(max_bytes, max_memory)
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            spooler.write(chunk)
+    except BaseException:
+        spooler.discard()
+        raise
+    return spooler.finish()
+
+
+def is_zip(upload: SpooledUpload) -> bool:
+    """Whether the spooled content is a zip archive, judged by its signature"""
+    upload.seek(0)
+    signature = upload.read(len(ZIP_SIGNATURE))
+    upload.seek(0)
+    return signature == ZIP_SIGNATURE
+
+
+def expand_zip(
+    upload: SpooledUpload,
+    max_files: int,
+    max_bytes: int = MAX_IMAGE_BYTES,
+    max_memory: Optional[int] = None,
+) -> List[Tuple[str, Optional[SpooledUpload], Optional[str]]]:
+    """
+    Spool every file in a zip archive into its own SpooledUpload
+
+    Members are decompressed in chunks with the same size limit as direct
+    uploads, so a member that inflates past max_bytes is rejected part way.
+
+    Args:
+        upload: Spooled zip archive
+        max_files: Maximum number of files accepted from the archive
+        max_bytes: Maximum uncompressed size of each file
+        max_memory: Bytes kept in memory per file before spilling to disk
+
+    Returns:
+        List[Tuple[str, Optional[SpooledUpload], Optional[str]]]: (name, upload,
+            error) per file, with exactly one of upload and error set
+
+    Raises:
+        ValueError: If the archive is invalid or holds more than max_files files
+    """
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip archive: {str(e)}")
+
+    with archive:
+        members = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir()
+            # Skip metadata added by macOS and other hidden files
+            and not info.filename.startswith("__MACOSX/")
+            and not info.filename.rsplit("/", 1)[-1].startswith(".")
+        ]
+        if len(members) > max_files:
+            raise ValueError(f"Zip archive holds more than {max_files} files")
+
+        entries = []
+        for info in members:
+            if info.file_size > max_bytes:
+                entries.append((info.filename, None, str(UploadTooLarge(max_bytes))))
+                continue
+            spooler = _Spooler(max_bytes, max_memory)
+            try:
+                with archive.open(info) as member:
+                    for chunk in iter(lambda: member.read(UPLOAD_CHUNK_SIZE), b""):
+                        spooler.write(chunk)
+                entries.append((info.filename, spooler.finish(), None))
+            except Exception as e:
+                spooler.discard()
+                entries.append((info.filename, None, str(e)))
+        return entries
+
+
+class _Spooler:
+    """Chunked copy into a spooled temporary file with a size limit and hash"""
+
+    def __init__(self, max_bytes: int, max_memory: Optional[int]):
+        self.max_bytes = max_bytes
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=spool_threshold() if max_memory is None else max_memory
+        )
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self) -> SpooledUpload:
+        self.file.seek(0)
+        return SpooledUpload(self.file, self.size, self.digest.hexdigest())
+
+    def discard(self) -> None:
+        self.file.close()